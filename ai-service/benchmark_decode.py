@@ -0,0 +1,115 @@
+"""Per-image decode time: full-resolution decode versus model-scale decode.
+
+Both paths end with the image the CLIP processor would see (shortest side
+224), so the timings cover decode plus resize:
+
+    python benchmark_decode.py                       # synthetic 12 MP JPEGs
+    python benchmark_decode.py --images ./photos --json decode.json
+"""
+import argparse
+import io
+import json
+import os
+import time
+from typing import Optional, List, Dict, Any
+
+import numpy as np
+from PIL import Image
+
+from image_decode import decode_for_model, decode_full, pixel_difference, target_size, turbojpeg
+
+IMAGE_EXTENSIONS = (".jpg", ".jpeg", ".png", ".webp")
+
+
+def synthetic_photos(count: int, width: int, height: int, seed: int) -> List[bytes]:
+    """Smooth gradients plus sensor-like noise, saved as quality 90 JPEGs"""
+    rng = np.random.default_rng(seed)
+    photos = []
+    for _ in range(count):
+        y, x = np.mgrid[0:height, 0:width].astype(np.float32)
+        base = np.stack([
+            128 + 100 * np.sin(x / rng.uniform(100, 600) + rng.uniform(0, 6)),
+            128 + 100 * np.cos(y / rng.uniform(100, 600) + rng.uniform(0, 6)),
+            128 + 100 * np.sin((x + y) / rng.uniform(200, 900)),
+        ], axis=-1)
+        pixels = np.clip(base + rng.normal(0, 8, size=base.shape), 0, 255).astype(np.uint8)
+        buffer = io.BytesIO()
+        Image.fromarray(pixels).save(buffer, format="JPEG", quality=90)
+        photos.append(buffer.getvalue())
+    return photos
+
+
+def load_photos(folder: str, limit: int) -> List[bytes]:
+    names = sorted(name for name in os.listdir(folder) if name.lower().endswith(IMAGE_EXTENSIONS))[:limit]
+    photos = []
+    for name in names:
+        with open(os.path.join(folder, name), "rb") as handle:
+            photos.append(handle.read())
+    return photos
+
+
+def baseline(image_bytes: bytes, min_side: int) -> Image.Image:
+    img = decode_full(image_bytes)
+    return img.resize(target_size(img.width, img.height, min_side), Image.BICUBIC)
+
+
+def time_path(name: str, fn, photos: List[bytes], repeats: int) -> Dict[str, Any]:
+    timings = []
+    for _ in range(repeats):
+        for image_bytes in photos:
+            started = time.perf_counter()
+            fn(image_bytes)
+            timings.append(time.perf_counter() - started)
+    timings_ms = np.array(timings) * 1000
+    return {
+        "path": name,
+        "ms_mean": round(float(timings_ms.mean()), 2),
+        "ms_p50": round(float(np.percentile(timings_ms, 50)), 2),
+        "ms_p95": round(float(np.percentile(timings_ms, 95)), 2),
+        "images_per_second": round(float(1000 / timings_ms.mean()), 1),
+    }
+
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--images", help="Folder of photos; synthetic JPEGs are generated when omitted")
+    parser.add_argument("--count", type=int, default=10)
+    parser.add_argument("--width", type=int, default=4000)
+    parser.add_argument("--height", type=int, default=3000)
+    parser.add_argument("--min-side", type=int, default=224)
+    parser.add_argument("--repeats", type=int, default=3)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--json", help="Write the report to this path")
+    args = parser.parse_args(argv)
+
+    photos = load_photos(args.images, args.count) if args.images else synthetic_photos(args.count, args.width, args.height, args.seed)
+    print(f"{len(photos)} images, mean {np.mean([len(p) for p in photos]) / 1024:.0f} KiB, "
+          f"turbojpeg {'available' if turbojpeg is not None else 'not installed'}")
+
+    paths = [("full decode + resize", lambda b: baseline(b, args.min_side)),
+             ("draft decode (pil)", lambda b: decode_for_model(b, args.min_side, "pil"))]
+    if turbojpeg is not None:
+        paths.append(("scaled decode (turbojpeg)", lambda b: decode_for_model(b, args.min_side, "turbojpeg")))
+
+    report = []
+    for name, fn in paths:
+        result = time_path(name, fn, photos, args.repeats)
+        # Drift against the full decode, on the image the processor would receive
+        result["mean_abs_pixel_diff"] = round(float(np.mean([
+            pixel_difference(fn(b), baseline(b, args.min_side)) for b in photos
+        ])), 3)
+        report.append(result)
+        print(f"{name:<28} mean={result['ms_mean']:.2f}ms p50={result['ms_p50']:.2f}ms p95={result['ms_p95']:.2f}ms "
+              f"{result['images_per_second']:.1f} img/s pixel_diff={result['mean_abs_pixel_diff']:.3f}")
+
+    speedup = report[0]["ms_mean"] / min(result["ms_mean"] for result in report[1:])
+    print(f"Speedup over full decode: {speedup:.1f}x")
+
+    if args.json:
+        with open(args.json, "w") as handle:
+            json.dump({"images": len(photos), "min_side": args.min_side, "results": report}, handle, indent=2)
+        print(f"Report written to {args.json}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,156 @@
+"""Recall@k versus latency report for the search index backends.
+
+Compares every approximate setting against the exact flat backend on the
+same vectors and queries:
+
+    python benchmark_index.py --n 200000 --k 10
+    python benchmark_index.py --prototypes 1 3 --shortlist 16 32 64
+    python benchmark_index.py --vectors embeddings.npy --skus skus.npy --json report.json
+"""
+import argparse
+import json
+import time
+from typing import Optional, List, Dict, Any
+
+import numpy as np
+
+from vector_index import EmbeddingIndex, hnswlib, normalize_rows
+
+
+def synthetic_catalogue(n: int, dim: int, n_skus: int, noise: float, seed: int):
+    """Clustered unit vectors: each SKU is a centre with its photos scattered around it"""
+    rng = np.random.default_rng(seed)
+    centres = normalize_rows(rng.normal(size=(n_skus, dim)))
+    sku_ids = rng.integers(0, n_skus, size=n)
+    vectors = normalize_rows(centres[sku_ids] + noise * rng.normal(size=(n, dim)) / np.sqrt(dim))
+    return vectors, np.array([f"SKU{i:06d}" for i in sku_ids], dtype=object), centres
+
+
+def make_queries(centres: np.ndarray, count: int, noise: float, seed: int) -> np.ndarray:
+    rng = np.random.default_rng(seed + 1)
+    picks = rng.integers(0, centres.shape[0], size=count)
+    return normalize_rows(centres[picks] + noise * rng.normal(size=(count, centres.shape[1])) / np.sqrt(centres.shape[1]))
+
+
+def settings_grid(args) -> List[Dict[str, Any]]:
+    grid = [{"backend": "flat", "params": {}}]
+    for nlist in args.ivf_nlist:
+        for nprobe in args.ivf_nprobe:
+            if nprobe <= nlist:
+                grid.append({"backend": "ivf", "params": {"nlist": nlist, "nprobe": nprobe}})
+    if hnswlib is not None:
+        for ef_search in args.hnsw_ef:
+            grid.append({"backend": "hnsw", "params": {"m": args.hnsw_m, "ef_construction": args.hnsw_ef_construction,
+                                                      "ef_search": ef_search}})
+    else:
+        print("hnswlib not installed; skipping hnsw settings")
+    # Two-stage search over the exact backend: only SKU recall and SKU search latency change
+    for per_sku in args.prototypes:
+        for shortlist in args.shortlist:
+            grid.append({"backend": "flat", "params": {}, "prototypes_per_sku": per_sku, "shortlist_skus": shortlist})
+    return grid
+
+
+def run_setting(setting: Dict[str, Any], vectors: np.ndarray, sku_codes: np.ndarray, queries: np.ndarray,
+                exact_rows: List[np.ndarray], exact_skus: List[List[str]], k: int, top_k_skus: int) -> Dict[str, Any]:
+    index = EmbeddingIndex(setting["backend"], setting["params"],
+                           setting.get("prototypes_per_sku", 0), setting.get("shortlist_skus", 32))
+    started = time.perf_counter()
+    index.build(np.arange(len(sku_codes)).astype(object), sku_codes, vectors, list(sku_codes))
+    build_seconds = time.perf_counter() - started
+    backend = index.backend
+
+    latencies, sku_latencies, recalls, sku_recalls = [], [], [], []
+    for query, expected_rows, expected_skus in zip(queries, exact_rows, exact_skus):
+        started = time.perf_counter()
+        rows, _ = backend.search(query, k)
+        latencies.append(time.perf_counter() - started)
+        recalls.append(len(np.intersect1d(rows, expected_rows)) / max(1, len(expected_rows)))
+
+        started = time.perf_counter()
+        found_skus = [sku for sku, _ in index.search(query, top_k_skus, -1.0)]
+        sku_latencies.append(time.perf_counter() - started)
+        sku_recalls.append(len(set(found_skus) & set(expected_skus)) / max(1, len(expected_skus)))
+
+    latencies_ms = np.array(latencies) * 1000
+    return {
+        "backend": setting["backend"],
+        "params": setting["params"],
+        "prototypes_per_sku": setting.get("prototypes_per_sku", 0),
+        "shortlist_skus": setting.get("shortlist_skus") if setting.get("prototypes_per_sku") else None,
+        "build_seconds": round(build_seconds, 3),
+        f"recall@{k}": round(float(np.mean(recalls)), 4),
+        f"sku_recall@{top_k_skus}": round(float(np.mean(sku_recalls)), 4),
+        "latency_ms_mean": round(float(latencies_ms.mean()), 3),
+        "latency_ms_p50": round(float(np.percentile(latencies_ms, 50)), 3),
+        "latency_ms_p95": round(float(np.percentile(latencies_ms, 95)), 3),
+        "qps": round(float(len(latencies) / np.sum(latencies)), 1),
+        "sku_search_ms_p50": round(float(np.percentile(np.array(sku_latencies) * 1000, 50)), 3),
+    }
+
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--vectors", help="Embedding matrix (.npy, N x D); synthetic data is generated when omitted")
+    parser.add_argument("--skus", help="SKU code per row (.npy), required with --vectors for SKU recall")
+    parser.add_argument("--n", type=int, default=100000, help="Synthetic catalogue size")
+    parser.add_argument("--dim", type=int, default=512)
+    parser.add_argument("--n-skus", type=int, default=5000)
+    parser.add_argument("--noise", type=float, default=1.0)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--top-k-skus", type=int, default=3)
+    parser.add_argument("--ivf-nlist", type=int, nargs="+", default=[256, 1024])
+    parser.add_argument("--ivf-nprobe", type=int, nargs="+", default=[4, 16, 64])
+    parser.add_argument("--hnsw-m", type=int, default=16)
+    parser.add_argument("--hnsw-ef-construction", type=int, default=200)
+    parser.add_argument("--hnsw-ef", type=int, nargs="+", default=[16, 64, 256])
+    parser.add_argument("--prototypes", type=int, nargs="*", default=[1], help="Prototypes per SKU for two-stage search")
+    parser.add_argument("--shortlist", type=int, nargs="+", default=[32], help="SKUs re-ranked in two-stage search")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--json", help="Write the report to this path")
+    args = parser.parse_args(argv)
+
+    if args.vectors:
+        vectors = normalize_rows(np.load(args.vectors))
+        sku_codes = np.load(args.skus, allow_pickle=True).astype(object) if args.skus else np.arange(len(vectors)).astype(object)
+        rng = np.random.default_rng(args.seed)
+        picks = rng.choice(len(vectors), min(args.queries, len(vectors)), replace=False)
+        queries = normalize_rows(vectors[picks] + 0.05 * rng.normal(size=(len(picks), vectors.shape[1])) / np.sqrt(vectors.shape[1]))
+    else:
+        vectors, sku_codes, centres = synthetic_catalogue(args.n, args.dim, args.n_skus, args.noise, args.seed)
+        queries = make_queries(centres, args.queries, args.noise, args.seed)
+
+    print(f"Catalogue: {vectors.shape[0]} vectors x {vectors.shape[1]} dims, {len(set(sku_codes))} SKUs, {len(queries)} queries")
+
+    exact = EmbeddingIndex("flat")
+    exact.build(np.arange(len(sku_codes)).astype(object), sku_codes, vectors, list(sku_codes))
+    exact_rows, exact_skus = [], []
+    for query in queries:
+        rows, _ = exact.backend.search(query, args.k)
+        exact_rows.append(rows)
+        exact_skus.append([sku for sku, _ in exact.search(query, args.top_k_skus, -1.0)])
+
+    report = []
+    for setting in settings_grid(args):
+        result = run_setting(setting, vectors, sku_codes, queries, exact_rows, exact_skus, args.k, args.top_k_skus)
+        report.append(result)
+        params = dict(setting["params"])
+        if setting.get("prototypes_per_sku"):
+            params.update(prototypes=setting["prototypes_per_sku"], shortlist=setting["shortlist_skus"])
+        params = ", ".join(f"{key}={value}" for key, value in params.items()) or "-"
+        print(f"{result['backend']:<5} {params:<45} recall@{args.k}={result[f'recall@{args.k}']:.4f} "
+              f"sku_recall@{args.top_k_skus}={result[f'sku_recall@{args.top_k_skus}']:.4f} "
+              f"p50={result['latency_ms_p50']:.3f}ms p95={result['latency_ms_p95']:.3f}ms "
+              f"sku_search_p50={result['sku_search_ms_p50']:.3f}ms "
+              f"build={result['build_seconds']:.2f}s")
+
+    if args.json:
+        with open(args.json, "w") as handle:
+            json.dump({"n": int(vectors.shape[0]), "dim": int(vectors.shape[1]), "queries": int(len(queries)),
+                       "k": args.k, "results": report}, handle, indent=2)
+        print(f"Report written to {args.json}")
+
+
+if __name__ == "__main__":
+    main()
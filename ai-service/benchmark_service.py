@@ -0,0 +1,310 @@
+"""End-to-end latency of /search-similar, /upload-image and /submit-feedback.
+
+Builds a synthetic catalogue of N SKUs x M images in a throwaway SQLite store,
+loads the configured CLIP backend and index, then drives the endpoints
+in-process (no network) at the requested concurrency. Each response carries a
+Server-Timing header, so the report breaks latency down by stage: read,
+validate, sku_lookup, embedding_cache, decode, inference, correction_lookup,
+similarity_scan, storage_write and serialize. Whatever the stages do not cover
+(multipart parsing, pool queueing) is reported as unattributed:
+
+    python benchmark_service.py --skus 500 --images-per-sku 20 --requests 200 --concurrency 8
+    python benchmark_service.py --real-embeddings --index-backend hnsw --json service.json
+
+Catalogue embeddings are random unit vectors clustered per SKU by default, which
+exercises the scan at full size; --real-embeddings embeds synthetic photos with
+the model instead, so searches return genuine matches (slower to set up).
+"""
+import argparse
+import asyncio
+import io
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+import uuid
+from datetime import datetime
+from typing import Optional, List, Dict, Any, Tuple
+
+import httpx
+import numpy as np
+from PIL import Image
+
+ENDPOINTS = ("search", "upload", "feedback")
+
+
+def sku_photo(rng: np.random.Generator, sku_index: int, width: int, height: int) -> bytes:
+    """A JPEG whose colours and stripes depend on the SKU, with per-photo noise"""
+    family = np.random.default_rng(sku_index)
+    colour = family.uniform(30, 225, size=3)
+    period = family.uniform(20, 200)
+    y, x = np.mgrid[0:height, 0:width].astype(np.float32)
+    stripes = 40 * np.sin((x + family.uniform(0, 1) * y) / period)[..., None]
+    pixels = np.clip(colour + stripes + rng.normal(0, 10, size=(height, width, 3)), 0, 255).astype(np.uint8)
+    buffer = io.BytesIO()
+    Image.fromarray(pixels).save(buffer, format="JPEG", quality=90)
+    return buffer.getvalue()
+
+
+def catalogue_vectors(main, args, rng: np.random.Generator, dim: int) -> np.ndarray:
+    """(skus * images_per_sku) x dim unit vectors, SKU-major"""
+    if not args.real_embeddings:
+        centres = rng.normal(size=(args.skus, dim))
+        vectors = np.repeat(centres, args.images_per_sku, axis=0) + 0.3 * rng.normal(size=(args.skus * args.images_per_sku, dim))
+        return (vectors / np.linalg.norm(vectors, axis=1, keepdims=True)).astype(np.float32)
+
+    chunks = []
+    for sku_index in range(args.skus):
+        images = [main.feature_extractor.decode(sku_photo(rng, sku_index, 320, 240)) for _ in range(args.images_per_sku)]
+        chunks.append(main.feature_extractor.extract_features_batch(images))
+    return np.vstack(chunks).astype(np.float32)
+
+
+def build_catalogue(main, manager, args, rng: np.random.Generator, dim: int) -> List[str]:
+    """Master SKUs, sku_images rows and feedback_training corrections written straight to SQLite"""
+    sku_codes = [f"BENCH-{i:05d}" for i in range(args.skus)]
+    manager.import_sku_master([(code, f"Benchmark SKU {i}") for i, code in enumerate(sku_codes)])
+
+    started = time.perf_counter()
+    vectors = catalogue_vectors(main, args, rng, dim)
+    now = datetime.now()
+    rows = []
+    for i, vector in enumerate(vectors):
+        blob, tag = main.encode_embedding(vector, "float32")
+        rows.append({
+            'id': str(uuid.uuid4()),
+            'sku_code': sku_codes[i // args.images_per_sku],
+            'image_name': f"bench_{i}.jpg",
+            'image_sha256': None,
+            'file_size': 0,
+            'width': 640,
+            'height': 480,
+            'processed_at': now,
+            'clip_features': [],
+            'clip_embedding': blob,
+            'embedding_format': tag,
+            'uploaded_by': 'benchmark',
+        })
+    for start in range(0, len(rows), 5000):
+        manager._insert_records(rows[start:start + 5000])
+
+    if args.corrections:
+        picks = rng.choice(len(vectors), min(args.corrections, len(vectors)), replace=False)
+        conn = manager._connection()
+        with conn:
+            conn.executemany(
+                "INSERT INTO feedback_training (training_id, image_features, image_embedding, embedding_format, "
+                "correct_sku, feedback_id, created_at) VALUES (?, '[]', ?, ?, ?, NULL, ?)",
+                [(uuid.uuid4().hex, *main.encode_embedding(vectors[i], "float32"),
+                  sku_codes[i // args.images_per_sku], manager._timestamp(now)) for i in picks]
+            )
+    print(f"Catalogue: {len(rows)} images, {args.skus} SKUs, {args.corrections} corrections "
+          f"({time.perf_counter() - started:.1f}s)")
+    return sku_codes
+
+
+def configure_service(args, workdir: str):
+    """Import the service pointed at a throwaway SQLite store.
+
+    The settings go in as environment overrides before the import, so the module-level
+    storage backend is the SQLite one and no BigQuery client or default directories are set up.
+    """
+    overrides = {
+        "STORAGE_BACKEND": "sqlite",
+        "SQLITE_PATH": os.path.join(workdir, "benchmark.db"),
+        "INDEX_STORE_PATH": os.path.join(workdir, "index_store"),
+        "BLOB_STORE_PATH": os.path.join(workdir, "image_blobs"),
+        "INDEX_BACKEND": args.index_backend,
+        "INFERENCE_BACKEND": args.inference_backend,
+        "SERVER_TIMING_HEADER": "true",
+        "INDEX_REFRESH_SECONDS": "0",
+    }
+    for name, value in overrides.items():
+        if value is not None:
+            os.environ[f"BOROSIL_LENS_{name}"] = value
+
+    if "main" in sys.modules:
+        raise RuntimeError("benchmark_service must import the service itself; main was already imported")
+    import main
+
+    if not args.embedding_cache:
+        main.feature_extractor.cache = None
+    return main, main.dataset_manager
+
+
+def parse_server_timing(header: Optional[str]) -> Dict[str, float]:
+    stages = {}
+    for part in (header or "").split(","):
+        name, _, duration = part.strip().partition(";dur=")
+        if name and duration:
+            stages[name] = float(duration)
+    return stages
+
+
+def request_for(endpoint: str, sku_codes: List[str], rng: np.random.Generator) -> Tuple[str, Dict[str, str]]:
+    if endpoint == "search":
+        return "/search-similar", {}
+    if endpoint == "upload":
+        return "/upload-image", {"sku_code": sku_codes[rng.integers(len(sku_codes))], "username": "benchmark"}
+    predicted, correct = rng.choice(len(sku_codes), 2, replace=False)
+    return "/submit-feedback", {"username": "benchmark", "predicted_sku": sku_codes[predicted],
+                                "correct_sku": sku_codes[correct]}
+
+
+async def drive(client: httpx.AsyncClient, endpoint: str, photos: List[bytes], sku_codes: List[str],
+                requests: int, concurrency: int, seed: int) -> Tuple[List[Dict[str, Any]], float]:
+    rng = np.random.default_rng(seed)
+    plans = [request_for(endpoint, sku_codes, rng) + (photos[i % len(photos)],)
+             for i in range(requests)]
+    results: List[Dict[str, Any]] = []
+    next_plan = iter(plans)
+
+    async def worker():
+        for path, form, photo in next_plan:
+            started = time.perf_counter()
+            response = await client.post(path, data=form, files={"file": ("bench.jpg", photo, "image/jpeg")})
+            results.append({
+                "status": response.status_code,
+                "latency_ms": (time.perf_counter() - started) * 1000,
+                "stages": parse_server_timing(response.headers.get("server-timing")),
+            })
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return results, time.perf_counter() - started
+
+
+def percentiles(values: List[float]) -> Dict[str, float]:
+    if not values:
+        return {}
+    values = np.asarray(values)
+    return {
+        "mean": round(float(values.mean()), 3),
+        "p50": round(float(np.percentile(values, 50)), 3),
+        "p95": round(float(np.percentile(values, 95)), 3),
+        "p99": round(float(np.percentile(values, 99)), 3),
+        "max": round(float(values.max()), 3),
+    }
+
+
+def summarize(endpoint: str, results: List[Dict[str, Any]], seconds: float, concurrency: int) -> Dict[str, Any]:
+    ok = [result for result in results if result["status"] == 200]
+    stage_names = sorted({name for result in ok for name in result["stages"]} - {"total"})
+    unattributed = [result["stages"]["total"] - sum(value for name, value in result["stages"].items() if name != "total")
+                    for result in ok if "total" in result["stages"]]
+    return {
+        "endpoint": endpoint,
+        "requests": len(results),
+        "errors": len(results) - len(ok),
+        "status_codes": {str(code): sum(1 for r in results if r["status"] == code) for code in sorted({r["status"] for r in results})},
+        "concurrency": concurrency,
+        "seconds": round(seconds, 3),
+        "throughput_rps": round(len(ok) / seconds, 2) if seconds else 0.0,
+        "latency_ms": percentiles([result["latency_ms"] for result in ok]),
+        "stages_ms": {name: percentiles([result["stages"].get(name, 0.0) for result in ok]) for name in stage_names},
+        "unattributed_ms": percentiles(unattributed),
+    }
+
+
+def git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                              cwd=os.path.dirname(os.path.abspath(__file__)), check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+async def run(args, main, sku_codes: List[str], photos: List[bytes]) -> List[Dict[str, Any]]:
+    report = []
+    transport = httpx.ASGITransport(app=main.app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://benchmark", timeout=None) as client:
+        for offset, endpoint in enumerate(args.endpoints):
+            if args.warmup_requests:
+                await drive(client, endpoint, photos, sku_codes, args.warmup_requests, 1, args.seed + 100 + offset)
+            results, seconds = await drive(client, endpoint, photos, sku_codes, args.requests, args.concurrency,
+                                           args.seed + offset)
+            result = summarize(endpoint, results, seconds, args.concurrency)
+            report.append(result)
+            latency = result["latency_ms"]
+            print(f"{endpoint:<9} {result['throughput_rps']:>8.2f} req/s  p50={latency.get('p50', 0):.1f}ms "
+                  f"p95={latency.get('p95', 0):.1f}ms p99={latency.get('p99', 0):.1f}ms errors={result['errors']}")
+            for name, stats in result["stages_ms"].items():
+                print(f"    {name:<18} mean={stats['mean']:.2f}ms p95={stats['p95']:.2f}ms")
+            if result["unattributed_ms"]:
+                print(f"    {'unattributed':<18} mean={result['unattributed_ms']['mean']:.2f}ms")
+    return report
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--skus", type=int, default=200)
+    parser.add_argument("--images-per-sku", type=int, default=10)
+    parser.add_argument("--corrections", type=int, default=100, help="Approved feedback rows in the correction matrix")
+    parser.add_argument("--real-embeddings", action="store_true", help="Embed synthetic photos instead of random vectors")
+    parser.add_argument("--endpoints", nargs="+", default=list(ENDPOINTS), choices=ENDPOINTS)
+    parser.add_argument("--requests", type=int, default=100, help="Measured requests per endpoint")
+    parser.add_argument("--warmup-requests", type=int, default=5, help="Unmeasured requests per endpoint")
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--photo-width", type=int, default=1600)
+    parser.add_argument("--photo-height", type=int, default=1200)
+    parser.add_argument("--photos", type=int, default=16, help="Distinct request photos, reused round-robin")
+    parser.add_argument("--index-backend", choices=["flat", "ivf", "hnsw"], help="Defaults to Config.INDEX_BACKEND")
+    parser.add_argument("--inference-backend", help="Defaults to Config.INFERENCE_BACKEND")
+    parser.add_argument("--embedding-cache", action="store_true", help="Keep the embedding cache on (repeated photos hit it)")
+    parser.add_argument("--workdir", help="Keep the SQLite store and snapshots here instead of a temporary folder")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--json", help="Write the report to this path")
+    args = parser.parse_args(argv)
+
+    with tempfile.TemporaryDirectory(prefix="borosil-bench-") as tmp:
+        workdir = args.workdir or tmp
+        os.makedirs(workdir, exist_ok=True)
+        main, manager = configure_service(args, workdir)
+        rng = np.random.default_rng(args.seed)
+
+        manager.connect()
+        if not manager.available:
+            print("SQLite storage not available")
+            return 1
+        main.feature_extractor.load_model()
+        dim = int(main.feature_extractor.extract_features_batch([Image.new("RGB", (224, 224))]).shape[1])
+        sku_codes = build_catalogue(main, manager, args, rng, dim)
+
+        warmup = main.ServiceWarmup()
+        warmup.add_step("index", manager.load_index)
+        warmup.add_step("corrections", manager.load_corrections)
+        main.warmup = warmup
+        if not warmup.run():
+            print(f"Startup failed: {warmup.error}")
+            return 1
+        print(f"Index: {len(manager.index)} embeddings ({main.config.INDEX_BACKEND}), "
+              f"inference: {main.config.INFERENCE_BACKEND}, dim {dim}")
+
+        photos = [sku_photo(rng, int(rng.integers(args.skus)), args.photo_width, args.photo_height)
+                  for _ in range(args.photos)]
+        report = asyncio.run(run(args, main, sku_codes, photos))
+
+    if args.json:
+        with open(args.json, "w") as handle:
+            json.dump({
+                "commit": git_commit(),
+                "timestamp": datetime.now().isoformat(),
+                "platform": {"python": platform.python_version(), "machine": platform.machine(), "cpus": os.cpu_count()},
+                "config": {
+                    "skus": args.skus, "images_per_sku": args.images_per_sku, "corrections": args.corrections,
+                    "real_embeddings": args.real_embeddings, "photo_size": [args.photo_width, args.photo_height],
+                    "index_backend": main.config.INDEX_BACKEND, "inference_backend": main.config.INFERENCE_BACKEND,
+                    "inference_batching": main.config.INFERENCE_BATCHING, "embedding_cache": args.embedding_cache,
+                    "requests": args.requests, "concurrency": args.concurrency,
+                },
+                "results": report,
+            }, handle, indent=2)
+        print(f"Report written to {args.json}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,147 @@
+"""Top-k SKU agreement of the quantized / ONNX backends against fp32 torch.
+
+Takes a labelled folder (<dir>/<SKU>/<image>, the same layout as
+ingest_images.py). A few images per SKU are held out as queries and the rest
+form a gallery embedded with the fp32 reference, as the stored index would be.
+Each candidate backend embeds the queries, and the report gives top-1 and
+top-k SKU agreement with fp32, accuracy against the true SKU, embedding cosine
+and per-image latency:
+
+    python check_backend_parity.py --images ./heldout --backends torch_int8 onnx --min-agreement 0.98
+"""
+import argparse
+import json
+import os
+import sys
+import time
+from collections import defaultdict
+from typing import Optional, List, Dict, Any, Tuple
+
+import numpy as np
+from transformers import CLIPProcessor
+
+from image_decode import decode_for_model
+from inference_backends import INFERENCE_BACKENDS, create_inference_backend
+from vector_index import EmbeddingIndex, normalize_rows
+
+IMAGE_EXTENSIONS = (".jpg", ".jpeg", ".png")
+
+
+def labelled_images(root: str, holdout: int) -> Tuple[List[Tuple[str, str]], List[Tuple[str, str]]]:
+    """(path, sku) lists for gallery and queries; SKUs with a single image stay in the gallery"""
+    by_sku = defaultdict(list)
+    for sku_code in sorted(os.listdir(root)):
+        folder = os.path.join(root, sku_code)
+        if os.path.isdir(folder):
+            for name in sorted(os.listdir(folder)):
+                if name.lower().endswith(IMAGE_EXTENSIONS):
+                    by_sku[sku_code].append(os.path.join(folder, name))
+
+    gallery, queries = [], []
+    for sku_code, paths in by_sku.items():
+        held = min(holdout, len(paths) - 1)
+        queries.extend((path, sku_code) for path in paths[:held])
+        gallery.extend((path, sku_code) for path in paths[held:])
+    return gallery, queries
+
+
+def embed(backend, processor, paths: List[str], input_size: int, batch_size: int) -> Tuple[np.ndarray, float]:
+    """Normalized embeddings and mean seconds per image spent in the backend"""
+    chunks, seconds = [], 0.0
+    for start in range(0, len(paths), batch_size):
+        images = []
+        for path in paths[start:start + batch_size]:
+            with open(path, "rb") as handle:
+                images.append(decode_for_model(handle.read(), input_size))
+        pixel_values = processor(images=images, return_tensors="pt")["pixel_values"]
+        started = time.perf_counter()
+        chunks.append(backend.embed(pixel_values))
+        seconds += time.perf_counter() - started
+    return normalize_rows(np.vstack(chunks).astype(np.float32)), seconds / max(1, len(paths))
+
+
+def compare(index: EmbeddingIndex, reference: np.ndarray, candidate: np.ndarray, truth: List[str], k: int) -> Dict[str, Any]:
+    top1_agree, topk_agree, correct = [], [], []
+    for ref_query, cand_query, sku_code in zip(reference, candidate, truth):
+        ref_skus = [sku for sku, _ in index.search(ref_query, k, -1.0)]
+        cand_skus = [sku for sku, _ in index.search(cand_query, k, -1.0)]
+        top1_agree.append(bool(ref_skus[:1] == cand_skus[:1]))
+        topk_agree.append(len(set(ref_skus) & set(cand_skus)) / max(1, len(ref_skus)))
+        correct.append(bool(cand_skus[:1] == [sku_code]))
+    cosines = np.sum(reference * candidate, axis=1)
+    return {
+        "top1_agreement": round(float(np.mean(top1_agree)), 4),
+        f"top{k}_agreement": round(float(np.mean(topk_agree)), 4),
+        "top1_accuracy": round(float(np.mean(correct)), 4),
+        "cosine_mean": round(float(cosines.mean()), 5),
+        "cosine_min": round(float(cosines.min()), 5),
+    }
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--images", required=True, help="Folder laid out as <SKU>/<image>")
+    parser.add_argument("--model", default="openai/clip-vit-base-patch32")
+    parser.add_argument("--backends", nargs="+", default=["torch_int8", "onnx"],
+                        choices=sorted(name for name in INFERENCE_BACKENDS if name != "torch"))
+    parser.add_argument("--onnx-path", default="models/clip_vision.onnx")
+    parser.add_argument("--holdout", type=int, default=1, help="Query images held out per SKU")
+    parser.add_argument("--k", type=int, default=3)
+    parser.add_argument("--batch-size", type=int, default=16)
+    parser.add_argument("--min-agreement", type=float, default=None,
+                        help="Exit non-zero if any backend's top-1 agreement is below this")
+    parser.add_argument("--json", help="Write the report to this path")
+    args = parser.parse_args(argv)
+
+    gallery, queries = labelled_images(args.images, args.holdout)
+    if not queries:
+        print("No held-out queries: every SKU folder needs at least two images")
+        return 1
+    print(f"Gallery: {len(gallery)} images, queries: {len(queries)}, SKUs: {len({sku for _, sku in gallery})}")
+
+    processor = CLIPProcessor.from_pretrained(args.model)
+    image_processor = getattr(processor, "image_processor", processor)
+    input_size = (getattr(image_processor, "size", None) or {}).get("shortest_edge", 224)
+
+    reference = create_inference_backend("torch", args.model, device="cpu")
+    gallery_vectors, _ = embed(reference, processor, [path for path, _ in gallery], input_size, args.batch_size)
+    index = EmbeddingIndex("flat")
+    index.build(np.arange(len(gallery)).astype(object), [sku for _, sku in gallery], gallery_vectors,
+                [sku for _, sku in gallery])
+
+    query_paths, truth = [path for path, _ in queries], [sku for _, sku in queries]
+    reference_queries, reference_seconds = embed(reference, processor, query_paths, input_size, args.batch_size)
+    report = [{"backend": "torch", "ms_per_image": round(reference_seconds * 1000, 2),
+               **compare(index, reference_queries, reference_queries, truth, args.k)}]
+
+    for name in args.backends:
+        params = {"onnx_path": args.onnx_path} if name == "onnx" else {}
+        try:
+            candidate = create_inference_backend(name, args.model, **params)
+        except ImportError as e:
+            print(f"{name}: skipped ({e})")
+            continue
+        candidate_queries, candidate_seconds = embed(candidate, processor, query_paths, input_size, args.batch_size)
+        report.append({"backend": name, "ms_per_image": round(candidate_seconds * 1000, 2),
+                       **compare(index, reference_queries, candidate_queries, truth, args.k)})
+
+    for result in report:
+        print(f"{result['backend']:<11} {result['ms_per_image']:>8.2f} ms/img  top1_agree={result['top1_agreement']:.4f} "
+              f"top{args.k}_agree={result[f'top{args.k}_agreement']:.4f} top1_acc={result['top1_accuracy']:.4f} "
+              f"cosine_mean={result['cosine_mean']:.5f} cosine_min={result['cosine_min']:.5f}")
+
+    if args.json:
+        with open(args.json, "w") as handle:
+            json.dump({"gallery": len(gallery), "queries": len(queries), "k": args.k, "results": report}, handle, indent=2)
+        print(f"Report written to {args.json}")
+
+    if args.min_agreement is not None:
+        failing = [result["backend"] for result in report[1:] if result["top1_agreement"] < args.min_agreement]
+        if failing:
+            print(f"Below {args.min_agreement} top-1 agreement: {', '.join(failing)}")
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
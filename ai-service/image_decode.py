@@ -0,0 +1,122 @@
+"""Image decoding sized for the model input.
+
+CLIP only ever sees a 224 px image, so decoding a 12 MP photo at full
+resolution and then resizing it away wastes most of the CPU time. JPEGs are
+decoded with DCT scaling (PIL draft mode or libjpeg-turbo when installed) to
+the smallest size whose shortest side still covers the model input, and
+everything else is reduced before the final resize.
+"""
+import io
+from typing import List, Optional, Tuple
+
+import numpy as np
+from PIL import Image, ImageOps
+
+try:
+    from turbojpeg import TurboJPEG, TJPF_RGB
+    turbojpeg = TurboJPEG()
+except Exception:  # optional dependency, or the libjpeg-turbo shared library is missing
+    turbojpeg = None
+
+DECODERS = ("auto", "pil", "turbojpeg")
+
+# Test-time views, most useful first: a request asking for n views gets the first n
+VIEWS = ("center", "flip", "full", "zoom", "top_left", "top_right", "bottom_left", "bottom_right")
+
+
+def read_header(image_bytes: bytes) -> Tuple[Optional[str], int, int]:
+    """Format and size from the image header; pixel data is not decoded"""
+    with Image.open(io.BytesIO(image_bytes)) as img:
+        width, height = img.size
+        return img.format, width, height
+
+
+def target_size(width: int, height: int, min_side: int) -> Tuple[int, int]:
+    """Size with the shortest side scaled to min_side; never upscales"""
+    short_side = min(width, height)
+    if short_side <= min_side:
+        return width, height
+    scale = min_side / short_side
+    return max(min_side, round(width * scale)), max(min_side, round(height * scale))
+
+
+def _turbojpeg_decode(image_bytes: bytes, width: int, height: int, min_side: int) -> Image.Image:
+    factors = sorted(turbojpeg.scaling_factors, key=lambda factor: factor[0] / factor[1])
+    scaling_factor = (1, 1)
+    for num, denom in factors:
+        if min(width, height) * num / denom >= min_side:
+            scaling_factor = (num, denom)
+            break
+    pixels = turbojpeg.decode(image_bytes, pixel_format=TJPF_RGB, scaling_factor=scaling_factor)
+    return Image.fromarray(pixels)
+
+
+def decode_for_model(image_bytes: bytes, min_side: int = 224, decoder: str = "auto") -> Image.Image:
+    """RGB image whose shortest side is min_side (or smaller if the source is), decoded once"""
+    img = Image.open(io.BytesIO(image_bytes))
+    width, height = img.size
+
+    if img.format == "JPEG" and min(width, height) > min_side:
+        if decoder in ("auto", "turbojpeg") and turbojpeg is not None:
+            img = _turbojpeg_decode(image_bytes, width, height, min_side)
+        elif decoder == "turbojpeg":
+            raise RuntimeError("turbojpeg decoder requested but PyTurboJPEG is not available")
+        else:
+            # draft picks the largest DCT scale (1/2, 1/4, 1/8) that still covers the requested size
+            img.draft("RGB", target_size(width, height, min_side))
+
+    img = img.convert("RGB")
+    size = target_size(img.width, img.height, min_side)
+    if size != img.size:
+        img = img.resize(size, Image.BICUBIC, reducing_gap=3.0)
+    return img
+
+
+def test_time_views(img: Image.Image, count: int, crop_fraction: float = 0.8) -> List[Image.Image]:
+    """The first count VIEWS of img: itself, mirrored, letterboxed to a square (nothing cropped away),
+    a centre zoom and the four corner squares, each crop_fraction of the shortest side"""
+    width, height = img.size
+    side = max(1, round(min(width, height) * crop_fraction))
+    boxes = {
+        "zoom": ((width - side) // 2, (height - side) // 2),
+        "top_left": (0, 0),
+        "top_right": (width - side, 0),
+        "bottom_left": (0, height - side),
+        "bottom_right": (width - side, height - side),
+    }
+
+    views = []
+    for name in VIEWS[:count]:
+        if name == "center":
+            views.append(img)
+        elif name == "flip":
+            views.append(ImageOps.mirror(img))
+        elif name == "full":
+            fill = tuple(int(c) for c in np.asarray(img).reshape(-1, 3).mean(axis=0))
+            views.append(ImageOps.pad(img, (max(width, height),) * 2, color=fill))
+        else:
+            left, top = boxes[name]
+            views.append(img.crop((left, top, left + side, top + side)))
+    return views
+
+
+def decode_full(image_bytes: bytes) -> Image.Image:
+    """The original path: full-resolution decode"""
+    return Image.open(io.BytesIO(image_bytes)).convert("RGB")
+
+
+def pixel_difference(a: Image.Image, b: Image.Image) -> float:
+    """Mean absolute difference (0-255) between two images of equal size"""
+    return float(np.abs(np.asarray(a, dtype=np.int16) - np.asarray(b, dtype=np.int16)).mean())
+
+
+def make_thumbnail(image_bytes: bytes, max_side: int = 160, quality: int = 80) -> bytes:
+    """JPEG no larger than max_side on either side, using the same DCT-scaled decode"""
+    img = Image.open(io.BytesIO(image_bytes))
+    if img.format == "JPEG":
+        img.draft("RGB", (max_side, max_side))
+    img = ImageOps.exif_transpose(img).convert("RGB")
+    img.thumbnail((max_side, max_side), Image.BICUBIC)
+    out = io.BytesIO()
+    img.save(out, format="JPEG", quality=quality, optimize=True)
+    return out.getvalue()
@@ -0,0 +1,42 @@
+"""Load the SKU master list into the embedded SQLite store (STORAGE_BACKEND = "sqlite").
+
+Takes a CSV with sku_code and description columns, e.g. an export of the
+BigQuery master_table. Existing codes get their description updated:
+
+    python import_sku_master.py master_table.csv
+"""
+import argparse
+import csv
+import sys
+from typing import Optional, List
+
+from main import dataset_manager
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("csv_path", help="CSV file with sku_code and description columns")
+    args = parser.parse_args(argv)
+
+    if dataset_manager.name != "sqlite":
+        print(f"STORAGE_BACKEND is {dataset_manager.name}; the master table is only imported into sqlite")
+        return 1
+
+    with open(args.csv_path, newline="", encoding="utf-8-sig") as handle:
+        rows = [(row["sku_code"].strip(), (row.get("description") or "").strip())
+                for row in csv.DictReader(handle) if (row.get("sku_code") or "").strip()]
+    if not rows:
+        print(f"No SKU rows found in {args.csv_path}")
+        return 1
+
+    dataset_manager.connect()
+    if not dataset_manager.available:
+        print("SQLite storage not available")
+        return 1
+
+    print(f"Imported {dataset_manager.import_sku_master(rows)} SKUs into {dataset_manager.path}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
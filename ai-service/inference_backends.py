@@ -0,0 +1,158 @@
+"""CPU inference backends for the CLIP image tower.
+
+Every backend takes the processor's pixel_values (N x 3 x H x W) and returns
+unnormalized image embeddings as a float32 numpy array:
+
+    torch       the fp32 PyTorch model
+    torch_int8  dynamic int8 quantization of the Linear layers (CPU only)
+    onnx        the vision tower exported once to ONNX and run with onnxruntime
+
+With vision_only (the default) only the vision encoder and projection are
+read from the checkpoint, through CLIPVisionModelWithProjection; the text
+tower is never materialized. Weights come from model.safetensors when the
+repo has one, which is memory-mapped rather than unpickled.
+"""
+import importlib.util
+import logging
+import os
+from typing import Optional
+
+import numpy as np
+import torch
+from transformers import CLIPModel, CLIPVisionModelWithProjection
+
+try:
+    import onnxruntime
+except ImportError:  # optional dependency, only needed for the onnx backend
+    onnxruntime = None
+
+logger = logging.getLogger(__name__)
+
+
+class VisionTower(torch.nn.Module):
+    """Vision encoder plus projection: the only part of CLIP that get_image_features uses"""
+
+    def __init__(self, vision_model: torch.nn.Module, visual_projection: torch.nn.Module):
+        super().__init__()
+        self.vision_model = vision_model
+        self.visual_projection = visual_projection
+
+    def forward(self, pixel_values: torch.Tensor) -> torch.Tensor:
+        return self.visual_projection(self.vision_model(pixel_values=pixel_values).pooler_output)
+
+
+def load_vision_tower(model_name: str, vision_only: bool = True) -> VisionTower:
+    # Older transformers only honour low_cpu_mem_usage (meta-device init, no double copy) with accelerate
+    load_kwargs = {"low_cpu_mem_usage": True} if importlib.util.find_spec("accelerate") else {}
+    model_class = CLIPVisionModelWithProjection if vision_only else CLIPModel
+    model = model_class.from_pretrained(model_name, **load_kwargs)
+    return VisionTower(model.vision_model, model.visual_projection)
+
+
+class InferenceBackend:
+    """Base class: load() once, then embed() batches of pixel_values"""
+
+    name = "base"
+
+    def __init__(self, model_name: str):
+        self.model_name = model_name
+        self.device = torch.device("cpu")
+
+    def load(self):
+        raise NotImplementedError
+
+    def embed(self, pixel_values: torch.Tensor) -> np.ndarray:
+        raise NotImplementedError
+
+
+class TorchBackend(InferenceBackend):
+    name = "torch"
+
+    def __init__(self, model_name: str, device: Optional[str] = None, vision_only: bool = True):
+        super().__init__(model_name)
+        self.device = torch.device(device or ("cuda" if torch.cuda.is_available() else "cpu"))
+        self.vision_only = vision_only
+        self.model = None
+
+    def load(self):
+        self.model = load_vision_tower(self.model_name, self.vision_only).to(self.device)
+        self.model.eval()
+
+    def embed(self, pixel_values: torch.Tensor) -> np.ndarray:
+        with torch.inference_mode():
+            features = self.model(pixel_values.to(self.device))
+        return features.float().cpu().numpy()
+
+
+class TorchInt8Backend(TorchBackend):
+    name = "torch_int8"
+
+    def __init__(self, model_name: str, device: Optional[str] = None, vision_only: bool = True):
+        # Dynamic quantization only has CPU kernels
+        super().__init__(model_name, "cpu", vision_only)
+
+    def load(self):
+        model = load_vision_tower(self.model_name, self.vision_only)
+        model.eval()
+        self.model = torch.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8)
+
+
+class OnnxBackend(InferenceBackend):
+    name = "onnx"
+
+    def __init__(self, model_name: str, onnx_path: str, threads: int = 0, vision_only: bool = True):
+        super().__init__(model_name)
+        self.onnx_path = onnx_path
+        self.threads = threads
+        self.vision_only = vision_only
+        self.session = None
+
+    def export(self):
+        """Write the vision tower as an ONNX graph with a dynamic batch axis"""
+        tower = load_vision_tower(self.model_name, self.vision_only)
+        tower.eval()
+        image_size = tower.vision_model.config.image_size
+        dummy = torch.zeros(1, 3, image_size, image_size)
+
+        os.makedirs(os.path.dirname(self.onnx_path) or ".", exist_ok=True)
+        tmp_path = f"{self.onnx_path}.tmp"
+        export_kwargs = {"dynamo": False} if "dynamo" in torch.onnx.export.__code__.co_varnames else {}
+        torch.onnx.export(
+            tower, (dummy,), tmp_path,
+            input_names=["pixel_values"], output_names=["image_embeds"],
+            dynamic_axes={"pixel_values": {0: "batch"}, "image_embeds": {0: "batch"}},
+            opset_version=17, **export_kwargs
+        )
+        os.replace(tmp_path, self.onnx_path)
+        logger.info(f"Exported CLIP vision tower to {self.onnx_path}")
+
+    def load(self):
+        if onnxruntime is None:
+            raise ImportError("onnx inference backend requires the onnxruntime package")
+        if not os.path.exists(self.onnx_path):
+            self.export()
+
+        options = onnxruntime.SessionOptions()
+        options.graph_optimization_level = onnxruntime.GraphOptimizationLevel.ORT_ENABLE_ALL
+        if self.threads:
+            options.intra_op_num_threads = self.threads
+        self.session = onnxruntime.InferenceSession(self.onnx_path, options, providers=["CPUExecutionProvider"])
+
+    def embed(self, pixel_values: torch.Tensor) -> np.ndarray:
+        inputs = {"pixel_values": pixel_values.cpu().numpy().astype(np.float32)}
+        return self.session.run(["image_embeds"], inputs)[0]
+
+
+INFERENCE_BACKENDS = {
+    "torch": TorchBackend,
+    "torch_int8": TorchInt8Backend,
+    "onnx": OnnxBackend,
+}
+
+
+def create_inference_backend(name: str, model_name: str, **params) -> InferenceBackend:
+    if name not in INFERENCE_BACKENDS:
+        raise ValueError(f"Unknown inference backend: {name} (expected one of {sorted(INFERENCE_BACKENDS)})")
+    backend = INFERENCE_BACKENDS[name](model_name, **params)
+    backend.load()
+    return backend
@@ -0,0 +1,69 @@
+"""Offline catalogue onboarding: ingest a directory of product photos.
+
+Expected layout is one folder per SKU code:
+
+    photos/
+        BRS-1001/front.jpg
+        BRS-1001/side.jpg
+        BRS-1002/top.png
+
+    python ingest_images.py photos --username admin
+    python ingest_images.py new_line --sku BRS-1003 --username admin --report report.json
+"""
+import argparse
+import json
+import sys
+import time
+from typing import Optional, List
+
+from main import BulkIngestJob, bulk_ingestor, directory_items, warmup
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("directory", help="Folder of images, one sub-folder per SKU code")
+    parser.add_argument("--username", required=True, help="Recorded as uploaded_by on every row")
+    parser.add_argument("--sku", help="Use this SKU code for every image instead of folder names")
+    parser.add_argument("--report", help="Write the full per-item report as JSON to this path")
+    args = parser.parse_args(argv)
+
+    items = directory_items(args.directory, args.sku)
+    if not items:
+        print(f"No images found under {args.directory}")
+        return 1
+
+    if not warmup.run():
+        print(f"Startup failed: {warmup.error}")
+        return 1
+
+    print(f"Ingesting {len(items)} images from {args.directory}")
+    started = time.perf_counter()
+    last_report = [0.0]
+
+    def on_progress(job: BulkIngestJob):
+        now = time.perf_counter()
+        if now - last_report[0] < 2 and job.finished_at is None:
+            return
+        last_report[0] = now
+        rate = job.processed / (now - started) if now > started else 0.0
+        print(f"  {job.processed}/{job.total} processed, {len(job.succeeded)} ok, "
+              f"{len(job.errors)} failed ({rate:.1f} images/s)", flush=True)
+
+    job = bulk_ingestor.run(items, BulkIngestJob(len(items), args.username), on_progress=on_progress)
+    result = job.to_dict()
+
+    for error in result["errors"]:
+        print(f"  FAILED {error['item']}: {error['error']}")
+    print(f"{result['status']}: {result['succeeded']} ingested, {result['failed']} failed "
+          f"in {time.perf_counter() - started:.1f}s ({result['message']})")
+
+    if args.report:
+        with open(args.report, "w") as handle:
+            json.dump(result, handle, indent=2)
+        print(f"Report written to {args.report}")
+
+    return 0 if result["status"] == "completed" and not result["failed"] else 2
+
+
+if __name__ == "__main__":
+    sys.exit(main())
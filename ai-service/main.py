@@ -1,30 +1,56 @@
-
-from fastapi import FastAPI, File, UploadFile, Form, HTTPException, Depends, status
+from fastapi import FastAPI, File, UploadFile, Form, HTTPException, Depends, Request, Response, status
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.responses import JSONResponse
+from fastapi.routing import APIRoute
+from fastapi.security import HTTPBasic, HTTPBasicCredentials
 from pydantic import BaseModel, Field
-from typing import Optional, List, Dict, Any
+from typing import Optional, List, Dict, Any, Tuple, Callable, Sequence, Set, BinaryIO
 import os
+import io
+import re
 import json
 import uuid
-import numpy as np
-import pandas as pd
-from PIL import Image
-import torch
-from transformers import CLIPProcessor, CLIPModel
-from datetime import datetime
-import io
-from google.cloud import bigquery
-from google.cloud.exceptions import NotFound
 import base64
+import hashlib
 import logging
+import asyncio
+import queue
+import threading
+import time
+import secrets
+import tempfile
+import shutil
+import zipfile
+import argparse
+import contextvars
+import functools
+import sqlite3
+from collections import Counter, OrderedDict, namedtuple
+from concurrent.futures import Future, ThreadPoolExecutor
+from contextlib import contextmanager
 from dataclasses import dataclass
+from datetime import datetime, timedelta
+from types import SimpleNamespace
+import numpy as np
+import pandas as pd
+from PIL import Image
+from transformers import CLIPProcessor
 import uvicorn
-from fastapi.security import HTTPBasic, HTTPBasicCredentials
-import secrets
-from typing import Tuple
+try:
+    from google.cloud import bigquery
+except ImportError:  # only needed for STORAGE_BACKEND = "bigquery"
+    bigquery = None
+try:
+    import resource
+except ImportError:  # not available on Windows
+    resource = None
+from inference_backends import create_inference_backend
+from image_decode import decode_for_model, read_header, test_time_views, make_thumbnail, VIEWS
+from metrics import MetricsRegistry, BATCH_SIZE_BUCKETS, BYTES_BUCKETS
+from vector_index import EmbeddingIndex, CorrectionIndex, IndexStore, SnapshotError, FUSIONS, encode_embedding, decode_embeddings
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
+MODULE_IMPORTED_AT = time.time()
 
 class Config:
     IMG_SIZE = (224, 224)
@@ -33,8 +59,64 @@ class Config:
     MIN_SIZE = (100, 100)
     MAX_SIZE = (4000, 4000)
     SIMILARITY_THRESHOLD = 0.75
+    CORRECTION_THRESHOLD = 0.9
     CLIP_MODEL_NAME = "openai/clip-vit-base-patch32"
+    CLIP_VISION_ONLY = True  # load just the vision encoder + projection, not the text tower
+    WARMUP_IN_BACKGROUND = True  # serve /health/live at once and report /health/ready when loaded
+    INFERENCE_BACKEND = "torch"  # torch | torch_int8 | onnx; check accuracy with check_backend_parity.py first
+    ONNX_MODEL_PATH = "models/clip_vision.onnx"  # exported on first start when missing
+    ONNX_THREADS = 0  # 0 lets onnxruntime pick
+    IMAGE_DECODER = "auto"  # auto | pil | turbojpeg; auto uses turbojpeg for JPEGs when it is installed
+    EMBEDDING_STORAGE_FORMAT = "float32"  # float64_array (legacy ARRAY<FLOAT64>) | float32 | float16; BigQuery writes float64_array until migrate_embeddings.py has added the blob columns
+    INFERENCE_BATCHING = True
+    INFERENCE_MAX_BATCH_SIZE = 16
+    INFERENCE_BATCH_WINDOW_MS = 5
+    EMBEDDING_CACHE_ENTRIES = 10000  # 0 disables the cache
+    EMBEDDING_CACHE_DISK_PATH = None  # e.g. "embedding_cache" to keep vectors across restarts
+    EMBEDDING_CACHE_DISK_MAX_ENTRIES = 200000
+    SERVER_TIMING_HEADER = False  # per-stage timings in a Server-Timing response header (benchmark_service.py)
+    SLOW_REQUEST_LOG_MS = 2000  # log the stage breakdown and trace id of slower requests; 0 disables
+    INFERENCE_POOL_WORKERS = 16
+    INFERENCE_POOL_MAX_PENDING = 64
+    IO_POOL_WORKERS = 16
+    IO_POOL_MAX_PENDING = 128
+    SKU_CACHE_TTL_SECONDS = 300
+    DATASET_STATS_RECONCILE_SECONDS = 600  # full recount behind /dataset-stats; 0 counts once, then only this process's saves
+    BLOB_STORE_BACKEND = "local"
+    BLOB_STORE_PATH = "image_blobs"
+    INGEST_EMBED_BATCH_SIZE = 32
+    INGEST_WRITE_BATCH_SIZE = 200
+    INGEST_MAX_JOBS_KEPT = 50
+    INGEST_MAX_ZIP_MEMBERS = 10000
+    INGEST_MAX_ZIP_BYTES = 4 * 1024 * 1024 * 1024  # total uncompressed size of the images in one archive
     TOP_K_RESULTS = 3
+    PENDING_FEEDBACK_PAGE_SIZE = 50
+    PENDING_FEEDBACK_MAX_PAGE_SIZE = 200
+    BULK_APPROVAL_MAX_IDS = 1000
+    FEEDBACK_THUMBNAIL_SIZE = 160  # longest side in px of the review-queue thumbnails
+    FEEDBACK_THUMBNAIL_CACHE_MB = 64
+    SEARCH_BATCH_MAX_IMAGES = 64  # images per /search-similar/batch request
+    SEARCH_MAX_VIEWS = 8  # cap on the per-request views parameter of /search-similar (test-time augmentation)
+    SEARCH_VIEW_FUSION = "max"  # max | mean; default fusion of per-view scores
+    SEARCH_VIEW_CROP_FRACTION = 0.8  # zoom and corner views cover this much of the shortest side
+    INDEX_BACKEND = "flat"  # flat | ivf | hnsw; with several workers only flat and ivf share one copy of the index (hnswlib loads the graph per process)
+    SEARCH_PROTOTYPES_PER_SKU = 0  # >0: shortlist SKUs by this many centroids each, then score only their images
+    SEARCH_PROTOTYPE_SHORTLIST = 32  # SKUs re-ranked per query in prototype search; check recall with benchmark_index.py
+    INDEX_STORE_PATH = "index_store"  # index snapshots shared by all workers and reused on restart; None disables
+    INDEX_STORE_KEEP_VERSIONS = 3
+    INDEX_SNAPSHOT_MAX_AGE_HOURS = 24  # older snapshots are rebuilt so deleted or edited rows drop out
+    INDEX_SWAP_CHECK_SECONDS = 2
+    INDEX_REFRESH_SECONDS = 10  # pull rows newer than the watermark once table metadata shows a write; 0 disables
+    INDEX_REFRESH_OVERLAP_SECONDS = 60  # re-read this far behind the watermark for late-committed rows
+    INDEX_DELTA_MAX_ROWS = 2000  # compact the delta segment into the main one past this size
+    IVF_NLIST = 256
+    IVF_NPROBE = 16
+    IVF_TRAIN_ITERS = 10
+    HNSW_M = 16
+    HNSW_EF_CONSTRUCTION = 200
+    HNSW_EF_SEARCH = 64
+    STORAGE_BACKEND = "bigquery"  # bigquery | sqlite (embedded, for offline kiosks and edge boxes)
+    SQLITE_PATH = "borosil_lens.db"
     PROJECT_ID = "borosil-it"
     DATASET_ID = "borosil_lens"
     TABLE_ID = "sku_images"
@@ -47,6 +129,41 @@ class Config:
     FULL_TRAINING_TABLE_ID = f"{PROJECT_ID}.{DATASET_ID}.{TRAINING_TABLE_ID}"
     SERVICE_ACCOUNT_PATH = "borosil-lens.json" 
 
+    @classmethod
+    def index_backend_params(cls) -> Dict[str, Any]:
+        if cls.INDEX_BACKEND == "ivf":
+            return {"nlist": cls.IVF_NLIST, "nprobe": cls.IVF_NPROBE, "train_iters": cls.IVF_TRAIN_ITERS}
+        if cls.INDEX_BACKEND == "hnsw":
+            return {"m": cls.HNSW_M, "ef_construction": cls.HNSW_EF_CONSTRUCTION, "ef_search": cls.HNSW_EF_SEARCH}
+        return {}
+
+    @classmethod
+    def inference_backend_params(cls) -> Dict[str, Any]:
+        if cls.INFERENCE_BACKEND == "onnx":
+            return {"onnx_path": cls.ONNX_MODEL_PATH, "threads": cls.ONNX_THREADS, "vision_only": cls.CLIP_VISION_ONLY}
+        return {"vision_only": cls.CLIP_VISION_ONLY}
+
+ENV_PREFIX = "BOROSIL_LENS_"
+
+def apply_env_overrides(cls, environ=os.environ):
+    """Override scalar Config values from BOROSIL_LENS_<NAME> environment variables, typed like the default"""
+    for key, raw in environ.items():
+        name = key[len(ENV_PREFIX):]
+        if not key.startswith(ENV_PREFIX) or not name.isupper() or not hasattr(cls, name):
+            continue
+        default = getattr(cls, name)
+        if isinstance(default, bool):
+            value = raw.strip().lower() in ("1", "true", "yes", "on")
+        elif isinstance(default, (int, float)):
+            value = type(default)(raw)
+        elif default is None or isinstance(default, str):
+            value = raw
+        else:
+            logger.warning(f"{key} ignored: {name} is not a scalar setting")
+            continue
+        setattr(cls, name, value)
+
+apply_env_overrides(Config)
 config = Config()
 os.environ['GOOGLE_APPLICATION_CREDENTIALS'] = config.SERVICE_ACCOUNT_PATH
 
@@ -73,41 +190,428 @@ class ApprovalRequest(BaseModel):
     feedback_id: str
     admin_name: str
 
+class BulkApprovalRequest(BaseModel):
+    feedback_ids: List[str]
+    admin_name: str
+
 class StatsResponse(BaseResponse):
     pass
 
+metrics = MetricsRegistry("borosil_lens")
+request_seconds = metrics.histogram("request_seconds", "HTTP request latency", ["method", "route", "status"])
+stage_seconds = metrics.histogram("stage_seconds", "Time spent per stage of a request", ["route", "stage"])
+clip_forward_seconds = metrics.histogram("clip_forward_seconds", "CLIP forward pass latency, preprocessing included")
+clip_batch_size = metrics.histogram("clip_batch_size", "Images per CLIP forward pass", buckets=BATCH_SIZE_BUCKETS)
+bigquery_job_seconds = metrics.histogram("bigquery_job_seconds", "BigQuery job latency", ["query"])
+bigquery_bytes_processed = metrics.counter("bigquery_bytes_processed_total", "Bytes processed by BigQuery jobs", ["query"])
+bigquery_bytes_per_query = metrics.histogram("bigquery_bytes_per_query", "Bytes processed per BigQuery job", ["query"],
+                                             buckets=BYTES_BUCKETS)
+
+request_stages: contextvars.ContextVar[Optional[Dict[str, float]]] = contextvars.ContextVar("request_stages", default=None)
+request_trace_id: contextvars.ContextVar[Optional[str]] = contextvars.ContextVar("request_trace_id", default=None)
+TRACEPARENT = re.compile(r"^00-([0-9a-f]{32})-([0-9a-f]{16})-([0-9a-f]{2})$")
+
+@contextmanager
+def stage(name: str):
+    """Add the wall time of the block to the current request's stage timings, if they are being recorded"""
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        stages = request_stages.get()
+        if stages is not None:
+            stages[name] = stages.get(name, 0.0) + time.perf_counter() - started
+
+class StageTimedRoute(APIRoute):
+    """Marks when the endpoint returns, so response serialization can be timed separately"""
+
+    def __init__(self, path: str, endpoint: Callable[..., Any], **kwargs):
+        if asyncio.iscoroutinefunction(endpoint):
+            original = endpoint
+
+            @functools.wraps(original)
+            async def endpoint(*args, **kwargs):
+                try:
+                    return await original(*args, **kwargs)
+                finally:
+                    stages = request_stages.get()
+                    if stages is not None:
+                        stages["_endpoint_done"] = time.perf_counter()
+
+        super().__init__(path, endpoint, **kwargs)
+
+class InferenceBatcher:
+    """Coalesce concurrent feature requests into a single CLIP forward pass"""
+
+    def __init__(self, run_batch, max_batch_size: int, window_ms: float):
+        self.run_batch = run_batch
+        self.max_batch_size = max_batch_size
+        self.window = window_ms / 1000
+        self.queue: "queue.Queue[Tuple[Image.Image, Future]]" = queue.Queue()
+        self._stats_lock = threading.Lock()
+        self.batches = 0
+        self.images = 0
+        self.batch_sizes = Counter()
+        self.max_queue_depth = 0
+        self.last_batch_ms = 0.0
+        self._worker = threading.Thread(target=self._run, name="clip-batcher", daemon=True)
+        self._worker.start()
+
+    def submit(self, image: Image.Image) -> Future:
+        future = Future()
+        self.queue.put((image, future))
+        depth = self.queue.qsize()
+        with self._stats_lock:
+            self.max_queue_depth = max(self.max_queue_depth, depth)
+        return future
+
+    def _collect(self) -> List[Tuple[Image.Image, Future]]:
+        batch = [self.queue.get()]
+        deadline = time.monotonic() + self.window
+        while len(batch) < self.max_batch_size:
+            try:
+                batch.append(self.queue.get_nowait())
+                continue
+            except queue.Empty:
+                pass
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(self.queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return [(image, future) for image, future in batch if future.set_running_or_notify_cancel()]
+
+    def _run(self):
+        while True:
+            batch = self._collect()
+            if not batch:
+                continue
+
+            started = time.perf_counter()
+            try:
+                features = self.run_batch([image for image, _ in batch])
+                for (_, future), vector in zip(batch, features):
+                    future.set_result(vector)
+            except Exception as e:
+                logger.error(f"Batched CLIP inference failed: {e}")
+                for _, future in batch:
+                    future.set_exception(e)
+
+            with self._stats_lock:
+                self.batches += 1
+                self.images += len(batch)
+                self.batch_sizes[len(batch)] += 1
+                self.last_batch_ms = (time.perf_counter() - started) * 1000
+
+    def stats(self) -> Dict[str, Any]:
+        with self._stats_lock:
+            return {
+                "queue_depth": self.queue.qsize(),
+                "max_queue_depth": self.max_queue_depth,
+                "batches": self.batches,
+                "images": self.images,
+                "avg_batch_size": round(self.images / self.batches, 2) if self.batches else 0.0,
+                "batch_size_histogram": dict(sorted(self.batch_sizes.items())),
+                "last_batch_ms": round(self.last_batch_ms, 2),
+                "max_batch_size": self.max_batch_size,
+                "window_ms": self.window * 1000
+            }
+
+class PoolSaturatedError(HTTPException):
+    """Raised when an execution pool already holds its maximum number of pending jobs"""
+
+    def __init__(self, pool_name: str):
+        super().__init__(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail=f"Server busy: {pool_name} queue is full, please retry shortly",
+            headers={"Retry-After": "1"}
+        )
+
+class ExecutionPool:
+    """Bounded thread pool that keeps blocking work off the event loop"""
+
+    def __init__(self, name: str, workers: int, max_pending: int):
+        self.name = name
+        self.workers = workers
+        self.max_pending = max_pending
+        self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix=f"{name}-pool")
+        self._slots = threading.BoundedSemaphore(max_pending)
+        self._stats_lock = threading.Lock()
+        self.pending = 0
+        self.completed = 0
+        self.rejected = 0
+
+    def _release(self, _future: Future):
+        with self._stats_lock:
+            self.pending -= 1
+            self.completed += 1
+        self._slots.release()
+
+    async def run(self, fn, *args, **kwargs):
+        if not self._slots.acquire(blocking=False):
+            with self._stats_lock:
+                self.rejected += 1
+            logger.warning(f"{self.name} pool saturated ({self.max_pending} pending), rejecting request")
+            raise PoolSaturatedError(self.name)
+
+        with self._stats_lock:
+            self.pending += 1
+        future = self.executor.submit(contextvars.copy_context().run, fn, *args, **kwargs)
+        future.add_done_callback(self._release)
+        return await asyncio.wrap_future(future)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._stats_lock:
+            return {
+                "workers": self.workers,
+                "max_pending": self.max_pending,
+                "pending": self.pending,
+                "completed": self.completed,
+                "rejected": self.rejected
+            }
+
+class EmbeddingCache:
+    """Embeddings keyed by the SHA-256 of the image bytes: in-memory LRU plus an optional on-disk tier"""
+
+    def __init__(self, max_entries: int, namespace: str, disk_path: Optional[str] = None,
+                 disk_max_entries: int = 0):
+        self.max_entries = max_entries
+        self.entries: "OrderedDict[str, np.ndarray]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.disk_dir = None
+        self.disk_max_entries = disk_max_entries
+        self.disk_entries = 0
+        if disk_path:
+            # Vectors from another model must never be served, so each model gets its own folder
+            self.disk_dir = os.path.join(disk_path, hashlib.sha1(namespace.encode("utf-8")).hexdigest()[:16])
+            os.makedirs(self.disk_dir, exist_ok=True)
+            self.disk_entries = sum(len(files) for _, _, files in os.walk(self.disk_dir))
+
+    @staticmethod
+    def key(image_bytes: bytes) -> str:
+        return hashlib.sha256(image_bytes).hexdigest()
+
+    def _disk_path(self, key: str) -> str:
+        return os.path.join(self.disk_dir, key[:2], f"{key}.npy")
+
+    def get(self, key: str) -> Optional[np.ndarray]:
+        with self._lock:
+            vector = self.entries.get(key)
+            if vector is not None:
+                self.entries.move_to_end(key)
+                self.hits += 1
+                return vector
+
+        if self.disk_dir:
+            try:
+                vector = np.load(self._disk_path(key))
+                vector.setflags(write=False)
+                self._remember(key, vector)
+                with self._lock:
+                    self.disk_hits += 1
+                return vector
+            except (FileNotFoundError, ValueError, OSError):
+                pass
+
+        with self._lock:
+            self.misses += 1
+        return None
+
+    def _remember(self, key: str, vector: np.ndarray):
+        with self._lock:
+            self.entries[key] = vector
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+                self.evictions += 1
+
+    def put(self, key: str, vector: np.ndarray):
+        vector = np.array(vector, dtype=np.float32)
+        vector.setflags(write=False)
+        self._remember(key, vector)
+
+        if self.disk_dir:
+            path = self._disk_path(key)
+            if os.path.exists(path):
+                return
+            try:
+                os.makedirs(os.path.dirname(path), exist_ok=True)
+                tmp_path = f"{path}.{threading.get_ident()}.tmp"
+                with open(tmp_path, 'wb') as handle:
+                    np.save(handle, vector)
+                os.replace(tmp_path, path)
+                with self._lock:
+                    self.disk_entries += 1
+                    over_cap = self.disk_entries > self.disk_max_entries
+                if over_cap:
+                    self._prune_disk()
+            except OSError as e:
+                logger.error(f"Embedding cache disk write failed: {e}")
+
+    def _prune_disk(self):
+        """Drop the oldest tenth of the disk tier once it exceeds its cap"""
+        files = []
+        for folder, _, filenames in os.walk(self.disk_dir):
+            for filename in filenames:
+                path = os.path.join(folder, filename)
+                try:
+                    files.append((os.path.getmtime(path), path))
+                except OSError:
+                    continue
+
+        files.sort()
+        target = max(0, len(files) - int(self.disk_max_entries * 0.9))
+        for _, path in files[:target]:
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+        with self._lock:
+            self.disk_entries = len(files) - target
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self.hits + self.disk_hits + self.misses
+            return {
+                "entries": len(self.entries),
+                "max_entries": self.max_entries,
+                "hits": self.hits,
+                "disk_hits": self.disk_hits,
+                "misses": self.misses,
+                "hit_rate": round((self.hits + self.disk_hits) / lookups, 4) if lookups else 0.0,
+                "evictions": self.evictions,
+                "disk_entries": self.disk_entries if self.disk_dir else None
+            }
+
 class CLIPFeatureExtractor:
     """Extract features from images using CLIP model"""
 
     def __init__(self):
-        self.model = None
+        self.backend = None
         self.processor = None
-        self.device = None
-        self.load_model()
+        self.input_size = 224
+        self.batcher = None
+        self.cache = None
+        if config.EMBEDDING_CACHE_ENTRIES > 0:
+            self.cache = EmbeddingCache(
+                config.EMBEDDING_CACHE_ENTRIES,
+                namespace=f"{config.CLIP_MODEL_NAME}:{config.INFERENCE_BACKEND}",
+                disk_path=config.EMBEDDING_CACHE_DISK_PATH,
+                disk_max_entries=config.EMBEDDING_CACHE_DISK_MAX_ENTRIES
+            )
+        if config.INFERENCE_BATCHING:
+            self.batcher = InferenceBatcher(
+                self.extract_features_batch,
+                config.INFERENCE_MAX_BATCH_SIZE,
+                config.INFERENCE_BATCH_WINDOW_MS
+            )
 
     def load_model(self):
         try:
-            self.device = torch.device("cuda" if torch.cuda.is_available() else "cpu")
-            self.model = CLIPModel.from_pretrained(config.CLIP_MODEL_NAME)
+            self.backend = create_inference_backend(
+                config.INFERENCE_BACKEND, config.CLIP_MODEL_NAME, **config.inference_backend_params()
+            )
             self.processor = CLIPProcessor.from_pretrained(config.CLIP_MODEL_NAME)
-            self.model = self.model.to(self.device)
-            self.model.eval()
-            logger.info(f"CLIP model loaded successfully on {self.device}")
+            image_processor = getattr(self.processor, "image_processor", self.processor)
+            resize = getattr(image_processor, "size", None) or {}
+            self.input_size = resize.get("shortest_edge", self.input_size)
+            logger.info(f"CLIP model loaded successfully ({self.backend.name} backend on {self.backend.device})")
         except Exception as e:
             logger.error(f"CLIP model loading failed: {e}")
             raise
 
-    def extract_features_from_bytes(self, image_bytes: bytes) -> Optional[np.ndarray]:
+    def extract_features_batch(self, images: List[Image.Image]) -> np.ndarray:
+        """One forward pass over a list of RGB images; rows are L2-normalized"""
+        started = time.perf_counter()
+        inputs = self.processor(images=images, return_tensors="pt")
+        image_features = self.backend.embed(inputs["pixel_values"])
+        clip_forward_seconds.observe(time.perf_counter() - started)
+        clip_batch_size.observe(len(images))
+        return image_features / np.linalg.norm(image_features, axis=-1, keepdims=True)
+
+    def decode(self, image_bytes: bytes) -> Image.Image:
+        """Decode straight to the processor's input scale instead of full resolution"""
+        return decode_for_model(image_bytes, self.input_size, config.IMAGE_DECODER)
+
+    def extract_view_features(self, image_bytes: bytes, views: int) -> Optional[np.ndarray]:
+        """Embeddings (one row per view) of crops and flips of one image, from a single batched forward pass"""
         try:
-            image = Image.open(io.BytesIO(image_bytes)).convert('RGB')
-            inputs = self.processor(images=image, return_tensors="pt")
-            inputs = {k: v.to(self.device) for k, v in inputs.items()}
+            with stage("embedding_cache"):
+                cache_key = f"{self.cache.key(image_bytes)}-views{views}" if self.cache else None
+                cached = self.cache.get(cache_key) if cache_key else None
+            if cached is not None:
+                return cached
+
+            with stage("decode"):
+                # decoded larger so the zoom and corner crops still cover the model input
+                min_side = round(self.input_size / config.SEARCH_VIEW_CROP_FRACTION)
+                image = decode_for_model(image_bytes, min_side, config.IMAGE_DECODER)
+                crops = test_time_views(image, views, config.SEARCH_VIEW_CROP_FRACTION)
+            with stage("inference"):
+                features = self.extract_features_batch(crops)
+
+            if cache_key:
+                self.cache.put(cache_key, features)
+            return features
+        except Exception as e:
+            logger.error(f"CLIP multi-view feature extraction failed: {e}")
+            return None
+
+    def extract_features_many(self, images_bytes: List[bytes]) -> List[Optional[np.ndarray]]:
+        """Embeddings of many images: cache hits are skipped and the rest share one forward pass;
+        None for an image that cannot be decoded"""
+        features: List[Optional[np.ndarray]] = [None] * len(images_bytes)
+        with stage("embedding_cache"):
+            keys = [self.cache.key(image_bytes) for image_bytes in images_bytes] if self.cache else [None] * len(images_bytes)
+            for i, key in enumerate(keys):
+                if key:
+                    features[i] = self.cache.get(key)
+
+        decoded, positions = [], []
+        with stage("decode"):
+            for i, image_bytes in enumerate(images_bytes):
+                if features[i] is not None:
+                    continue
+                try:
+                    decoded.append(self.decode(image_bytes))
+                    positions.append(i)
+                except Exception as e:
+                    logger.error(f"Decode failed for batch image {i}: {e}")
 
-            with torch.no_grad():
-                image_features = self.model.get_image_features(**inputs)
-                image_features = image_features / image_features.norm(dim=-1, keepdim=True)
+        if decoded:
+            with stage("inference"):
+                vectors = self.extract_features_batch(decoded)
+            for i, vector in zip(positions, vectors):
+                features[i] = vector
+                if keys[i]:
+                    self.cache.put(keys[i], vector)
+        return features
 
-            return image_features.cpu().numpy().flatten()
+    def extract_features_from_bytes(self, image_bytes: bytes) -> Optional[np.ndarray]:
+        try:
+            with stage("embedding_cache"):
+                cache_key = self.cache.key(image_bytes) if self.cache else None
+                cached = self.cache.get(cache_key) if cache_key else None
+            if cached is not None:
+                return cached
+
+            with stage("decode"):
+                image = self.decode(image_bytes)
+            with stage("inference"):
+                if self.batcher:
+                    features = self.batcher.submit(image).result()
+                else:
+                    features = self.extract_features_batch([image])[0]
+
+            if cache_key:
+                self.cache.put(cache_key, features)
+            return features
         except Exception as e:
             logger.error(f"CLIP feature extraction failed: {e}")
             return None
@@ -117,472 +621,2127 @@ class ImageValidator:
 
     @staticmethod
     def validate_image_bytes(image_bytes: bytes) -> Tuple[bool, str]:
-        try:
-            if len(image_bytes) > config.MAX_FILE_SIZE:
-                return False, f"File too large. Max: {config.MAX_FILE_SIZE//1024//1024}MB"
+        with stage("validate"):
+            try:
+                if len(image_bytes) > config.MAX_FILE_SIZE:
+                    return False, f"File too large. Max: {config.MAX_FILE_SIZE//1024//1024}MB"
 
-            with Image.open(io.BytesIO(image_bytes)) as img:
-                width, height = img.size
+                # Header only: the pixels are decoded once, later, at model input scale
+                _, width, height = read_header(image_bytes)
                 if width < config.MIN_SIZE[0] or height < config.MIN_SIZE[1]:
                     return False, f"Image too small. Min: {config.MIN_SIZE}"
                 if width > config.MAX_SIZE[0] or height > config.MAX_SIZE[1]:
                     return False, f"Image too large. Max: {config.MAX_SIZE}"
 
-            return True, "Valid image"
-        except Exception as e:
-            return False, f"Validation error: {e}"
+                return True, "Valid image"
+            except Exception as e:
+                return False, f"Validation error: {e}"
 
-class BigQueryDatasetManager:
-    """Manage BigQuery database operations"""
+class BlobStore:
+    """Content-addressed image storage keyed by the SHA-256 of the bytes"""
 
-    def __init__(self):
-        self.client = None
-        self.init_client()
+    @staticmethod
+    def digest(data: bytes) -> str:
+        return hashlib.sha256(data).hexdigest()
+
+    @staticmethod
+    def is_digest(value: str) -> bool:
+        return len(value) == 64 and all(c in "0123456789abcdef" for c in value)
+
+    def put(self, data: bytes) -> str:
+        raise NotImplementedError
+
+    def get(self, digest: str) -> Optional[bytes]:
+        raise NotImplementedError
+
+    def exists(self, digest: str) -> bool:
+        raise NotImplementedError
 
-    def init_client(self):
+class LocalBlobStore(BlobStore):
+    """Blobs as files under root/<2 hex>/<2 hex>/<digest>"""
+
+    def __init__(self, root: str):
+        # Directories are created by the first put, so importing the app touches no disk
+        self.root = root
+
+    def _path(self, digest: str) -> str:
+        if not self.is_digest(digest):
+            raise ValueError(f"Invalid blob digest: {digest}")
+        return os.path.join(self.root, digest[:2], digest[2:4], digest)
+
+    def put(self, data: bytes) -> str:
+        digest = self.digest(data)
+        path = self._path(digest)
+        if os.path.exists(path):
+            return digest
+
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), prefix=".tmp-")
         try:
-            self.client = bigquery.Client(project=config.PROJECT_ID)
-            query = "SELECT 1 as test"
-            test_job = self.client.query(query)
-            list(test_job.result())
-            logger.info("BigQuery client initialized successfully")
-        except Exception as e:
-            logger.error(f"BigQuery client initialization failed: {e}")
-            self.client = None
+            with os.fdopen(fd, 'wb') as handle:
+                handle.write(data)
+            os.replace(tmp_path, path)
+        except Exception:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+        return digest
 
-    def validate_sku_code(self, sku_code: str) -> Tuple[bool, Optional[str]]:
-        """Validate SKU code against master table"""
-        if not self.client:
-            return False, None
+    def get(self, digest: str) -> Optional[bytes]:
+        try:
+            with open(self._path(digest), 'rb') as handle:
+                return handle.read()
+        except (FileNotFoundError, ValueError):
+            return None
 
+    def exists(self, digest: str) -> bool:
         try:
-            query = f"""
-            SELECT description
-            FROM `{config.FULL_MASTER_TABLE_ID}`
-            WHERE sku_code = @sku_code
-            LIMIT 1
-            """
+            return os.path.exists(self._path(digest))
+        except ValueError:
+            return False
 
-            job_config = bigquery.QueryJobConfig(
-                query_parameters=[
-                    bigquery.ScalarQueryParameter("sku_code", "STRING", sku_code.strip())
-                ]
+def create_blob_store() -> BlobStore:
+    if config.BLOB_STORE_BACKEND == "local":
+        return LocalBlobStore(config.BLOB_STORE_PATH)
+    raise ValueError(f"Unknown BLOB_STORE_BACKEND '{config.BLOB_STORE_BACKEND}'")
+
+class ThumbnailCache:
+    """LRU of encoded thumbnails bounded by total bytes; feedback images never change, so entries never go stale"""
+
+    def __init__(self, max_bytes: int):
+        self.max_bytes = max_bytes
+        self.entries: "OrderedDict[str, bytes]" = OrderedDict()
+        self.size = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: str) -> Optional[bytes]:
+        with self._lock:
+            data = self.entries.get(key)
+            if data is None:
+                self.misses += 1
+                return None
+            self.entries.move_to_end(key)
+            self.hits += 1
+            return data
+
+    def put(self, key: str, data: bytes):
+        if len(data) > self.max_bytes:
+            return
+        with self._lock:
+            previous = self.entries.pop(key, None)
+            if previous is not None:
+                self.size -= len(previous)
+            self.entries[key] = data
+            self.size += len(data)
+            while self.size > self.max_bytes:
+                _, evicted = self.entries.popitem(last=False)
+                self.size -= len(evicted)
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {"entries": len(self.entries), "bytes": self.size, "hits": self.hits, "misses": self.misses}
+
+def encode_feedback_cursor(complaint_time: datetime, feedback_id: str) -> str:
+    """Opaque keyset cursor for the pending-feedback listing: the last row's sort key"""
+    raw = f"{complaint_time.isoformat(timespec='microseconds')}|{feedback_id}"
+    return base64.urlsafe_b64encode(raw.encode("utf-8")).decode("ascii").rstrip("=")
+
+def decode_feedback_cursor(cursor: str) -> Tuple[datetime, str]:
+    """Inverse of encode_feedback_cursor; raises ValueError on anything malformed"""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)).decode("utf-8")
+        complaint_time, feedback_id = raw.split("|", 1)
+        return datetime.fromisoformat(complaint_time), feedback_id
+    except Exception as e:
+        raise ValueError(f"Invalid cursor: {cursor}") from e
+
+SkuCatalog = namedtuple("SkuCatalog", ["descriptions", "payload", "etag", "count", "refreshed_at"])
+
+class SkuCatalogCache:
+    """Process-local copy of the master table for O(1) SKU validation and a pre-serialized /sku-list body"""
+
+    def __init__(self, loader: Callable[[], Optional[List[Tuple[str, str]]]],
+                 version_probe: Callable[[], Optional[str]], ttl_seconds: float):
+        self.loader = loader
+        self.version_probe = version_probe
+        self.ttl_seconds = ttl_seconds
+        self.catalog: Optional[SkuCatalog] = None
+        self.source_version: Optional[str] = None
+        self.checked_at = 0.0
+        self.refreshes = 0
+        # Point lookups made since the last TTL check: codes found in storage but not yet in the
+        # catalog, and codes storage confirmed absent. Both are dropped at the next TTL check.
+        self.extras: Dict[str, str] = {}
+        self.misses: Set[str] = set()
+        self._refresh_lock = threading.Lock()
+
+    def _is_stale(self) -> bool:
+        return self.catalog is None or time.monotonic() - self.checked_at > self.ttl_seconds
+
+    def invalidate(self):
+        """Force the next access to reload from the master table"""
+        self.checked_at = 0.0
+        self.source_version = None
+        self.extras = {}
+        self.misses = set()
+
+    def remember(self, found: Dict[str, str], missing: Set[str]):
+        """Record the outcome of a storage lookup for codes the catalog did not hold"""
+        self.extras = {**self.extras, **found}
+        self.misses = self.misses | missing
+
+    def refresh(self, force: bool = False) -> bool:
+        with self._refresh_lock:
+            if not force and not self._is_stale():
+                return True
+
+            self.extras = {}
+            self.misses = set()
+            version = self.version_probe()
+            if not force and self.catalog is not None and version and version == self.source_version:
+                self.checked_at = time.monotonic()
+                return True
+
+            rows = self.loader()
+            if rows is None:
+                return self.catalog is not None
+
+            skus = [{"sku_code": code, "description": description} for code, description in sorted(rows, key=lambda row: row[0])]
+            payload = json.dumps({
+                "success": True,
+                "message": f"Retrieved {len(skus)} SKUs successfully",
+                "data": {
+                    "skus": skus,
+                    "total_count": len(skus)
+                }
+            }, separators=(",", ":")).encode("utf-8")
+
+            self.catalog = SkuCatalog(
+                descriptions={code: description for code, description in rows},
+                payload=payload,
+                etag=f'"{hashlib.sha1(payload).hexdigest()}"',
+                count=len(skus),
+                refreshed_at=datetime.now()
             )
+            self.source_version = version
+            self.checked_at = time.monotonic()
+            self.refreshes += 1
+            logger.info(f"SKU cache loaded {len(skus)} SKUs")
+            return True
 
-            result = list(self.client.query(query, job_config=job_config).result())
+    def get(self) -> Optional[SkuCatalog]:
+        if self._is_stale():
+            self.refresh()
+        return self.catalog
 
-            if result:
-                return True, result[0].description
-            else:
-                return False, None
+    def lookup(self, sku_code: str) -> Optional[str]:
+        catalog = self.get()
+        return catalog.descriptions.get(sku_code) if catalog else None
 
-        except Exception as e:
-            logger.error(f"SKU validation failed: {e}")
+    def stats(self) -> Dict[str, Any]:
+        catalog = self.catalog
+        return {
+            "sku_count": catalog.count if catalog else 0,
+            "etag": catalog.etag if catalog else None,
+            "refreshed_at": catalog.refreshed_at.isoformat() if catalog else None,
+            "refreshes": self.refreshes,
+            "ttl_seconds": self.ttl_seconds
+        }
+
+class DatasetStats:
+    """Per-SKU image counts kept current by the save path and reconciled against storage in the background.
+
+    Saves made by other workers, or while a reconcile query runs, show up at the next reconcile.
+    """
+
+    HISTOGRAM_EDGES = (1, 2, 5, 10, 20, 50)  # images per SKU: 0, 1, 2-4, 5-9, 10-19, 20-49, 50+
+
+    def __init__(self, loader: Callable[[], Optional[List[Tuple[str, int, int]]]],
+                 catalog: Callable[[], Optional[SkuCatalog]], reconcile_seconds: float):
+        self.loader = loader
+        self.catalog = catalog
+        self.reconcile_seconds = reconcile_seconds
+        self.per_sku: Counter = Counter()
+        self.clip_records = 0
+        self.reconciled_at: Optional[datetime] = None
+        self.updated_at: Optional[datetime] = None
+        self.reconciles = 0
+        self.last_drift = 0
+        self._lock = threading.Lock()
+        self._reconcile_lock = threading.Lock()
+        self._thread = None
+
+    def reconcile(self) -> bool:
+        """Replace the counters with a fresh GROUP BY over sku_images"""
+        with self._reconcile_lock:
+            rows = self.loader()
+            if rows is None:
+                return False
+
+            per_sku = Counter({sku_code: int(images) for sku_code, images, _ in rows if images})
+            clip_records = sum(int(clip_images or 0) for _, _, clip_images in rows)
+            with self._lock:
+                drift = sum(per_sku.values()) - sum(self.per_sku.values())
+                self.per_sku, self.clip_records = per_sku, clip_records
+                self.reconciled_at = self.updated_at = datetime.now()
+                self.reconciles += 1
+                self.last_drift = drift if self.reconciles > 1 else 0
+            if self.last_drift:
+                logger.info(f"Dataset stats reconciled with a drift of {self.last_drift} records")
+            return True
+
+    def record(self, sku_code: str, has_embedding: bool):
+        with self._lock:
+            if self.reconciled_at is None:
+                return  # the first reconcile will count it
+            self.per_sku[sku_code] += 1
+            self.clip_records += int(has_embedding)
+            self.updated_at = datetime.now()
+
+    def start(self):
+        """Background thread reconciling every reconcile_seconds; the first pass runs at once"""
+        if self._thread or not self.reconcile_seconds:
+            return
+
+        def run():
+            while True:
+                try:
+                    self.reconcile()
+                except Exception as e:
+                    logger.error(f"Dataset stats reconcile failed: {e}")
+                time.sleep(self.reconcile_seconds)
+
+        self._thread = threading.Thread(target=run, name="dataset-stats", daemon=True)
+        self._thread.start()
+
+    def _histogram(self, counts: List[int]) -> Dict[str, int]:
+        edges = (0,) + self.HISTOGRAM_EDGES
+        labels = [str(low) if high - low == 1 else f"{low}-{high - 1}" for low, high in zip(edges, edges[1:])]
+        labels.append(f"{edges[-1]}+")
+        slots = np.searchsorted(np.asarray(self.HISTOGRAM_EDGES), np.asarray(counts, dtype=np.int64), side='right')
+        return dict(zip(labels, np.bincount(slots, minlength=len(labels)).tolist()))
+
+    def snapshot(self) -> Optional[Dict[str, Any]]:
+        if self.reconciled_at is None and not self.reconcile():
+            return None
+
+        with self._lock:
+            per_sku = dict(self.per_sku)
+            clip_records, reconciled_at, updated_at = self.clip_records, self.reconciled_at, self.updated_at
+
+        catalog = self.catalog()
+        master = catalog.descriptions if catalog else {}
+        # Master SKUs without a photo count as 0; SKUs no longer in the master list still count
+        coverage = [per_sku.get(sku_code, 0) for sku_code in master] + \
+            [count for sku_code, count in per_sku.items() if sku_code not in master]
+        return {
+            'total_records': sum(per_sku.values()),
+            'unique_skus': len(per_sku),
+            'clip_records': clip_records,
+            'master_skus': len(master),
+            'master_skus_with_images': sum(1 for sku_code in master if per_sku.get(sku_code)),
+            'images_per_sku_histogram': self._histogram(coverage),
+            'reconciled_at': reconciled_at.isoformat(),
+            'updated_at': updated_at.isoformat(),
+            'age_seconds': round((datetime.now() - reconciled_at).total_seconds(), 1),
+        }
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "reconciled_at": self.reconciled_at.isoformat() if self.reconciled_at else None,
+            "reconciles": self.reconciles,
+            "last_drift": self.last_drift,
+            "reconcile_seconds": self.reconcile_seconds
+        }
+
+class StorageBackend:
+    """Storage-independent dataset logic: search index, corrections, SKU cache and blob store.
+
+    Subclasses implement the primitive reads and writes against their database;
+    everything the API calls lives here and behaves the same on every backend.
+    """
+
+    name = "base"
+
+    # False while the tables still only have the legacy ARRAY<FLOAT64> embedding columns
+    embedding_blobs = True
+    # False while sku_images still keeps base64 image_data instead of image_sha256
+    image_blobs = True
+
+    def __init__(self):
+        self.index = EmbeddingIndex(config.INDEX_BACKEND, config.index_backend_params(),
+                                    config.SEARCH_PROTOTYPES_PER_SKU, config.SEARCH_PROTOTYPE_SHORTLIST)
+        self.corrections = CorrectionIndex()
+        self.blob_store = create_blob_store()
+        self.index_store = IndexStore(config.INDEX_STORE_PATH, config.INDEX_STORE_KEEP_VERSIONS) \
+            if config.INDEX_STORE_PATH else None
+        self.index_version: Optional[str] = None
+        self._index_maintenance = None
+        # Table versions already read by the delta refreshes, keyed "index" / "corrections"
+        self._delta_versions: Dict[str, Optional[str]] = {}
+        self.sku_cache = SkuCatalogCache(self._fetch_master_rows, self._master_table_version, config.SKU_CACHE_TTL_SECONDS)
+        self.thumbnails = ThumbnailCache(config.FEEDBACK_THUMBNAIL_CACHE_MB * 1024 * 1024)
+        self.dataset_stats = DatasetStats(self._load_sku_image_counts, self.sku_cache.get, config.DATASET_STATS_RECONCILE_SECONDS)
+
+    # Primitives implemented by each backend
+
+    @property
+    def available(self) -> bool:
+        raise NotImplementedError
+
+    def connect(self):
+        raise NotImplementedError
+
+    def _fetch_master_rows(self) -> Optional[List[Tuple[str, str]]]:
+        raise NotImplementedError
+
+    def _master_table_version(self) -> Optional[str]:
+        raise NotImplementedError
+
+    def _index_table_version(self) -> Optional[str]:
+        raise NotImplementedError
+
+    def _corrections_table_version(self) -> Optional[str]:
+        raise NotImplementedError
+
+    def _query_sku_codes(self, sku_codes: List[str]) -> Optional[Dict[str, str]]:
+        raise NotImplementedError
+
+    def _insert_record(self, row: Dict[str, Any]):
+        raise NotImplementedError
+
+    def _insert_records(self, rows: List[Dict[str, Any]]):
+        raise NotImplementedError
+
+    def _fetch_index_rows(self, since: Optional[datetime] = None) -> List[Any]:
+        """sku_images rows with an embedding, processed after since (all when None), newest first"""
+        raise NotImplementedError
+
+    def _fetch_corrections(self, since: Optional[datetime] = None) -> List[Any]:
+        """feedback_training rows created after since (all when None), oldest first"""
+        raise NotImplementedError
+
+    def _insert_feedback(self, row: Dict[str, Any]):
+        raise NotImplementedError
+
+    def _fetch_pending_feedback(self, limit: int, after: Optional[Tuple[datetime, str]] = None) -> List[Any]:
+        """Pending rows without image_data, newest first by (complaint_time, feedback_id), strictly after the key"""
+        raise NotImplementedError
+
+    def _count_pending_feedback(self) -> int:
+        raise NotImplementedError
+
+    def _fetch_feedback_image(self, feedback_id: str) -> Optional[str]:
+        """The base64 image_data of one feedback row"""
+        raise NotImplementedError
+
+    def _fetch_feedback_rows(self, feedback_ids: List[str]) -> List[Any]:
+        """feedback_id, status, correct_sku and the embedding columns of the given feedback rows"""
+        raise NotImplementedError
+
+    def _record_approvals(self, feedback_ids: List[str], admin_name: str, approved_at: datetime) -> List[str]:
+        """Mark the still-pending rows approved and copy them into feedback_training, set-based and
+        atomically; returns the IDs the status update changed"""
+        raise NotImplementedError
+
+    def _sku_image_counts(self) -> List[Tuple[str, int, int]]:
+        """(sku_code, images, images with a blob or a non-empty float array) for every SKU in sku_images"""
+        raise NotImplementedError
+
+    # Shared behaviour
+
+    def validate_sku_code(self, sku_code: str) -> Tuple[bool, Optional[str]]:
+        """Validate SKU code against master table"""
+        with stage("sku_lookup"):
+            found = self.validate_sku_codes([sku_code])
+        if not found:
             return False, None
+        return True, found[sku_code.strip()]
+
+    def validate_sku_codes(self, sku_codes: List[str]) -> Optional[Dict[str, str]]:
+        """Look up many SKU codes; returns descriptions of the codes that exist, None on failure.
+
+        Codes are answered from the SKU cache; codes missing from it (e.g. added to the master
+        table since the last refresh) are checked against storage in one query, and the answer
+        is remembered until the cache's next TTL check so repeated misses stay in memory.
+        """
+        if not self.available:
+            return None
+
+        codes = {code.strip() for code in sku_codes}
+        cache = self.sku_cache
+        catalog = cache.get()
+        descriptions = catalog.descriptions if catalog else {}
+        extras = cache.extras
+        found = {}
+        for code in codes:
+            if code in descriptions:
+                found[code] = descriptions[code]
+            elif code in extras:
+                found[code] = extras[code]
+        missing = codes - set(found) - cache.misses
+        if not missing:
+            return found
+
+        queried = self._query_sku_codes(list(missing))
+        if queried is None:
+            return None if not found and catalog is None else found
+        cache.remember(queried, missing - set(queried))
+        found.update(queried)
+        return found
 
     def get_sku_list(self) -> Dict[str, Any]:
         """Get list of all SKUs from master table"""
-        if not self.client:
-            logger.error("BigQuery client not available")
+        if not self.available:
+            logger.error(f"{self.name} storage not available")
             return {
                 "success": False,
                 "message": "Database connection not available",
                 "data": None
             }
 
-        try:
-            query = f"""
-            SELECT sku_code, description
-            FROM `{config.FULL_MASTER_TABLE_ID}`
-            ORDER BY sku_code
-            """
-
-            query_job = self.client.query(query)
-            results = []
-
-            for row in query_job.result():
-                results.append({
-                    "sku_code": row.sku_code,
-                    "description": row.description
-                })
-
-            logger.info(f"Retrieved {len(results)} SKUs from master table")
-            return {
-                "success": True,
-                "message": f"Retrieved {len(results)} SKUs successfully",
-                "data": {
-                    "skus": results,
-                    "total_count": len(results)
-                }
-            }
-
-        except Exception as e:
-            logger.error(f"Get SKU list failed: {e}")
+        catalog = self.sku_cache.get()
+        if catalog is None:
             return {
                 "success": False,
-                "message": f"Failed to retrieve SKU list: {str(e)}",
+                "message": "Failed to retrieve SKU list",
                 "data": None
             }
 
+        return json.loads(catalog.payload)
+
+    def _embedding_columns(self, features: np.ndarray) -> Tuple[List[float], Optional[bytes], Optional[str]]:
+        """(float array, packed blob, version tag) to store for one embedding, per EMBEDDING_STORAGE_FORMAT"""
+        if config.EMBEDDING_STORAGE_FORMAT == "float64_array" or not self.embedding_blobs:
+            return np.asarray(features).tolist(), None, None
+        blob, tag = encode_embedding(features, config.EMBEDDING_STORAGE_FORMAT)
+        return [], blob, tag
+
+    def _prepare_record(self, record_data: Dict[str, Any], username: str) -> Dict[str, Any]:
+        """Column values for one sku_images row"""
+        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+
+        _, width, height = read_header(record_data['image_bytes'])
+
+        clip_features, clip_embedding, embedding_format = self._embedding_columns(record_data['features'])
+        image_sha256 = self.blob_store.put(record_data['image_bytes'])
+
+        row = {
+            'id': record_data['id'],
+            'sku_code': record_data['sku_code'],
+            'image_name': f"{record_data['sku_code']}_{timestamp}.jpg",
+            'image_sha256': image_sha256,
+            'file_size': len(record_data['image_bytes']),
+            'width': width,
+            'height': height,
+            'processed_at': datetime.now(),
+            'clip_features': clip_features,
+            'clip_embedding': clip_embedding,
+            'embedding_format': embedding_format,
+            'uploaded_by': username,
+        }
+        if not self.image_blobs:
+            # The table cannot record the hash yet; keep the image in the row as before migrate_image_blobs.py
+            row['image_sha256'] = None
+            row['image_data'] = base64.b64encode(record_data['image_bytes']).decode('utf-8')
+        return row
+
+    def _index_record(self, row: Dict[str, Any], features: np.ndarray):
+        self.index.add(row['id'], row['sku_code'], features, {
+            'id': row['id'],
+            'sku_code': row['sku_code'],
+            'image_name': row['image_name'],
+            'image_sha256': row['image_sha256'],
+            'file_size': row['file_size'],
+            'width': row['width'],
+            'height': row['height'],
+            'uploaded_by': row['uploaded_by'],
+        })
+
+    @staticmethod
+    def _has_stored_embedding(row: Dict[str, Any]) -> bool:
+        """The clip_images predicate of _sku_image_counts, applied to a row about to be written, so
+        saves and reconciles count the same rows"""
+        return row['clip_embedding'] is not None or len(row['clip_features'] or []) > 0
+
     def save_record(self, record_data: Dict[str, Any], username: str) -> bool:
-        if not self.client:
-            logger.error("BigQuery client not available")
+        if not self.available:
+            logger.error(f"{self.name} storage not available")
             return False
 
         try:
-            timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-            filename = f"{record_data['sku_code']}_{timestamp}.jpg"
+            row = self._prepare_record(record_data, username)
+            with stage("storage_write"):
+                self._insert_record(row)
+            logger.info(f"Successfully saved record: {record_data['id']}")
+        except Exception as e:
+            logger.error(f"Direct insert failed: {e}")
+            return False
 
-            with Image.open(io.BytesIO(record_data['image_bytes'])) as img:
-                width, height = img.size
+        self.dataset_stats.record(row['sku_code'], self._has_stored_embedding(row))
+        self._index_record(row, record_data['features'])
+        return True
 
-            image_b64 = base64.b64encode(record_data['image_bytes']).decode('utf-8')
-            features_list = record_data['features'].tolist()
+    def save_records_bulk(self, records: List[Dict[str, Any]], username: str) -> Dict[str, Optional[str]]:
+        """Append many records in chunks instead of one insert each.
 
-            insert_query = f"""
-            INSERT INTO `{config.FULL_TABLE_ID}`
-            (id, sku_code, image_name, image_data, file_size, width, height, processed_at, clip_features, uploaded_by)
-            VALUES
-            (@id, @sku_code, @image_name, @image_data, @file_size, @width, @height, @processed_at, @clip_features, @uploaded_by)
-            """
+        Returns a map of record id to error message (None when the row was written).
+        """
+        if not self.available:
+            return {record['id']: "Database connection not available" for record in records}
+
+        outcomes: Dict[str, Optional[str]] = {}
+        prepared = []
+        for record in records:
+            try:
+                prepared.append((self._prepare_record(record, username), record['features']))
+            except Exception as e:
+                outcomes[record['id']] = f"Could not prepare record: {e}"
+
+        for start in range(0, len(prepared), config.INGEST_WRITE_BATCH_SIZE):
+            chunk = prepared[start:start + config.INGEST_WRITE_BATCH_SIZE]
+            try:
+                self._insert_records([row for row, _ in chunk])
+            except Exception as e:
+                logger.error(f"Bulk insert of {len(chunk)} rows failed: {e}")
+                outcomes.update({row['id']: f"Bulk insert failed: {e}" for row, _ in chunk})
+                continue
+
+            for row, features in chunk:
+                self.dataset_stats.record(row['sku_code'], self._has_stored_embedding(row))
+                self._index_record(row, features)
+                outcomes[row['id']] = None
+            logger.info(f"Bulk inserted {len(chunk)} records")
+
+        return outcomes
+
+    def load_corrections(self) -> bool:
+        """Load approved feedback corrections into the in-memory correction matrix"""
+        if not self.available:
+            return False
 
-            job_config = bigquery.QueryJobConfig(
-                query_parameters=[
-                    bigquery.ScalarQueryParameter("id", "STRING", record_data['id']),
-                    bigquery.ScalarQueryParameter("sku_code", "STRING", record_data['sku_code']),
-                    bigquery.ScalarQueryParameter("image_name", "STRING", filename),
-                    bigquery.ScalarQueryParameter("image_data", "STRING", image_b64),
-                    bigquery.ScalarQueryParameter("file_size", "INTEGER", len(record_data['image_bytes'])),
-                    bigquery.ScalarQueryParameter("width", "INTEGER", width),
-                    bigquery.ScalarQueryParameter("height", "INTEGER", height),
-                    bigquery.ScalarQueryParameter("processed_at", "TIMESTAMP", datetime.now()),
-                    bigquery.ArrayQueryParameter("clip_features", "FLOAT64", features_list),
-                    bigquery.ScalarQueryParameter("uploaded_by", "STRING", username),
-                ]
+        try:
+            self._delta_versions.pop("corrections", None)
+            rows = self._fetch_corrections()
+            features, valid = decode_embeddings(
+                [row.image_features for row in rows],
+                [row.image_embedding for row in rows],
+                [row.embedding_format for row in rows]
             )
-
-            query_job = self.client.query(insert_query, job_config=job_config)
-            query_job.result()
-            logger.info(f"Successfully saved record: {record_data['id']}")
+            keep = np.flatnonzero(valid)
+            self.corrections.build(
+                [rows[i].correct_sku for i in keep], features[keep],
+                keys=[rows[i].training_id for i in keep],
+                watermark=max((row.created_at for row in rows if row.created_at), default=None)
+            )
+            logger.info(f"Loaded {len(self.corrections)} training corrections")
             return True
         except Exception as e:
-            logger.error(f"Direct insert failed: {e}")
+            logger.error(f"Corrections load failed: {e}")
             return False
 
-    def get_training_corrections(self, query_features: np.ndarray) -> Optional[Dict[str, Any]]:
-        if not self.client:
+    def get_training_corrections(self, query_features: np.ndarray, fusion: str = "max") -> Optional[Dict[str, Any]]:
+        try:
+            correction = self.corrections.lookup(query_features, config.CORRECTION_THRESHOLD, fusion)
+            if not correction:
+                return None
+
+            sku_code, similarity = correction
+            return {
+                'sku_code': sku_code,
+                'similarity_score': similarity,
+                'source': 'feedback_training'
+            }
+        except Exception as e:
+            logger.error(f"Get training corrections failed: {e}")
             return None
 
+    def load_index(self, force: bool = False) -> bool:
+        """Serve the latest local snapshot and catch up on rows past its watermark; build from
+        storage and publish a new snapshot when there is none, it is corrupt or too old, or on force"""
+        if not self.index_store:
+            return self._build_index()
+
         try:
-            query_sql = f"""
-            SELECT correct_sku, image_features
-            FROM `{config.FULL_TRAINING_TABLE_ID}`
-            ORDER BY created_at DESC
-            """
+            with self.index_store.lock():
+                version, reused = self.index_store.current(), False
+                if version and not force:
+                    try:
+                        age_hours = (time.time() - self.index_store.published_at(version)) / 3600
+                        if age_hours <= config.INDEX_SNAPSHOT_MAX_AGE_HOURS:
+                            reused = self.attach_index(version, checksums=True)
+                        else:
+                            logger.info(f"Index snapshot {version} is {age_hours:.1f}h old, rebuilding")
+                    except SnapshotError as e:
+                        logger.error(f"{e}; quarantining it and rebuilding from {self.name}")
+                        self.index_store.quarantine(version)
+                        version = None
+
+                if not reused:
+                    if self._build_index():
+                        version = self._publish_index()
+                        logger.info(f"Published search index version {version}")
+                        return self.attach_index(version)
+                    if not version or force:
+                        return False
+                    logger.warning(f"Index rebuild failed, serving snapshot {version} as it is")
+                    self.attach_index(version, checksums=True)
+        except Exception as e:
+            logger.error(f"Shared index load failed: {e}")
+            return False
 
-            query_job = self.client.query(query_sql)
+        try:
+            caught_up = self.refresh_index_delta()
+            logger.info(f"Caught up {caught_up} rows newer than snapshot {version}")
+        except Exception as e:
+            logger.error(f"Catch-up after snapshot load failed, serving snapshot without it: {e}")
+        return True
+
+    def _publish_index(self) -> str:
+        """Publish the current index with its search structure, so attaching workers skip the build"""
+        ids, sku_codes, vectors, metadata = self.index.export()
+        return self.index_store.publish(ids, sku_codes, vectors, metadata, watermark=self.index.watermark,
+                                        backend=self.index.export_backend(vectors))
+
+    def attach_index(self, version: str, checksums: bool = False) -> bool:
+        """Swap in a published version, memory-mapped read-only. Files are always size-checked;
+        full checksums are only recomputed when asked, for snapshots adopted at boot, not on
+        every worker's pickup of a version a sibling has just written."""
+        ids, sku_codes, vectors, metadata, watermark = self.index_store.load(version, checksums)
+        backend = self.index.new_backend()
+        if not self.index_store.restore_backend(version, backend, vectors):
+            backend = None
+        self.index.adopt(ids, sku_codes, vectors, metadata, watermark, backend=backend)
+        self.index_version = version
+        self._delta_versions.pop("index", None)
+        logger.info(f"Serving search index version {version} ({len(self.index)} embeddings)")
+        return True
+
+    def check_index_version(self):
+        """Pick up a version another worker published"""
+        version = self.index_store.current() if self.index_store else None
+        if version and version != self.index_version:
+            try:
+                self.attach_index(version)
+            except SnapshotError as e:
+                logger.error(f"{e}; quarantining it and keeping version {self.index_version}")
+                with self.index_store.lock():
+                    if self.index_store.current() == version:
+                        self.index_store.quarantine(version)
 
-            for row in query_job.result():
-                db_features = np.array(row.image_features)
-                query_features_np = np.array(query_features)
+    @staticmethod
+    def _since(watermark: Optional[datetime]) -> Optional[datetime]:
+        """Lower bound for catch-up reads: the watermark minus the late-commit overlap"""
+        return watermark - timedelta(seconds=config.INDEX_REFRESH_OVERLAP_SECONDS) if watermark else None
 
-                if np.linalg.norm(query_features_np) == 0 or np.linalg.norm(db_features) == 0:
-                    continue
+    def _table_changed(self, key: str, version: Optional[str]) -> bool:
+        """Whether a delta refresh has to read the table; an unknown version always reads"""
+        return version is None or self._delta_versions.get(key) != version
 
-                query_features_norm = query_features_np / np.linalg.norm(query_features_np)
-                db_features_norm = db_features / np.linalg.norm(db_features)
-                similarity = np.dot(query_features_norm, db_features_norm)
+    def refresh_index_delta(self) -> int:
+        """Add rows written since the watermark (by any worker) to the delta segment.
 
-                if similarity >= 0.9:
-                    return {
-                        'sku_code': row.correct_sku,
-                        'similarity_score': float(similarity),
-                        'source': 'feedback_training'
-                    }
+        A metadata probe comes first so idle polls skip reading the embedding columns.
+        """
+        if not self.available:
+            return 0
+
+        version = self._index_table_version()
+        if not self._table_changed("index", version):
+            return 0
+
+        rows = self._fetch_index_rows(self._since(self.index.watermark))
+        self._delta_versions["index"] = version
+        if not rows:
+            return 0
+
+        ids, sku_codes, features, metadata = self._index_rows(rows)
+        added = self.index.add_batch(ids, sku_codes, features, metadata) if ids else 0
+        self.index.advance_watermark(max((row.processed_at for row in rows if row.processed_at), default=None))
+        if added:
+            logger.info(f"Added {added} new embeddings to the index delta segment")
+        return added
+
+    def refresh_corrections_delta(self) -> int:
+        """Add corrections approved since the watermark (by any worker)"""
+        if not self.available:
+            return 0
+
+        version = self._corrections_table_version()
+        if not self._table_changed("corrections", version):
+            return 0
+
+        rows = self._fetch_corrections(self._since(self.corrections.watermark))
+        self._delta_versions["corrections"] = version
+        if not rows:
+            return 0
+
+        features, valid = decode_embeddings(
+            [row.image_features for row in rows],
+            [row.image_embedding for row in rows],
+            [row.embedding_format for row in rows]
+        )
+        added = sum(self.corrections.add(rows[i].correct_sku, features[i], rows[i].training_id)
+                    for i in np.flatnonzero(valid))
+        self.corrections.advance_watermark(max((row.created_at for row in rows if row.created_at), default=None))
+        return added
+
+    def compact_index(self) -> bool:
+        """Fold a full delta segment into the main one; with a shared store, as a new published version"""
+        if self.index.delta_size < config.INDEX_DELTA_MAX_ROWS:
+            return False
 
-            return None
+        if not self.index_store:
+            moved = self.index.compact()
+            logger.info(f"Compacted {moved} delta rows into the main index segment")
+            return True
+
+        with self.index_store.lock():
+            version = self.index_store.current()
+            if version and version != self.index_version:
+                # A sibling published first; anything it lacks is re-read past its watermark
+                self.attach_index(version)
+                return True
+            version = self._publish_index()
+        logger.info(f"Published compacted search index version {version}")
+        return self.attach_index(version)
+
+    def start_index_maintenance(self):
+        """Background thread: swap in published versions, catch up past the watermarks, compact"""
+        if self._index_maintenance:
+            return
+
+        def maintain():
+            last_refresh = time.monotonic()
+            while True:
+                time.sleep(config.INDEX_SWAP_CHECK_SECONDS)
+                try:
+                    self.check_index_version()
+                    if config.INDEX_REFRESH_SECONDS and time.monotonic() - last_refresh >= config.INDEX_REFRESH_SECONDS:
+                        last_refresh = time.monotonic()
+                        self.refresh_index_delta()
+                        self.refresh_corrections_delta()
+                        self.compact_index()
+                except Exception as e:
+                    logger.error(f"Index maintenance failed: {e}")
+
+        self._index_maintenance = threading.Thread(target=maintain, name="index-maintenance", daemon=True)
+        self._index_maintenance.start()
+
+    def _index_rows(self, rows: List[Any]) -> Tuple[List[str], List[str], np.ndarray, List[Dict[str, Any]]]:
+        """Decoded embeddings and search metadata for sku_images rows; undecodable rows are skipped"""
+        features, valid = decode_embeddings(
+            [row.clip_features for row in rows],
+            [row.clip_embedding for row in rows],
+            [row.embedding_format for row in rows]
+        )
+        if not valid.all():
+            logger.error(f"Skipping {int((~valid).sum())} rows with undecodable or mismatched embeddings")
+
+        keep = np.flatnonzero(valid)
+        ids, sku_codes, metadata = [], [], []
+        for i in keep:
+            row = rows[i]
+            ids.append(row.id)
+            sku_codes.append(row.sku_code)
+            metadata.append({
+                'id': row.id,
+                'sku_code': row.sku_code,
+                'image_name': row.image_name,
+                'image_sha256': row.image_sha256,
+                'file_size': row.file_size,
+                'width': row.width,
+                'height': row.height,
+                'uploaded_by': row.uploaded_by,
+            })
+        return ids, sku_codes, features[keep], metadata
+
+    def _build_index(self) -> bool:
+        """Load every reference embedding from storage into the in-memory index"""
+        if not self.available:
+            return False
+
+        try:
+            self._delta_versions.pop("index", None)
+            rows = self._fetch_index_rows()
+            ids, sku_codes, features, metadata = self._index_rows(rows)
+            watermark = max((row.processed_at for row in rows if row.processed_at), default=None)
+            self.index.build(ids, sku_codes, features, metadata, watermark)
+            logger.info(f"Loaded {len(self.index)} embeddings into {config.INDEX_BACKEND} search index")
+            return True
         except Exception as e:
-            logger.error(f"Get training corrections failed: {e}")
-            return None
+            logger.error(f"Index load failed: {e}")
+            return False
 
-    def search_similar_images(self, query_features: np.ndarray, top_k: Optional[int] = None) -> List[Dict[str, Any]]:
-        if not self.client:
+    def search_similar_images(self, query_features: np.ndarray, top_k: Optional[int] = None,
+                              fusion: str = "max") -> List[Dict[str, Any]]:
+        """Corrections first, then the index; query_features may hold several views of the image, one per row"""
+        if not self.available:
             return []
 
         if top_k is None:
             top_k = config.TOP_K_RESULTS
 
         try:
-            features_list = query_features.tolist()
-            training_correction = self.get_training_corrections(query_features)
+            with stage("correction_lookup"):
+                training_correction = self.get_training_corrections(query_features, fusion)
             if training_correction:
                 return [training_correction]
 
-            query_sql = f"""
-            SELECT id, sku_code, image_name, image_data, clip_features, file_size, width, height, uploaded_by
-            FROM `{config.FULL_TABLE_ID}`
-            WHERE clip_features IS NOT NULL
-            ORDER BY processed_at DESC
-            """
-
-            query_job = self.client.query(query_sql)
-            results = query_job.result()
-            matches = []
-            sku_best_matches = {}  
-
-            for row in results:
-                try:
-                    if not row.clip_features:
-                        continue
+            with stage("similarity_scan"):
+                results = self.index.search(query_features, top_k, config.SIMILARITY_THRESHOLD, fusion)
 
-                    db_features = np.array(row.clip_features)
-                    query_features_np = np.array(features_list)
+            return [self._match(row, similarity) for row, similarity in results]
+        except Exception as e:
+            logger.error(f"Index search failed: {e}")
+            return []
 
-                    if np.linalg.norm(query_features_np) == 0 or np.linalg.norm(db_features) == 0:
-                        continue
+    @staticmethod
+    def _match(row: Dict[str, Any], similarity: float) -> Dict[str, Any]:
+        return {
+            'id': row['id'],
+            'sku_code': row['sku_code'],
+            'image_name': row['image_name'],
+            'similarity_score': similarity,
+            'image_sha256': row['image_sha256'],
+            'image_url': f"/images/{row['image_sha256']}" if row['image_sha256'] else None,
+            'feature_model': config.CLIP_MODEL_NAME,
+            'file_size': row['file_size'],
+            'dimensions': f"{row['width']}x{row['height']}",
+            'uploaded_by': row['uploaded_by'],
+            'source': 'database'
+        }
 
-                    query_features_norm = query_features_np / np.linalg.norm(query_features_np)
-                    db_features_norm = db_features / np.linalg.norm(db_features)
-                    similarity = np.dot(query_features_norm, db_features_norm)
-
-                    if similarity >= config.SIMILARITY_THRESHOLD:
-                        match_data = {
-                            'id': row.id,
-                            'sku_code': row.sku_code,
-                            'image_name': row.image_name,
-                            'similarity_score': float(similarity),
-                            'image_data': row.image_data[:100] + "...",
-                            'feature_model': config.CLIP_MODEL_NAME,
-                            'file_size': row.file_size,
-                            'dimensions': f"{row.width}x{row.height}",
-                            'uploaded_by': row.uploaded_by,
-                            'source': 'database'
-                        }
-
-                        if row.sku_code not in sku_best_matches or similarity > sku_best_matches[row.sku_code]['similarity_score']:
-                            sku_best_matches[row.sku_code] = match_data
+    def search_similar_images_batch(self, query_features: np.ndarray, top_k: Optional[int] = None) -> List[List[Dict[str, Any]]]:
+        """search_similar_images for every row of query_features, with one correction
+        product and one index scoring pass for the whole batch"""
+        if not self.available or not len(query_features):
+            return [[] for _ in query_features]
 
-                except Exception as e:
-                    logger.error(f"Error processing row: {e}")
-                    continue
+        if top_k is None:
+            top_k = config.TOP_K_RESULTS
 
-            matches = list(sku_best_matches.values())
-            matches.sort(key=lambda x: x['similarity_score'], reverse=True)
-            return matches[:top_k]
+        try:
+            with stage("correction_lookup"):
+                corrections = self.corrections.lookup_batch(query_features, config.CORRECTION_THRESHOLD)
+            pending = [i for i, correction in enumerate(corrections) if correction is None]
+
+            with stage("similarity_scan"):
+                found = self.index.search_batch(query_features[pending], top_k, config.SIMILARITY_THRESHOLD) if pending else []
+
+            results: List[List[Dict[str, Any]]] = [
+                [{'sku_code': correction[0], 'similarity_score': correction[1], 'source': 'feedback_training'}]
+                if correction else [] for correction in corrections
+            ]
+            for i, matches in zip(pending, found):
+                results[i] = [self._match(row, similarity) for row, similarity in matches]
+            return results
         except Exception as e:
-            logger.error(f"BigQuery search failed: {e}")
-            return []
+            logger.error(f"Batch index search failed: {e}")
+            return [[] for _ in query_features]
 
     def save_feedback(self, username: str, predicted_sku: str, correct_sku: str, image_features: np.ndarray, image_bytes: bytes) -> Tuple[bool, Optional[str]]:
-        if not self.client:
-            logger.error("BigQuery client not available")
+        if not self.available:
+            logger.error(f"{self.name} storage not available")
             return False, None
 
         try:
             feedback_id = str(uuid.uuid4())[:8]
-            features_list = image_features.tolist()
-
-            image_b64 = base64.b64encode(image_bytes).decode('utf-8')
+            features_list, image_embedding, embedding_format = self._embedding_columns(image_features)
 
             timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-            filename = f"feedback_{predicted_sku}_{timestamp}.jpg"
+            row = {
+                'feedback_id': feedback_id,
+                'username': username,
+                'predicted_sku': predicted_sku,
+                'correct_sku': correct_sku,
+                'image_features': features_list,
+                'image_embedding': image_embedding,
+                'embedding_format': embedding_format,
+                'image_data': base64.b64encode(image_bytes).decode('utf-8'),
+                'image_name': f"feedback_{predicted_sku}_{timestamp}.jpg",
+                'file_size': len(image_bytes),
+                'complaint_time': datetime.now(),
+                'status': 'PENDING',
+                'admin_name': None,
+                'approval_time': None,
+            }
+            with stage("storage_write"):
+                self._insert_feedback(row)
+            logger.info(f"Successfully saved feedback: {feedback_id}")
+            return True, feedback_id
+        except Exception as e:
+            logger.error(f"Feedback insert failed: {e}")
+            return False, None
+
+    def get_pending_feedback(self, limit: int, cursor: Optional[str] = None) -> Dict[str, Any]:
+        """One page of the review queue; images are fetched separately by feedback_id"""
+        page = {'feedback_list': [], 'next_cursor': None, 'total_pending': None}
+        after = decode_feedback_cursor(cursor) if cursor else None
+        if not self.available:
+            logger.error(f"{self.name} storage not available")
+            return page
+
+        try:
+            rows = self._fetch_pending_feedback(limit + 1, after)
+            if len(rows) > limit:
+                rows = rows[:limit]
+                page['next_cursor'] = encode_feedback_cursor(rows[-1].complaint_time, rows[-1].feedback_id)
+            page['feedback_list'] = [{
+                'feedback_id': row.feedback_id,
+                'username': row.username,
+                'predicted_sku': row.predicted_sku,
+                'correct_sku': row.correct_sku,
+                'image_name': row.image_name,
+                'file_size': row.file_size,
+                'complaint_time': row.complaint_time.strftime("%Y-%m-%d %H:%M:%S"),
+                'status': row.status,
+                'thumbnail_url': f"/feedback/{row.feedback_id}/thumbnail",
+                'image_url': f"/feedback/{row.feedback_id}/image",
+            } for row in rows]
+            # Counting is a separate scan, so only the first page pays for it
+            if after is None:
+                page['total_pending'] = self._count_pending_feedback()
+            return page
+        except Exception as e:
+            logger.error(f"Get pending feedback failed: {e}")
+            return page
+
+    def get_feedback_image(self, feedback_id: str) -> Optional[bytes]:
+        if not self.available:
+            logger.error(f"{self.name} storage not available")
+            return None
+
+        try:
+            image_data = self._fetch_feedback_image(feedback_id)
+            return base64.b64decode(image_data) if image_data else None
+        except Exception as e:
+            logger.error(f"Get feedback image failed: {e}")
+            return None
+
+    def get_feedback_thumbnail(self, feedback_id: str) -> Optional[bytes]:
+        """Thumbnail generated on first access and kept in the process-local cache"""
+        thumbnail = self.thumbnails.get(feedback_id)
+        if thumbnail is not None:
+            return thumbnail
+
+        image_bytes = self.get_feedback_image(feedback_id)
+        if image_bytes is None:
+            return None
+        try:
+            thumbnail = make_thumbnail(image_bytes, config.FEEDBACK_THUMBNAIL_SIZE)
+        except Exception as e:
+            logger.error(f"Thumbnail for feedback {feedback_id} failed: {e}")
+            return None
+        self.thumbnails.put(feedback_id, thumbnail)
+        return thumbnail
+
+    def approve_feedback(self, feedback_id: str, admin_name: str) -> bool:
+        return self.approve_feedback_bulk([feedback_id], admin_name).get(feedback_id) == 'approved'
+
+    def approve_feedback_bulk(self, feedback_ids: List[str], admin_name: str) -> Dict[str, str]:
+        """Approve many feedback rows with one read and one write; returns an outcome per ID:
+        approved, not_found, already_processed, no_features or failed"""
+        outcomes = {feedback_id: 'failed' for feedback_id in feedback_ids}
+        if not self.available:
+            logger.error(f"{self.name} storage not available")
+            return outcomes
+
+        approvable = []
+        try:
+            rows = self._fetch_feedback_rows(feedback_ids)
+            outcomes = {feedback_id: 'not_found' for feedback_id in feedback_ids}
+            _, valid = decode_embeddings(
+                [row.image_features for row in rows],
+                [row.image_embedding for row in rows],
+                [row.embedding_format for row in rows]
+            )
+            for row, usable in zip(rows, valid):
+                if row.status != 'PENDING':
+                    outcomes[row.feedback_id] = 'already_processed'
+                elif not usable:
+                    outcomes[row.feedback_id] = 'no_features'
+                else:
+                    approvable.append(row.feedback_id)
+
+            if approvable:
+                with stage("storage_write"):
+                    approved = set(self._record_approvals(approvable, admin_name, datetime.now()))
+                # Rows another admin processed between the read and the write were left untouched
+                outcomes.update((feedback_id, 'approved' if feedback_id in approved else 'already_processed')
+                                for feedback_id in approvable)
+        except Exception as e:
+            logger.error(f"Approve feedback failed: {e}")
+            outcomes.update((feedback_id, 'failed') for feedback_id in approvable)
+            return outcomes
+
+        if approvable:
+            # The new training rows reach the correction matrix in one catch-up read
+            try:
+                self.refresh_corrections_delta()
+            except Exception as e:
+                logger.error(f"Correction refresh after approval failed: {e}")
+            logger.info(f"Successfully approved {sum(1 for outcome in outcomes.values() if outcome == 'approved')} feedback items")
+        return outcomes
+
+    def _load_sku_image_counts(self) -> Optional[List[Tuple[str, int, int]]]:
+        if not self.available:
+            return None
+
+        try:
+            return self._sku_image_counts()
+        except Exception as e:
+            logger.error(f"Dataset stats query failed: {e}")
+            return None
+
+    def get_dataset_info(self) -> Dict[str, Any]:
+        """Counters as of the last reconcile plus saves made by this process since"""
+        return self.dataset_stats.snapshot() or {'total_records': 0, 'unique_skus': 0, 'clip_records': 0, 'master_skus': 0}
+
+class BigQueryDatasetManager(StorageBackend):
+    """Manage BigQuery database operations"""
+
+    name = "bigquery"
+
+    def __init__(self):
+        self.client = None
+        self._table_schema = None
+        super().__init__()
+
+    @property
+    def available(self) -> bool:
+        return self.client is not None
+
+    def connect(self):
+        if bigquery is None:
+            logger.error("BigQuery storage requires the google-cloud-bigquery package")
+            return
+
+        try:
+            self.client = bigquery.Client(project=config.PROJECT_ID)
+            query = "SELECT 1 as test"
+            self._run_query("connect", query)
+            self.embedding_blobs = self._has_embedding_blobs()
+            self.image_blobs = self._has_image_blobs()
+            logger.info("BigQuery client initialized successfully")
+        except Exception as e:
+            logger.error(f"BigQuery client initialization failed: {e}")
+            self.client = None
+
+    init_client = connect
+
+    EMBEDDING_BLOB_COLUMNS = {"clip_embedding", "image_embedding", "embedding_format"}
+
+    def _has_embedding_blobs(self) -> bool:
+        """Whether every table carries the packed embedding columns added by migrate_embeddings.py"""
+        for table_id, blob_column in ((config.FULL_TABLE_ID, "clip_embedding"),
+                                      (config.FULL_FEEDBACK_TABLE_ID, "image_embedding"),
+                                      (config.FULL_TRAINING_TABLE_ID, "image_embedding")):
+            columns = {field.name for field in self.client.get_table(table_id).schema}
+            if not {blob_column, "embedding_format"} <= columns:
+                logger.warning(f"{table_id} has no {blob_column}/embedding_format columns; storing float arrays "
+                               f"until migrate_embeddings.py has run and the service restarts")
+                return False
+        return True
+
+    def _has_image_blobs(self) -> bool:
+        """Whether sku_images carries the image_sha256 column added by migrate_image_blobs.py"""
+        columns = {field.name for field in self.client.get_table(config.FULL_TABLE_ID).schema}
+        if "image_sha256" not in columns:
+            logger.warning(f"{config.FULL_TABLE_ID} has no image_sha256 column; storing base64 image_data "
+                           f"until migrate_image_blobs.py has run and the service restarts")
+            return False
+        return True
+
+    def _absent_columns(self, table_id: str) -> Set[str]:
+        """Columns inserts must leave out because the table does not have them (yet)"""
+        absent = set() if self.embedding_blobs else set(self.EMBEDDING_BLOB_COLUMNS)
+        if table_id == config.FULL_TABLE_ID:
+            absent.add("image_data" if self.image_blobs else "image_sha256")
+        return absent
+
+    def _blob_columns(self, blob_column: str) -> str:
+        """Select list for the packed embedding columns; typed NULLs on tables not yet migrated"""
+        if self.embedding_blobs:
+            return f"{blob_column}, embedding_format"
+        return f"CAST(NULL AS BYTES) AS {blob_column}, CAST(NULL AS STRING) AS embedding_format"
+
+    def _insert_parameters(self, table_id: str, parameters: List[Any]) -> Tuple[str, List[Any]]:
+        """INSERT ... VALUES statement for the given named parameters, minus columns the table lacks"""
+        absent = self._absent_columns(table_id)
+        parameters = [param for param in parameters if param.name not in absent]
+        columns = ", ".join(param.name for param in parameters)
+        values = ", ".join(f"@{param.name}" for param in parameters)
+        return f"INSERT INTO `{table_id}` ({columns}) VALUES ({values})", parameters
+
+    def _run_query(self, name: str, sql: str, job_config=None) -> List[Any]:
+        """Run a query job to completion, recording its duration and bytes processed under name"""
+        started = time.perf_counter()
+        job = self.client.query(sql, job_config=job_config)
+        rows = list(job.result())
+        bigquery_job_seconds.observe(time.perf_counter() - started, query=name)
+        processed = job.total_bytes_processed or 0
+        bigquery_bytes_processed.inc(processed, query=name)
+        bigquery_bytes_per_query.observe(processed, query=name)
+        return rows
+
+    def _fetch_master_rows(self) -> Optional[List[Tuple[str, str]]]:
+        if not self.client:
+            return None
 
-            insert_query = f"""
-            INSERT INTO `{config.FULL_FEEDBACK_TABLE_ID}`
-            (feedback_id, username, predicted_sku, correct_sku, image_features, image_data, image_name, file_size, complaint_time, status, admin_name, approval_time)
-            VALUES
-            (@feedback_id, @username, @predicted_sku, @correct_sku, @image_features, @image_data, @image_name, @file_size, @complaint_time, @status, @admin_name, @approval_time)
+        try:
+            query = f"""
+            SELECT sku_code, description
+            FROM `{config.FULL_MASTER_TABLE_ID}`
+            ORDER BY sku_code
+            """
+
+            return [(row.sku_code, row.description) for row in self._run_query("master_rows", query)]
+        except Exception as e:
+            logger.error(f"Master table load failed: {e}")
+            return None
+
+    def _table_modified(self, table_id: str) -> Optional[str]:
+        """Last-modified time of a table, read from table metadata without running a query"""
+        if not self.client:
+            return None
+
+        try:
+            modified = self.client.get_table(table_id).modified
+            return modified.isoformat() if modified else None
+        except Exception as e:
+            logger.error(f"{table_id} metadata lookup failed: {e}")
+            return None
+
+    def _master_table_version(self) -> Optional[str]:
+        return self._table_modified(config.FULL_MASTER_TABLE_ID)
+
+    def _index_table_version(self) -> Optional[str]:
+        return self._table_modified(config.FULL_TABLE_ID)
+
+    def _corrections_table_version(self) -> Optional[str]:
+        return self._table_modified(config.FULL_TRAINING_TABLE_ID)
+
+    def _query_sku_codes(self, sku_codes: List[str]) -> Optional[Dict[str, str]]:
+        try:
+            query = f"""
+            SELECT sku_code, description
+            FROM `{config.FULL_MASTER_TABLE_ID}`
+            WHERE sku_code IN UNNEST(@sku_codes)
             """
 
             job_config = bigquery.QueryJobConfig(
                 query_parameters=[
-                    bigquery.ScalarQueryParameter("feedback_id", "STRING", feedback_id),
-                    bigquery.ScalarQueryParameter("username", "STRING", username),
-                    bigquery.ScalarQueryParameter("predicted_sku", "STRING", predicted_sku),
-                    bigquery.ScalarQueryParameter("correct_sku", "STRING", correct_sku),
-                    bigquery.ArrayQueryParameter("image_features", "FLOAT64", features_list),
-                    bigquery.ScalarQueryParameter("image_data", "STRING", image_b64),
-                    bigquery.ScalarQueryParameter("image_name", "STRING", filename),
-                    bigquery.ScalarQueryParameter("file_size", "INTEGER", len(image_bytes)),
-                    bigquery.ScalarQueryParameter("complaint_time", "TIMESTAMP", datetime.now()),
-                    bigquery.ScalarQueryParameter("status", "STRING", 'PENDING'),
-                    bigquery.ScalarQueryParameter("admin_name", "STRING", None),
-                    bigquery.ScalarQueryParameter("approval_time", "TIMESTAMP", None),
+                    bigquery.ArrayQueryParameter("sku_codes", "STRING", sorted(set(sku_codes)))
                 ]
             )
 
-            query_job = self.client.query(insert_query, job_config=job_config)
-            query_job.result()
-            logger.info(f"Successfully saved feedback: {feedback_id}")
-            return True, feedback_id
+            return {row.sku_code: row.description for row in self._run_query("sku_codes", query, job_config)}
         except Exception as e:
-            logger.error(f"Feedback insert failed: {e}")
-            return False, None
+            logger.error(f"SKU validation query failed: {e}")
+            return None
 
-    def get_pending_feedback(self) -> List[Dict[str, Any]]:
-        if not self.client:
-            logger.error("BigQuery client not available")
-            return []
+    def _insert_record(self, row: Dict[str, Any]):
+        insert_query, parameters = self._insert_parameters(config.FULL_TABLE_ID, [
+                bigquery.ScalarQueryParameter("id", "STRING", row['id']),
+                bigquery.ScalarQueryParameter("sku_code", "STRING", row['sku_code']),
+                bigquery.ScalarQueryParameter("image_name", "STRING", row['image_name']),
+                bigquery.ScalarQueryParameter("image_sha256", "STRING", row['image_sha256']),
+                bigquery.ScalarQueryParameter("image_data", "STRING", row.get('image_data')),
+                bigquery.ScalarQueryParameter("file_size", "INTEGER", row['file_size']),
+                bigquery.ScalarQueryParameter("width", "INTEGER", row['width']),
+                bigquery.ScalarQueryParameter("height", "INTEGER", row['height']),
+                bigquery.ScalarQueryParameter("processed_at", "TIMESTAMP", row['processed_at']),
+                bigquery.ArrayQueryParameter("clip_features", "FLOAT64", row['clip_features']),
+                bigquery.ScalarQueryParameter("clip_embedding", "BYTES", row['clip_embedding']),
+                bigquery.ScalarQueryParameter("embedding_format", "STRING", row['embedding_format']),
+                bigquery.ScalarQueryParameter("uploaded_by", "STRING", row['uploaded_by']),
+        ])
+
+        job_config = bigquery.QueryJobConfig(query_parameters=parameters)
+        self._run_query("insert_record", insert_query, job_config)
+
+    def _insert_records(self, rows: List[Dict[str, Any]]):
+        """One load job instead of a DML INSERT per row"""
+        if self._table_schema is None:
+            self._table_schema = self.client.get_table(config.FULL_TABLE_ID).schema
+
+        job_config = bigquery.LoadJobConfig(
+            schema=self._table_schema,
+            write_disposition=bigquery.WriteDisposition.WRITE_APPEND
+        )
+        json_rows = [
+            {
+                **row,
+                'processed_at': row['processed_at'].isoformat(),
+                'clip_embedding': base64.b64encode(row['clip_embedding']).decode('ascii') if row['clip_embedding'] else None
+            }
+            for row in rows
+        ]
+        absent = self._absent_columns(config.FULL_TABLE_ID)
+        json_rows = [{k: v for k, v in row.items() if k not in absent} for row in json_rows]
+        started = time.perf_counter()
+        self.client.load_table_from_json(json_rows, config.FULL_TABLE_ID, job_config=job_config).result()
+        bigquery_job_seconds.observe(time.perf_counter() - started, query="insert_records_load")
+
+    def _fetch_index_rows(self, since: Optional[datetime] = None) -> List[Any]:
+        query_sql = f"""
+        SELECT id, sku_code, image_name, {"image_sha256" if self.image_blobs else "CAST(NULL AS STRING) AS image_sha256"}, processed_at,
+            clip_features, {self._blob_columns("clip_embedding")}, file_size, width, height, uploaded_by
+        FROM `{config.FULL_TABLE_ID}`
+        WHERE (ARRAY_LENGTH(clip_features) > 0{" OR clip_embedding IS NOT NULL" if self.embedding_blobs else ""})
+            AND (@since IS NULL OR processed_at > @since)
+        ORDER BY processed_at DESC
+        """
+        job_config = bigquery.QueryJobConfig(
+            query_parameters=[bigquery.ScalarQueryParameter("since", "TIMESTAMP", since)]
+        )
+        return self._run_query("index_rows" if since is None else "index_rows_delta", query_sql, job_config)
+
+    def _fetch_corrections(self, since: Optional[datetime] = None) -> List[Any]:
+        query_sql = f"""
+        SELECT training_id, correct_sku, image_features, {self._blob_columns("image_embedding")}, created_at
+        FROM `{config.FULL_TRAINING_TABLE_ID}`
+        WHERE @since IS NULL OR created_at > @since
+        ORDER BY created_at ASC
+        """
+        job_config = bigquery.QueryJobConfig(
+            query_parameters=[bigquery.ScalarQueryParameter("since", "TIMESTAMP", since)]
+        )
+        return self._run_query("corrections" if since is None else "corrections_delta", query_sql, job_config)
+
+    def _insert_feedback(self, row: Dict[str, Any]):
+        insert_query, parameters = self._insert_parameters(config.FULL_FEEDBACK_TABLE_ID, [
+                bigquery.ScalarQueryParameter("feedback_id", "STRING", row['feedback_id']),
+                bigquery.ScalarQueryParameter("username", "STRING", row['username']),
+                bigquery.ScalarQueryParameter("predicted_sku", "STRING", row['predicted_sku']),
+                bigquery.ScalarQueryParameter("correct_sku", "STRING", row['correct_sku']),
+                bigquery.ArrayQueryParameter("image_features", "FLOAT64", row['image_features']),
+                bigquery.ScalarQueryParameter("image_embedding", "BYTES", row['image_embedding']),
+                bigquery.ScalarQueryParameter("embedding_format", "STRING", row['embedding_format']),
+                bigquery.ScalarQueryParameter("image_data", "STRING", row['image_data']),
+                bigquery.ScalarQueryParameter("image_name", "STRING", row['image_name']),
+                bigquery.ScalarQueryParameter("file_size", "INTEGER", row['file_size']),
+                bigquery.ScalarQueryParameter("complaint_time", "TIMESTAMP", row['complaint_time']),
+                bigquery.ScalarQueryParameter("status", "STRING", row['status']),
+                bigquery.ScalarQueryParameter("admin_name", "STRING", row['admin_name']),
+                bigquery.ScalarQueryParameter("approval_time", "TIMESTAMP", row['approval_time']),
+        ])
+
+        job_config = bigquery.QueryJobConfig(query_parameters=parameters)
+        self._run_query("insert_feedback", insert_query, job_config)
+
+    def _fetch_pending_feedback(self, limit: int, after: Optional[Tuple[datetime, str]] = None) -> List[Any]:
+        query_sql = f"""
+        SELECT
+        f.feedback_id,
+        u.username,  -- Get the actual username
+        f.predicted_sku,
+        f.correct_sku,
+        f.image_name,
+        f.file_size,
+        f.complaint_time,
+        f.status
+    FROM `{config.FULL_FEEDBACK_TABLE_ID}` f
+    LEFT JOIN `{config.PROJECT_ID}.{config.DATASET_ID}.users` u
+    ON f.username = u.id  -- f.username is actually user_id
+    WHERE f.status = 'PENDING'
+      AND (@after_time IS NULL
+           OR f.complaint_time < @after_time
+           OR (f.complaint_time = @after_time AND f.feedback_id < @after_id))
+    ORDER BY f.complaint_time DESC, f.feedback_id DESC
+    LIMIT @limit
+    """
 
-        try:
-            query_sql = f"""
-            SELECT 
-            f.feedback_id,
-            u.username,  -- Get the actual username
-            f.predicted_sku,
-            f.correct_sku,
-            f.image_data,
-            f.image_name,
-            f.file_size,
-            f.complaint_time,
-            f.status
-        FROM `{config.FULL_FEEDBACK_TABLE_ID}` f
-        LEFT JOIN `{config.PROJECT_ID}.{config.DATASET_ID}.users` u
-        ON f.username = u.id  -- f.username is actually user_id
-        WHERE f.status = 'PENDING'
-        ORDER BY f.complaint_time DESC
+        job_config = bigquery.QueryJobConfig(
+            query_parameters=[
+                bigquery.ScalarQueryParameter("after_time", "TIMESTAMP", after[0] if after else None),
+                bigquery.ScalarQueryParameter("after_id", "STRING", after[1] if after else None),
+                bigquery.ScalarQueryParameter("limit", "INT64", limit),
+            ]
+        )
+
+        return self._run_query("pending_feedback", query_sql, job_config)
+
+    def _count_pending_feedback(self) -> int:
+        query_sql = f"""
+        SELECT COUNT(*) AS total_pending
+        FROM `{config.FULL_FEEDBACK_TABLE_ID}`
+        WHERE status = 'PENDING'
         """
 
-            query_job = self.client.query(query_sql)
-            results = []
-
-            for row in query_job.result():
-                results.append({
-                    'feedback_id': row.feedback_id,
-                    'username': row.username,
-                    'username': row.username,
-                    'predicted_sku': row.predicted_sku,
-                    'correct_sku': row.correct_sku,
-                    'image_data': row.image_data,
-                    'image_name': row.image_name,
-                    'file_size': row.file_size,
-                    'complaint_time': row.complaint_time.strftime("%Y-%m-%d %H:%M:%S"),
-                    'status': row.status
-                })
+        return int(self._run_query("pending_feedback_count", query_sql)[0].total_pending)
 
-            return results
+    def _fetch_feedback_image(self, feedback_id: str) -> Optional[str]:
+        query_sql = f"""
+        SELECT image_data
+        FROM `{config.FULL_FEEDBACK_TABLE_ID}`
+        WHERE feedback_id = @feedback_id
+        """
+
+        job_config = bigquery.QueryJobConfig(
+            query_parameters=[
+                bigquery.ScalarQueryParameter("feedback_id", "STRING", feedback_id),
+            ]
+        )
+
+        rows = self._run_query("feedback_image", query_sql, job_config)
+        return rows[0].image_data if rows else None
+
+    def _fetch_feedback_rows(self, feedback_ids: List[str]) -> List[Any]:
+        feedback_query = f"""
+        SELECT feedback_id, status, image_features, {self._blob_columns("image_embedding")}, correct_sku
+        FROM `{config.FULL_FEEDBACK_TABLE_ID}`
+        WHERE feedback_id IN UNNEST(@feedback_ids)
+        """
+
+        job_config = bigquery.QueryJobConfig(
+            query_parameters=[
+                bigquery.ArrayQueryParameter("feedback_ids", "STRING", feedback_ids),
+            ]
+        )
+
+        return self._run_query("feedback", feedback_query, job_config)
+
+    def _record_approvals(self, feedback_ids: List[str], admin_name: str, approved_at: datetime) -> List[str]:
+        # One script job: the copy and the status change commit together, so a retry never duplicates rows.
+        # DML has no RETURNING, so the pending IDs are fixed inside the transaction and both statements
+        # use them; a concurrent change to those rows aborts the commit rather than diverging from the list.
+        blob_columns = "image_embedding, embedding_format, " if self.embedding_blobs else ""
+        approval_script = f"""
+        DECLARE approved ARRAY<STRING>;
+
+        BEGIN TRANSACTION;
+
+        SET approved = ARRAY(
+            SELECT feedback_id
+            FROM `{config.FULL_FEEDBACK_TABLE_ID}`
+            WHERE feedback_id IN UNNEST(@feedback_ids) AND status = 'PENDING'
+        );
+
+        INSERT INTO `{config.FULL_TRAINING_TABLE_ID}`
+        (training_id, image_features, {blob_columns}correct_sku, feedback_id, created_at)
+        SELECT GENERATE_UUID(), image_features, {blob_columns}correct_sku, feedback_id, @approved_at
+        FROM `{config.FULL_FEEDBACK_TABLE_ID}`
+        WHERE feedback_id IN UNNEST(approved);
+
+        UPDATE `{config.FULL_FEEDBACK_TABLE_ID}`
+        SET status = 'APPROVED',
+            admin_name = @admin_name,
+            approval_time = @approved_at
+        WHERE feedback_id IN UNNEST(approved);
+
+        COMMIT TRANSACTION;
+
+        SELECT feedback_id FROM UNNEST(approved) AS feedback_id;
+        """
+
+        job_config = bigquery.QueryJobConfig(
+            query_parameters=[
+                bigquery.ArrayQueryParameter("feedback_ids", "STRING", feedback_ids),
+                bigquery.ScalarQueryParameter("admin_name", "STRING", admin_name),
+                bigquery.ScalarQueryParameter("approved_at", "TIMESTAMP", approved_at),
+            ]
+        )
+
+        return [row.feedback_id for row in self._run_query("approve_feedback", approval_script, job_config)]
+
+    def _sku_image_counts(self) -> List[Tuple[str, int, int]]:
+        query_sql = f"""
+        SELECT
+            sku_code,
+            COUNT(*) as images,
+            COUNTIF(ARRAY_LENGTH(clip_features) > 0{" OR clip_embedding IS NOT NULL" if self.embedding_blobs else ""}) as clip_images
+        FROM `{config.FULL_TABLE_ID}`
+        GROUP BY sku_code
+        """
+
+        return [(row.sku_code, row.images, row.clip_images) for row in self._run_query("sku_image_counts", query_sql)]
+
+class SQLiteDatasetManager(StorageBackend):
+    """Embedded SQLite storage with the same tables as the BigQuery dataset, for offline use"""
+
+    name = "sqlite"
+
+    SCHEMA = """
+    CREATE TABLE IF NOT EXISTS sku_master (
+        sku_code TEXT PRIMARY KEY,
+        description TEXT
+    );
+    CREATE TABLE IF NOT EXISTS sku_images (
+        id TEXT PRIMARY KEY,
+        sku_code TEXT NOT NULL,
+        image_name TEXT,
+        image_sha256 TEXT,
+        file_size INTEGER,
+        width INTEGER,
+        height INTEGER,
+        processed_at TEXT,
+        clip_features TEXT,
+        clip_embedding BLOB,
+        embedding_format TEXT,
+        uploaded_by TEXT
+    );
+    CREATE INDEX IF NOT EXISTS sku_images_processed_at ON sku_images (processed_at);
+    CREATE TABLE IF NOT EXISTS user_feedback (
+        feedback_id TEXT PRIMARY KEY,
+        username TEXT,
+        predicted_sku TEXT,
+        correct_sku TEXT,
+        image_features TEXT,
+        image_embedding BLOB,
+        embedding_format TEXT,
+        image_data TEXT,
+        image_name TEXT,
+        file_size INTEGER,
+        complaint_time TEXT,
+        status TEXT,
+        admin_name TEXT,
+        approval_time TEXT
+    );
+    DROP INDEX IF EXISTS user_feedback_status;
+    CREATE INDEX IF NOT EXISTS user_feedback_pending ON user_feedback (status, complaint_time, feedback_id);
+    CREATE TABLE IF NOT EXISTS feedback_training (
+        training_id TEXT PRIMARY KEY,
+        image_features TEXT,
+        image_embedding BLOB,
+        embedding_format TEXT,
+        correct_sku TEXT,
+        feedback_id TEXT,
+        created_at TEXT
+    );
+    CREATE INDEX IF NOT EXISTS feedback_training_created_at ON feedback_training (created_at);
+    """
+
+    TIMESTAMP_COLUMNS = ('processed_at', 'complaint_time', 'approval_time', 'created_at')
+    ARRAY_COLUMNS = ('clip_features', 'image_features')
+
+    def __init__(self, path: str):
+        self.path = path
+        self._local = threading.local()
+        self._connected = False
+        super().__init__()
+
+    @property
+    def available(self) -> bool:
+        return self._connected
+
+    def _connection(self) -> sqlite3.Connection:
+        """One connection per thread; WAL lets readers run alongside the single writer"""
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30)
+            conn.row_factory = sqlite3.Row
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def connect(self):
+        try:
+            os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+            conn = self._connection()
+            conn.executescript(self.SCHEMA)
+            self._connected = True
+            logger.info(f"SQLite storage ready at {self.path}")
         except Exception as e:
-            logger.error(f"Get pending feedback failed: {e}")
-            return []
+            logger.error(f"SQLite storage initialization failed: {e}")
+            self._connected = False
 
-    def approve_feedback(self, feedback_id: str, admin_name: str) -> bool:
-        if not self.client:
-            logger.error("BigQuery client not available")
-            return False
+    @staticmethod
+    def _timestamp(value: Optional[datetime]) -> Optional[str]:
+        # Fixed-width ISO text so string comparison orders timestamps correctly
+        return value.isoformat(sep=' ', timespec='microseconds') if value else None
+
+    @classmethod
+    def _values(cls, row: Dict[str, Any]) -> Dict[str, Any]:
+        values = dict(row)
+        for column in cls.TIMESTAMP_COLUMNS:
+            if column in values:
+                values[column] = cls._timestamp(values[column])
+        for column in cls.ARRAY_COLUMNS:
+            if column in values:
+                values[column] = json.dumps(values[column] or [])
+        return values
+
+    @classmethod
+    def _row(cls, row: sqlite3.Row) -> SimpleNamespace:
+        values = dict(row)
+        for column in cls.TIMESTAMP_COLUMNS:
+            if values.get(column):
+                values[column] = datetime.fromisoformat(values[column])
+        for column in cls.ARRAY_COLUMNS:
+            if column in values:
+                values[column] = json.loads(values[column]) if values[column] else []
+        return SimpleNamespace(**values)
+
+    def _query(self, sql: str, params: Sequence[Any] = ()) -> List[SimpleNamespace]:
+        return [self._row(row) for row in self._connection().execute(sql, params).fetchall()]
+
+    def _insert(self, table: str, rows: List[Dict[str, Any]]):
+        values = [self._values(row) for row in rows]
+        columns = list(values[0])
+        sql = f"INSERT INTO {table} ({', '.join(columns)}) VALUES ({', '.join(':' + c for c in columns)})"
+        conn = self._connection()
+        with conn:
+            conn.executemany(sql, values)
+
+    def import_sku_master(self, rows: List[Tuple[str, str]]) -> int:
+        """Insert or update master SKUs (code, description)"""
+        conn = self._connection()
+        with conn:
+            conn.executemany(
+                "INSERT INTO sku_master (sku_code, description) VALUES (?, ?) "
+                "ON CONFLICT(sku_code) DO UPDATE SET description = excluded.description",
+                rows
+            )
+        self.sku_cache.invalidate()
+        return len(rows)
+
+    def _fetch_master_rows(self) -> Optional[List[Tuple[str, str]]]:
+        if not self._connected:
+            return None
+
+        try:
+            return [(row.sku_code, row.description) for row in
+                    self._query("SELECT sku_code, description FROM sku_master ORDER BY sku_code")]
+        except Exception as e:
+            logger.error(f"Master table load failed: {e}")
+            return None
+
+    def _table_version(self, table: str) -> Optional[str]:
+        """Row count and last rowid: changes on every insert or delete, without reading the rows themselves"""
+        if not self._connected:
+            return None
 
         try:
-            feedback_query = f"""
-            SELECT image_features, correct_sku
-            FROM `{config.FULL_FEEDBACK_TABLE_ID}`
-            WHERE feedback_id = @feedback_id
-            """
+            row = self._query(f"SELECT COUNT(*) AS n, MAX(rowid) AS last FROM {table}")[0]
+            return f"{row.n}:{row.last}"
+        except Exception as e:
+            logger.error(f"{table} version lookup failed: {e}")
+            return None
 
-            job_config = bigquery.QueryJobConfig(
-                query_parameters=[
-                    bigquery.ScalarQueryParameter("feedback_id", "STRING", feedback_id),
-                ]
+    def _master_table_version(self) -> Optional[str]:
+        return self._table_version("sku_master")
+
+    def _index_table_version(self) -> Optional[str]:
+        return self._table_version("sku_images")
+
+    def _corrections_table_version(self) -> Optional[str]:
+        return self._table_version("feedback_training")
+
+    def _query_sku_codes(self, sku_codes: List[str]) -> Optional[Dict[str, str]]:
+        try:
+            codes = sorted(set(sku_codes))
+            rows = self._query(
+                f"SELECT sku_code, description FROM sku_master WHERE sku_code IN ({', '.join('?' for _ in codes)})",
+                codes
             )
+            return {row.sku_code: row.description for row in rows}
+        except Exception as e:
+            logger.error(f"SKU validation query failed: {e}")
+            return None
 
-            query_job = self.client.query(feedback_query, job_config=job_config)
-            feedback_data = list(query_job.result())
+    def _insert_record(self, row: Dict[str, Any]):
+        self._insert("sku_images", [row])
 
-            if not feedback_data:
-                logger.error(f"Feedback not found: {feedback_id}")
-                return False
+    def _insert_records(self, rows: List[Dict[str, Any]]):
+        self._insert("sku_images", rows)
+
+    def _fetch_index_rows(self, since: Optional[datetime] = None) -> List[Any]:
+        return self._query(
+            """
+            SELECT id, sku_code, image_name, image_sha256, processed_at,
+                clip_features, clip_embedding, embedding_format, file_size, width, height, uploaded_by
+            FROM sku_images
+            WHERE (clip_embedding IS NOT NULL OR clip_features NOT IN ('', '[]'))
+                AND (? IS NULL OR processed_at > ?)
+            ORDER BY processed_at DESC
+            """,
+            (self._timestamp(since), self._timestamp(since))
+        )
+
+    def _fetch_corrections(self, since: Optional[datetime] = None) -> List[Any]:
+        return self._query(
+            """
+            SELECT training_id, correct_sku, image_features, image_embedding, embedding_format, created_at
+            FROM feedback_training
+            WHERE ? IS NULL OR created_at > ?
+            ORDER BY created_at ASC
+            """,
+            (self._timestamp(since), self._timestamp(since))
+        )
 
-            row = feedback_data[0]
-            image_features = row.image_features
-            correct_sku = row.correct_sku
-            training_id = str(uuid.uuid4())[:8]
+    def _insert_feedback(self, row: Dict[str, Any]):
+        self._insert("user_feedback", [row])
 
-            training_insert = f"""
-            INSERT INTO `{config.FULL_TRAINING_TABLE_ID}`
-            (training_id, image_features, correct_sku, feedback_id, created_at)
-            VALUES
-            (@training_id, @image_features, @correct_sku, @feedback_id, @created_at)
+    def _fetch_pending_feedback(self, limit: int, after: Optional[Tuple[datetime, str]] = None) -> List[Any]:
+        after_time, after_id = (self._timestamp(after[0]), after[1]) if after else (None, None)
+        return self._query(
             """
+            SELECT feedback_id, username, predicted_sku, correct_sku, image_name,
+                file_size, complaint_time, status
+            FROM user_feedback
+            WHERE status = 'PENDING'
+                AND (? IS NULL OR complaint_time < ? OR (complaint_time = ? AND feedback_id < ?))
+            ORDER BY complaint_time DESC, feedback_id DESC
+            LIMIT ?
+            """,
+            (after_time, after_time, after_time, after_id, limit)
+        )
 
-            training_job_config = bigquery.QueryJobConfig(
-                query_parameters=[
-                    bigquery.ScalarQueryParameter("training_id", "STRING", training_id),
-                    bigquery.ArrayQueryParameter("image_features", "FLOAT64", image_features),
-                    bigquery.ScalarQueryParameter("correct_sku", "STRING", correct_sku),
-                    bigquery.ScalarQueryParameter("feedback_id", "STRING", feedback_id),
-                    bigquery.ScalarQueryParameter("created_at", "TIMESTAMP", datetime.now()),
-                ]
-            )
+    def _count_pending_feedback(self) -> int:
+        return int(self._query("SELECT COUNT(*) AS total_pending FROM user_feedback WHERE status = 'PENDING'")[0].total_pending)
 
-            training_query_job = self.client.query(training_insert, job_config=training_job_config)
-            training_query_job.result()
+    def _fetch_feedback_image(self, feedback_id: str) -> Optional[str]:
+        rows = self._query("SELECT image_data FROM user_feedback WHERE feedback_id = ?", (feedback_id,))
+        return rows[0].image_data if rows else None
 
-            update_sql = f"""
-            UPDATE `{config.FULL_FEEDBACK_TABLE_ID}`
-            SET status = 'APPROVED',
-                admin_name = @admin_name,
-                approval_time = @approval_time
-            WHERE feedback_id = @feedback_id
+    def _fetch_feedback_rows(self, feedback_ids: List[str]) -> List[Any]:
+        return self._query(
             """
+            SELECT feedback_id, status, image_features, image_embedding, embedding_format, correct_sku
+            FROM user_feedback
+            WHERE feedback_id IN (SELECT value FROM json_each(?))
+            """,
+            (json.dumps(feedback_ids),)
+        )
 
-            update_job_config = bigquery.QueryJobConfig(
-                query_parameters=[
-                    bigquery.ScalarQueryParameter("admin_name", "STRING", admin_name),
-                    bigquery.ScalarQueryParameter("approval_time", "TIMESTAMP", datetime.now()),
-                    bigquery.ScalarQueryParameter("feedback_id", "STRING", feedback_id),
-                ]
+    def _record_approvals(self, feedback_ids: List[str], admin_name: str, approved_at: datetime) -> List[str]:
+        ids, approved_at = json.dumps(feedback_ids), self._timestamp(approved_at)
+        conn = self._connection()
+        with conn:
+            approved = [row[0] for row in conn.execute(
+                """
+                UPDATE user_feedback SET status = 'APPROVED', admin_name = ?, approval_time = ?
+                WHERE feedback_id IN (SELECT value FROM json_each(?)) AND status = 'PENDING'
+                RETURNING feedback_id
+                """,
+                (admin_name, approved_at, ids)
+            ).fetchall()]
+            conn.execute(
+                """
+                INSERT INTO feedback_training
+                    (training_id, image_features, image_embedding, embedding_format, correct_sku, feedback_id, created_at)
+                SELECT lower(hex(randomblob(16))), image_features, image_embedding, embedding_format, correct_sku, feedback_id, ?
+                FROM user_feedback
+                WHERE feedback_id IN (SELECT value FROM json_each(?))
+                """,
+                (approved_at, json.dumps(approved))
             )
+        return approved
+
+    def _sku_image_counts(self) -> List[Tuple[str, int, int]]:
+        rows = self._query(
+            """
+            SELECT sku_code, COUNT(*) AS images,
+                SUM(CASE WHEN clip_embedding IS NOT NULL OR clip_features NOT IN ('', '[]') THEN 1 ELSE 0 END) AS clip_images
+            FROM sku_images
+            GROUP BY sku_code
+            """
+        )
+        return [(row.sku_code, row.images, row.clip_images) for row in rows]
+
+STORAGE_BACKENDS = {
+    BigQueryDatasetManager.name: BigQueryDatasetManager,
+    SQLiteDatasetManager.name: SQLiteDatasetManager,
+}
+
+def create_storage_backend() -> StorageBackend:
+    if config.STORAGE_BACKEND == "sqlite":
+        return SQLiteDatasetManager(config.SQLITE_PATH)
+    if config.STORAGE_BACKEND == "bigquery":
+        return BigQueryDatasetManager()
+    raise ValueError(f"Unknown storage backend '{config.STORAGE_BACKEND}'. Choose from: {', '.join(STORAGE_BACKENDS)}")
+
+@dataclass
+class IngestItem:
+    name: str
+    sku_code: Optional[str]
+    read: Optional[Callable[[], bytes]] = None
+    zip_path: Optional[str] = None  # name is then the member inside this archive
+    error: Optional[str] = None  # rejected while listing; recorded without reading
+
+    def read_from(self, archives: Dict[str, zipfile.ZipFile]) -> bytes:
+        """The image bytes; zip members come from archives, opened once per path by the caller's batch"""
+        if self.zip_path is None:
+            return self.read()
+        archive = archives.get(self.zip_path)
+        if archive is None:
+            archive = archives[self.zip_path] = zipfile.ZipFile(self.zip_path)
+        # The size in the zip header can be forged, so never read past the limit
+        with archive.open(self.name) as member:
+            data = member.read(config.MAX_FILE_SIZE + 1)
+        if len(data) > config.MAX_FILE_SIZE:
+            raise ValueError(f"File too large. Max: {config.MAX_FILE_SIZE} bytes")
+        return data
+
+class BulkIngestJob:
+    """Progress and per-item outcome of one bulk ingestion run"""
+
+    def __init__(self, total: int, username: str):
+        self.job_id = str(uuid.uuid4())
+        self.username = username
+        self.total = total
+        self.status = "queued"
+        self.message = None
+        self.succeeded: List[Dict[str, str]] = []
+        self.errors: List[Dict[str, str]] = []
+        self.created_at = datetime.now()
+        self.started_at = None
+        self.finished_at = None
+        self._lock = threading.Lock()
+
+    @property
+    def processed(self) -> int:
+        return len(self.succeeded) + len(self.errors)
+
+    def record_success(self, item_name: str, record_id: str, sku_code: str):
+        with self._lock:
+            self.succeeded.append({"item": item_name, "id": record_id, "sku_code": sku_code})
+
+    def record_error(self, item_name: str, error: str):
+        with self._lock:
+            self.errors.append({"item": item_name, "error": error})
+
+    def to_dict(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "job_id": self.job_id,
+                "status": self.status,
+                "message": self.message,
+                "total": self.total,
+                "processed": self.processed,
+                "succeeded": len(self.succeeded),
+                "failed": len(self.errors),
+                "progress": round(self.processed / self.total, 4) if self.total else 1.0,
+                "records": list(self.succeeded),
+                "errors": list(self.errors),
+                "created_at": self.created_at.isoformat(),
+                "started_at": self.started_at.isoformat() if self.started_at else None,
+                "finished_at": self.finished_at.isoformat() if self.finished_at else None
+            }
 
-            update_query_job = self.client.query(update_sql, job_config=update_job_config)
-            update_query_job.result()
+class BulkIngestor:
+    """Validate, embed and store many images with one SKU lookup, batched inference and bulk writes"""
+
+    def __init__(self, manager: StorageBackend, extractor: CLIPFeatureExtractor, image_validator: ImageValidator):
+        self.manager = manager
+        self.extractor = extractor
+        self.validator = image_validator
+        self.executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="bulk-ingest")
+        self.jobs: "OrderedDict[str, BulkIngestJob]" = OrderedDict()
+        self._jobs_lock = threading.Lock()
+
+    def submit(self, items: List[IngestItem], username: str, on_done: Optional[Callable[[], None]] = None) -> BulkIngestJob:
+        """Queue a background run; progress is available from get_job"""
+        job = BulkIngestJob(len(items), username)
+        with self._jobs_lock:
+            self.jobs[job.job_id] = job
+            while len(self.jobs) > config.INGEST_MAX_JOBS_KEPT:
+                oldest_id, oldest = next(iter(self.jobs.items()))
+                if oldest.status in ("queued", "running"):
+                    break
+                self.jobs.pop(oldest_id)
+
+        def run():
+            try:
+                self.run(items, job)
+            finally:
+                if on_done:
+                    on_done()
+
+        self.executor.submit(run)
+        return job
+
+    def get_job(self, job_id: str) -> Optional[BulkIngestJob]:
+        with self._jobs_lock:
+            return self.jobs.get(job_id)
+
+    def run(self, items: List[IngestItem], job: BulkIngestJob,
+            on_progress: Optional[Callable[[BulkIngestJob], None]] = None) -> BulkIngestJob:
+        job.status = "running"
+        job.started_at = datetime.now()
 
-            logger.info(f"Successfully approved feedback: {feedback_id}")
-            return True
+        try:
+            sku_codes = {item.sku_code.strip() for item in items if item.sku_code and item.sku_code.strip()}
+            known_skus = self.manager.validate_sku_codes(list(sku_codes))
+            if known_skus is None:
+                raise RuntimeError("SKU validation against master table failed")
+
+            pending: List[Tuple[IngestItem, str]] = []
+            embedded: List[Tuple[str, Dict[str, Any]]] = []
+
+            for item in items:
+                sku_code = (item.sku_code or "").strip()
+                if item.error:
+                    job.record_error(item.name, item.error)
+                elif not sku_code:
+                    job.record_error(item.name, "No SKU code given for this image")
+                elif sku_code not in known_skus:
+                    job.record_error(item.name, f"SKU code '{sku_code}' not found in master database")
+                else:
+                    pending.append((item, sku_code))
+
+                if len(pending) >= config.INGEST_EMBED_BATCH_SIZE:
+                    embedded.extend(self._embed_batch(pending, job))
+                    pending = []
+                if len(embedded) >= config.INGEST_WRITE_BATCH_SIZE:
+                    self._write_batch(embedded, job)
+                    embedded = []
+                if on_progress:
+                    on_progress(job)
+
+            if pending:
+                embedded.extend(self._embed_batch(pending, job))
+            if embedded:
+                self._write_batch(embedded, job)
+
+            job.status = "completed"
+            job.message = f"Ingested {len(job.succeeded)} of {job.total} images"
         except Exception as e:
-            logger.error(f"Approve feedback failed: {e}")
-            return False
+            logger.error(f"Bulk ingestion {job.job_id} failed: {e}")
+            job.status = "failed"
+            job.message = str(e)
+        finally:
+            job.finished_at = datetime.now()
+            if on_progress:
+                on_progress(job)
+
+        logger.info(f"Bulk ingestion {job.job_id} {job.status}: {len(job.succeeded)} succeeded, {len(job.errors)} failed")
+        return job
+
+    def _embed_batch(self, batch: List[Tuple[IngestItem, str]], job: BulkIngestJob) -> List[Tuple[str, Dict[str, Any]]]:
+        images, records = [], []
+        archives: Dict[str, zipfile.ZipFile] = {}
+        try:
+            for item, sku_code in batch:
+                try:
+                    image_bytes = item.read_from(archives)
+                    is_valid, validation_message = self.validator.validate_image_bytes(image_bytes)
+                    if not is_valid:
+                        job.record_error(item.name, f"Image validation failed: {validation_message}")
+                        continue
+                    images.append(self.extractor.decode(image_bytes))
+                    records.append((item.name, {'id': str(uuid.uuid4()), 'sku_code': sku_code, 'image_bytes': image_bytes}))
+                except Exception as e:
+                    job.record_error(item.name, f"Could not read image: {e}")
+        finally:
+            for archive in archives.values():
+                archive.close()
 
-    def get_dataset_info(self) -> Dict[str, int]:
-        if not self.client:
-            return {'total_records': 0, 'unique_skus': 0, 'clip_records': 0, 'master_skus': 0}
+        if not records:
+            return []
 
         try:
-            query_sql = f"""
-            SELECT
-                COUNT(*) as total_records,
-                COUNT(DISTINCT sku_code) as unique_skus,
-                COUNT(CASE WHEN clip_features IS NOT NULL THEN 1 END) as clip_records
-            FROM `{config.FULL_TABLE_ID}`
-            """
+            features = self.extractor.extract_features_batch(images)
+        except Exception as e:
+            logger.error(f"Bulk feature extraction failed: {e}")
+            for name, _ in records:
+                job.record_error(name, f"Failed to extract image features: {e}")
+            return []
 
-            query_job = self.client.query(query_sql)
-            result = list(query_job.result())[0]
-            master_query = f"""
-            SELECT COUNT(*) as master_skus
-            FROM `{config.FULL_MASTER_TABLE_ID}`
-            """
+        for (_, record), vector in zip(records, features):
+            record['features'] = vector
+        return records
 
-            master_job = self.client.query(master_query)
-            master_result = list(master_job.result())[0]
+    def _write_batch(self, embedded: List[Tuple[str, Dict[str, Any]]], job: BulkIngestJob):
+        outcomes = self.manager.save_records_bulk([record for _, record in embedded], job.username)
+        for name, record in embedded:
+            error = outcomes.get(record['id'], "Record was not written")
+            if error:
+                job.record_error(name, error)
+            else:
+                job.record_success(name, record['id'], record['sku_code'])
 
-            return {
-                'total_records': int(result.total_records),
-                'unique_skus': int(result.unique_skus),
-                'clip_records': int(result.clip_records),
-                'master_skus': int(master_result.master_skus)
-            }
-        except Exception as e:
-            logger.error(f"Get dataset info failed: {e}")
-            return {'total_records': 0, 'unique_skus': 0, 'clip_records': 0, 'master_skus': 0}
+def is_allowed_image_name(name: str) -> bool:
+    return os.path.splitext(name)[1].lower() in config.ALLOWED_EXTENSIONS
+
+def stage_upload(source: BinaryIO, path: str) -> bool:
+    """Copy an uploaded file to path in 1 MB chunks; returns whether it is a zip archive"""
+    with open(path, 'wb') as handle:
+        shutil.copyfileobj(source, handle, 1024 * 1024)
+    return zipfile.is_zipfile(path)
+
+def zip_items(zip_path: str, sku_for: Callable[[str, Optional[str]], Optional[str]]) -> List[IngestItem]:
+    """One item per image in a zip archive; the parent folder name is the fallback SKU code.
+
+    Raises ValueError for archives over the member or total-size limits; members
+    over MAX_FILE_SIZE become items carrying an error and are never read.
+    """
+    with zipfile.ZipFile(zip_path) as archive:
+        entries = [entry for entry in archive.infolist()
+                   if not entry.is_dir() and is_allowed_image_name(entry.filename)]
+
+    if len(entries) > config.INGEST_MAX_ZIP_MEMBERS:
+        raise ValueError(f"Archive holds {len(entries)} images. Max: {config.INGEST_MAX_ZIP_MEMBERS}")
+    total_size = sum(entry.file_size for entry in entries if entry.file_size <= config.MAX_FILE_SIZE)
+    if total_size > config.INGEST_MAX_ZIP_BYTES:
+        raise ValueError(f"Archive expands to {total_size} bytes. Max: {config.INGEST_MAX_ZIP_BYTES}")
+
+    items = []
+    for entry in entries:
+        folder = os.path.basename(os.path.dirname(entry.filename)) or None
+        too_large = entry.file_size > config.MAX_FILE_SIZE
+        items.append(IngestItem(
+            name=entry.filename,
+            sku_code=sku_for(os.path.basename(entry.filename), folder),
+            zip_path=zip_path,
+            error=f"File too large. Max: {config.MAX_FILE_SIZE} bytes" if too_large else None
+        ))
+    return items
+
+def directory_items(root: str, sku_code: Optional[str] = None) -> List[IngestItem]:
+    """One item per image under root; images in <root>/<SKU>/ take the folder name as SKU code"""
+    items = []
+    for folder, _, filenames in sorted(os.walk(root)):
+        for filename in sorted(filenames):
+            if not is_allowed_image_name(filename):
+                continue
+            path = os.path.join(folder, filename)
+            folder_sku = os.path.basename(folder) if os.path.abspath(folder) != os.path.abspath(root) else None
+
+            def read(path=path) -> bytes:
+                with open(path, 'rb') as handle:
+                    return handle.read()
+
+            items.append(IngestItem(name=os.path.relpath(path, root), sku_code=sku_code or folder_sku, read=read))
+    return items
+
+def process_started_at() -> float:
+    """Wall-clock start of this process from /proc, or the import time of this module elsewhere"""
+    try:
+        with open('/proc/self/stat') as handle:
+            start_ticks = int(handle.read().rsplit(')', 1)[1].split()[19])
+        with open('/proc/stat') as handle:
+            boot_time = next(int(line.split()[1]) for line in handle if line.startswith('btime'))
+        return boot_time + start_ticks / os.sysconf('SC_CLK_TCK')
+    except (OSError, ValueError, IndexError, StopIteration, AttributeError):
+        return MODULE_IMPORTED_AT
+
+def process_memory_mb() -> Dict[str, Optional[float]]:
+    """Current and peak resident set size of this process"""
+    rss_mb = None
+    try:
+        with open('/proc/self/statm') as handle:
+            rss_mb = int(handle.read().split()[1]) * os.sysconf('SC_PAGE_SIZE') / 2**20
+    except (OSError, ValueError, AttributeError):
+        pass
+    peak_mb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024 if resource else None
+    return {
+        "rss_mb": round(rss_mb, 1) if rss_mb is not None else None,
+        "peak_rss_mb": round(peak_mb, 1) if peak_mb is not None else None
+    }
+
+class ServiceWarmup:
+    """Runs the slow startup steps (model, index) off the request path and tracks readiness"""
+
+    def __init__(self):
+        self.steps: List[Tuple[str, Callable[[], Any]]] = []
+        self.ready = threading.Event()
+        self.current_step: Optional[str] = None
+        self.error: Optional[str] = None
+        self.step_seconds: Dict[str, float] = {}
+        self.step_rss_mb: Dict[str, Optional[float]] = {}
+        self.ready_seconds: Optional[float] = None
+        self._lock = threading.Lock()
+        self._thread = None
+
+    def add_step(self, name: str, fn: Callable[[], Any]):
+        self.steps.append((name, fn))
+
+    def start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self.run, name="warmup", daemon=True)
+            self._thread.start()
+
+    def run(self) -> bool:
+        """Run every step once, blocking; returns whether the service is ready"""
+        with self._lock:
+            if self.ready.is_set() or self.error:
+                return self.ready.is_set()
+
+            for name, fn in self.steps:
+                self.current_step = name
+                started = time.perf_counter()
+                try:
+                    fn()
+                except Exception as e:
+                    self.error = f"{name} failed: {e}"
+                    logger.error(f"Warmup {self.error}")
+                    return False
+                self.step_seconds[name] = round(time.perf_counter() - started, 3)
+                self.step_rss_mb[name] = process_memory_mb()["rss_mb"]
+                logger.info(f"Warmup step {name} took {self.step_seconds[name]:.2f}s "
+                            f"(rss {self.step_rss_mb[name]} MB)")
+
+            self.current_step = None
+            self.ready_seconds = round(time.time() - process_started_at(), 3)
+            self.ready.set()
+            logger.info(f"Service ready {self.ready_seconds:.2f}s after process start")
+            return True
+
+    def require_ready(self):
+        if self.ready.is_set():
+            return
+        detail = f"Service unavailable: {self.error}" if self.error else \
+            f"Service is warming up ({self.current_step or 'starting'}), please retry shortly"
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail=detail,
+            headers={"Retry-After": "5"}
+        )
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "ready": self.ready.is_set(),
+            "current_step": self.current_step,
+            "error": self.error,
+            "step_seconds": dict(self.step_seconds),
+            "step_rss_mb": dict(self.step_rss_mb),
+            "ready_seconds_after_process_start": self.ready_seconds,
+            "uptime_seconds": round(time.time() - process_started_at(), 1),
+            "memory": process_memory_mb()
+        }
 
 feature_extractor = CLIPFeatureExtractor()
+inference_pool = ExecutionPool("inference", config.INFERENCE_POOL_WORKERS, config.INFERENCE_POOL_MAX_PENDING)
+io_pool = ExecutionPool("io", config.IO_POOL_WORKERS, config.IO_POOL_MAX_PENDING)
 validator = ImageValidator()
-dataset_manager = BigQueryDatasetManager()
+dataset_manager = create_storage_backend()
 backend = dataset_manager  
+bulk_ingestor = BulkIngestor(dataset_manager, feature_extractor, validator)
+
+warmup = ServiceWarmup()
+warmup.add_step("storage", dataset_manager.connect)
+warmup.add_step("model", feature_extractor.load_model)
+warmup.add_step("index", dataset_manager.load_index)
+warmup.add_step("corrections", dataset_manager.load_corrections)
+warmup.add_step("index_maintenance", dataset_manager.start_index_maintenance)
+warmup.add_step("dataset_stats", dataset_manager.dataset_stats.start)
+
+metrics.gauge("ready", "1 once warmup has finished", lambda: float(warmup.ready.is_set()))
+metrics.gauge("index_embeddings", "Embeddings in the search index", lambda: len(dataset_manager.index))
+metrics.gauge("index_delta_embeddings", "Embeddings in the index delta segment", lambda: dataset_manager.index.delta_size)
+metrics.gauge("corrections", "Approved corrections in the correction matrix", lambda: len(dataset_manager.corrections))
+metrics.gauge("inference_queue_depth", "Images waiting for a CLIP batch",
+              lambda: feature_extractor.batcher.queue.qsize() if feature_extractor.batcher else None)
+metrics.gauge("inference_pool_pending", "Jobs queued or running in the inference pool", lambda: inference_pool.pending)
+metrics.gauge("io_pool_pending", "Jobs queued or running in the io pool", lambda: io_pool.pending)
+metrics.gauge("resident_memory_mb", "Resident set size of this process", lambda: process_memory_mb()["rss_mb"])
+
+async def require_ready():
+    """Route dependency: 503 until the model and index are loaded"""
+    warmup.require_ready()
 
 app = FastAPI(
     title="SKU Processor API",
     description="Image-based SKU processing and similarity search system",
     version="1.0.0"
 )
+app.router.route_class = StageTimedRoute
 
 app.add_middleware(
     CORSMiddleware,
@@ -592,7 +2751,51 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-@app.post("/upload-image", response_model=UploadResponse)
+@app.middleware("http")
+async def observe_request(request: Request, call_next):
+    """Latency histograms per route and stage, W3C trace context, and the optional Server-Timing header"""
+    stages: Dict[str, float] = {}
+    incoming = TRACEPARENT.match(request.headers.get("traceparent", "").strip().lower())
+    trace_id = incoming.group(1) if incoming else uuid.uuid4().hex
+    stages_token, trace_token = request_stages.set(stages), request_trace_id.set(trace_id)
+    started = time.perf_counter()
+    try:
+        response = await call_next(request)
+    finally:
+        request_stages.reset(stages_token)
+        request_trace_id.reset(trace_token)
+    finished = time.perf_counter()
+
+    endpoint_done = stages.pop("_endpoint_done", None)
+    if endpoint_done is not None:
+        stages["serialize"] = finished - endpoint_done
+
+    route = request.scope.get("route")
+    route_path = route.path if route else "unmatched"
+    request_seconds.observe(finished - started, method=request.method, route=route_path, status=str(response.status_code))
+    for name, seconds in stages.items():
+        stage_seconds.observe(seconds, route=route_path, stage=name)
+
+    elapsed_ms = (finished - started) * 1000
+    if config.SLOW_REQUEST_LOG_MS and elapsed_ms >= config.SLOW_REQUEST_LOG_MS:
+        breakdown = ", ".join(f"{name}={seconds * 1000:.1f}ms" for name, seconds in stages.items())
+        logger.warning(f"Slow request {request.method} {route_path} {elapsed_ms:.0f}ms trace_id={trace_id}: {breakdown}")
+
+    flags = incoming.group(3) if incoming else "00"
+    response.headers["traceparent"] = f"00-{trace_id}-{uuid.uuid4().hex[:16]}-{flags}"
+    if config.SERVER_TIMING_HEADER:
+        stages["total"] = finished - started
+        response.headers["Server-Timing"] = ", ".join(f"{name};dur={seconds * 1000:.3f}" for name, seconds in stages.items())
+    return response
+
+@app.on_event("startup")
+async def start_warmup():
+    if config.WARMUP_IN_BACKGROUND:
+        warmup.start()
+    else:
+        await asyncio.get_running_loop().run_in_executor(None, warmup.run)
+
+@app.post("/upload-image", response_model=UploadResponse, dependencies=[Depends(require_ready)])
 async def upload_image(
     file: UploadFile = File(...),
     sku_code: str = Form(...),
@@ -602,7 +2805,8 @@ async def upload_image(
     Upload an image with SKU code to the database
     """
     try:
-        image_bytes = await file.read()
+        with stage("read"):
+            image_bytes = await file.read()
 
         if not image_bytes:
             raise HTTPException(
@@ -622,7 +2826,7 @@ async def upload_image(
                 detail="Username is required"
             )
 
-        is_valid_sku, description = dataset_manager.validate_sku_code(sku_code.strip())
+        is_valid_sku, description = await io_pool.run(dataset_manager.validate_sku_code, sku_code.strip())
 
         if not is_valid_sku:
             raise HTTPException(
@@ -630,14 +2834,14 @@ async def upload_image(
                 detail=f"SKU code '{sku_code}' not found in master database. Please contact admin to add this SKU."
             )
 
-        is_valid, validation_message = validator.validate_image_bytes(image_bytes)
+        is_valid, validation_message = await inference_pool.run(validator.validate_image_bytes, image_bytes)
         if not is_valid:
             raise HTTPException(
                 status_code=status.HTTP_400_BAD_REQUEST,
                 detail=f"Image validation failed: {validation_message}"
             )
 
-        features = feature_extractor.extract_features_from_bytes(image_bytes)
+        features = await inference_pool.run(feature_extractor.extract_features_from_bytes, image_bytes)
         if features is None:
             raise HTTPException(
                 status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
@@ -651,7 +2855,7 @@ async def upload_image(
             'features': features
         }
 
-        success = dataset_manager.save_record(record_data, username)
+        success = await io_pool.run(dataset_manager.save_record, record_data, username)
 
         if success:
             return UploadResponse(
@@ -680,13 +2884,162 @@ async def upload_image(
             detail=f"Image upload failed: {str(e)}"
         )
 
-@app.post("/search-similar", response_model=SearchResponse)
-async def search_similar_images(file: UploadFile = File(...)):
+@app.post("/upload-images/bulk", status_code=status.HTTP_202_ACCEPTED, dependencies=[Depends(require_ready)])
+async def bulk_upload_images(
+    files: List[UploadFile] = File(...),
+    username: str = Form(...),
+    sku_code: Optional[str] = Form(None),
+    sku_map: Optional[str] = Form(None)
+):
+    """
+    Queue many images, or zip archives of images, for ingestion.
+    Each image's SKU comes from sku_map (JSON of filename to SKU), then sku_code,
+    then the image's folder name inside a zip.
+    """
+    if not username or not username.strip():
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Username is required"
+        )
+
+    try:
+        sku_by_name = json.loads(sku_map) if sku_map else {}
+    except ValueError:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="sku_map must be a JSON object of filename to SKU code"
+        )
+    if not isinstance(sku_by_name, dict):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="sku_map must be a JSON object of filename to SKU code"
+        )
+
+    def sku_for(filename: str, folder: Optional[str] = None) -> Optional[str]:
+        return sku_by_name.get(filename) or sku_code or folder
+
+    # Staging is file I/O on the io pool; cleanup after a failure bypasses its queue limit,
+    # so a saturated pool cannot leave the directory behind
+    staging_dir = await io_pool.run(tempfile.mkdtemp, prefix="bulk-ingest-")
+    discard = lambda: io_pool.executor.submit(shutil.rmtree, staging_dir, True)
+    try:
+        items: List[IngestItem] = []
+        for position, upload in enumerate(files):
+            filename = os.path.basename(upload.filename or f"upload_{position}")
+            path = os.path.join(staging_dir, f"{position}_{filename}")
+            if await io_pool.run(stage_upload, upload.file, path):
+                try:
+                    items.extend(await io_pool.run(zip_items, path, sku_for))
+                except ValueError as e:
+                    raise HTTPException(
+                        status_code=status.HTTP_400_BAD_REQUEST,
+                        detail=f"{filename}: {e}"
+                    )
+            else:
+                def read(path=path) -> bytes:
+                    with open(path, 'rb') as handle:
+                        return handle.read()
+
+                items.append(IngestItem(name=filename, sku_code=sku_for(filename), read=read))
+
+        if not items:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="No images found in the upload"
+            )
+    except HTTPException:
+        discard()
+        raise
+    except Exception as e:
+        discard()
+        logger.error(f"Bulk upload staging failed: {e}")
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Bulk upload failed: {str(e)}"
+        )
+
+    job = bulk_ingestor.submit(items, username.strip(), on_done=lambda: shutil.rmtree(staging_dir, ignore_errors=True))
+
+    return {
+        "success": True,
+        "message": f"Queued {len(items)} images for ingestion",
+        "data": job.to_dict()
+    }
+
+@app.get("/upload-images/bulk/{job_id}")
+async def get_bulk_upload_status(job_id: str):
+    """
+    Progress and per-item errors of a bulk ingestion job
+    """
+    job = bulk_ingestor.get_job(job_id)
+    if not job:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Bulk upload job not found: {job_id}"
+        )
+
+    return {
+        "success": True,
+        "message": f"Bulk upload job {job.status}",
+        "data": job.to_dict()
+    }
+
+@app.get("/images/{digest}")
+async def get_image(digest: str, request: Request):
+    """
+    Serve a stored image by the SHA-256 recorded in sku_images.image_sha256
+    """
+    if not BlobStore.is_digest(digest):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Invalid image hash"
+        )
+
+    headers = {"ETag": f'"{digest}"', "Cache-Control": "public, max-age=31536000, immutable"}
+    if request.headers.get("if-none-match") == headers["ETag"]:
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+
+    image_bytes = await io_pool.run(dataset_manager.blob_store.get, digest)
+    if image_bytes is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Image not found: {digest}"
+        )
+
+    try:
+        with Image.open(io.BytesIO(image_bytes)) as img:
+            media_type = Image.MIME.get(img.format, "application/octet-stream")
+    except Exception:
+        media_type = "application/octet-stream"
+
+    return Response(content=image_bytes, media_type=media_type, headers=headers)
+
+@app.post("/search-similar", response_model=SearchResponse, dependencies=[Depends(require_ready)])
+async def search_similar_images(
+    file: UploadFile = File(...),
+    views: int = Form(1),
+    fusion: str = Form(config.SEARCH_VIEW_FUSION)
+):
     """
-    Search for similar images in the database
+    Search for similar images in the database. views > 1 also embeds flips and crops of the
+    query in the same forward pass and fuses their scores (max or mean): slower, but finds
+    products shot off-centre or at an angle
     """
     try:
-        image_bytes = await file.read()
+        if not 1 <= views <= min(config.SEARCH_MAX_VIEWS, len(VIEWS)):
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=f"views must be between 1 and {min(config.SEARCH_MAX_VIEWS, len(VIEWS))}"
+            )
+
+        if fusion not in FUSIONS:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=f"fusion must be one of: {', '.join(FUSIONS)}"
+            )
+
+        with stage("read"):
+            image_bytes = await file.read()
 
         if not image_bytes:
             raise HTTPException(
@@ -694,21 +3047,24 @@ async def search_similar_images(file: UploadFile = File(...)):
                 detail="No image data provided"
             )
 
-        is_valid, validation_message = validator.validate_image_bytes(image_bytes)
+        is_valid, validation_message = await inference_pool.run(validator.validate_image_bytes, image_bytes)
         if not is_valid:
             raise HTTPException(
                 status_code=status.HTTP_400_BAD_REQUEST,
                 detail=f"Image validation failed: {validation_message}"
             )
 
-        features = feature_extractor.extract_features_from_bytes(image_bytes)
+        if views > 1:
+            features = await inference_pool.run(feature_extractor.extract_view_features, image_bytes, views)
+        else:
+            features = await inference_pool.run(feature_extractor.extract_features_from_bytes, image_bytes)
         if features is None:
             raise HTTPException(
                 status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
                 detail="Failed to extract image features"
             )
 
-        similar_images = dataset_manager.search_similar_images(features)
+        similar_images = await inference_pool.run(dataset_manager.search_similar_images, features, None, fusion)
 
         if not similar_images:
             return SearchResponse(
@@ -717,6 +3073,7 @@ async def search_similar_images(file: UploadFile = File(...)):
                 data={
                     "matches": [],
                     "total_matches": 0,
+                    "views": views,
                     "note": "Try adjusting the similarity threshold or upload more reference images"
                 }
             )
@@ -726,7 +3083,8 @@ async def search_similar_images(file: UploadFile = File(...)):
             message=f"Found {len(similar_images)} similar images",
             data={
                 "matches": similar_images,
-                "total_matches": len(similar_images)
+                "total_matches": len(similar_images),
+                "views": views
             }
         )
 
@@ -739,7 +3097,69 @@ async def search_similar_images(file: UploadFile = File(...)):
             detail=f"Search failed: {str(e)}"
         )
 
-@app.post("/submit-feedback", response_model=FeedbackResponse)
+@app.post("/search-similar/batch", response_model=SearchResponse, dependencies=[Depends(require_ready)])
+async def search_similar_images_batch(files: List[UploadFile] = File(...)):
+    """
+    Search many images (e.g. crops of one shelf photo) in one request: one forward pass and
+    one scoring pass for all of them. Results come back in upload order, one entry per image
+    """
+    try:
+        if len(files) > config.SEARCH_BATCH_MAX_IMAGES:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=f"Too many images: at most {config.SEARCH_BATCH_MAX_IMAGES} per batch"
+            )
+
+        with stage("read"):
+            images = [await file.read() for file in files]
+
+        def validate_all() -> List[Tuple[bool, str]]:
+            return [validator.validate_image_bytes(image_bytes) if image_bytes else (False, "No image data provided")
+                    for image_bytes in images]
+
+        validations = await inference_pool.run(validate_all)
+        valid = [i for i, (is_valid, _) in enumerate(validations) if is_valid]
+
+        features = await inference_pool.run(feature_extractor.extract_features_many, [images[i] for i in valid]) if valid else []
+        embedded = [(i, vector) for i, vector in zip(valid, features) if vector is not None]
+
+        matches = await inference_pool.run(
+            dataset_manager.search_similar_images_batch, np.vstack([vector for _, vector in embedded])
+        ) if embedded else []
+        found = dict(zip([i for i, _ in embedded], matches))
+
+        results = []
+        for i, file in enumerate(files):
+            result = {"index": i, "filename": file.filename}
+            if not validations[i][0]:
+                result["error"] = f"Image validation failed: {validations[i][1]}"
+            elif i not in found:
+                result["error"] = "Failed to extract image features"
+            else:
+                result["matches"] = found[i]
+                result["total_matches"] = len(found[i])
+            results.append(result)
+
+        return SearchResponse(
+            success=True,
+            message=f"Searched {len(found)} of {len(files)} images",
+            data={
+                "results": results,
+                "total_images": len(files),
+                "searched_images": len(found)
+            }
+        )
+
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Batch search failed: {e}")
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Batch search failed: {str(e)}"
+        )
+
+@app.post("/submit-feedback", response_model=FeedbackResponse, dependencies=[Depends(require_ready)])
 async def submit_feedback(
     file: UploadFile = File(...),
     username: str = Form(...),
@@ -750,7 +3170,8 @@ async def submit_feedback(
     Submit feedback for incorrect predictions
     """
     try:
-        image_bytes = await file.read()
+        with stage("read"):
+            image_bytes = await file.read()
 
         if not all([username, predicted_sku, correct_sku, image_bytes]):
             raise HTTPException(
@@ -758,7 +3179,7 @@ async def submit_feedback(
                 detail="All fields are required for feedback submission"
             )
 
-        is_valid_sku, description = dataset_manager.validate_sku_code(correct_sku.strip())
+        is_valid_sku, description = await io_pool.run(dataset_manager.validate_sku_code, correct_sku.strip())
 
         if not is_valid_sku:
             raise HTTPException(
@@ -766,15 +3187,15 @@ async def submit_feedback(
                 detail=f"Correct SKU code '{correct_sku}' not found in master database"
             )
 
-        features = feature_extractor.extract_features_from_bytes(image_bytes)
+        features = await inference_pool.run(feature_extractor.extract_features_from_bytes, image_bytes)
         if features is None:
             raise HTTPException(
                 status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
                 detail="Failed to extract image features"
             )
 
-        success, feedback_id = dataset_manager.save_feedback(
-            username, predicted_sku, correct_sku, features, image_bytes
+        success, feedback_id = await io_pool.run(
+            dataset_manager.save_feedback, username, predicted_sku, correct_sku, features, image_bytes
         )
 
         if success:
@@ -804,19 +3225,27 @@ async def submit_feedback(
         )
 
 @app.get("/sku-list", response_model=BaseResponse)
-async def get_sku_list():
+async def get_sku_list(request: Request):
     """Get list of all SKUs from master table"""
     try:
-        result = backend.get_sku_list()
+        if not backend.available:
+            raise HTTPException(
+                status_code=500,
+                detail="Database connection not available"
+            )
 
-        if result["success"]:
-            return BaseResponse(**result)
-        else:
+        catalog = await io_pool.run(backend.sku_cache.get)
+        if catalog is None:
             raise HTTPException(
                 status_code=500,
-                detail=result["message"]
+                detail="Failed to retrieve SKU list"
             )
 
+        headers = {"ETag": catalog.etag, "Cache-Control": "no-cache"}
+        if request.headers.get("if-none-match") == catalog.etag:
+            return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+        return Response(content=catalog.payload, media_type="application/json", headers=headers)
+
     except HTTPException:
         raise
     except Exception as e:
@@ -825,22 +3254,52 @@ async def get_sku_list():
             status_code=500,
             detail=f"Internal server error: {str(e)}"
         )
+
+@app.post("/sku-cache/invalidate")
+async def invalidate_sku_cache():
+    """
+    Drop the cached master table and reload it, e.g. after SKUs were added or edited
+    """
+    backend.sku_cache.invalidate()
+    if not await io_pool.run(backend.sku_cache.refresh, True):
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail="Failed to reload SKU cache"
+        )
+
+    return {
+        "success": True,
+        "message": "SKU cache reloaded",
+        "data": backend.sku_cache.stats()
+    }
+
 @app.get("/pending-feedback")
-async def get_pending_feedback():
+async def get_pending_feedback(limit: int = config.PENDING_FEEDBACK_PAGE_SIZE, cursor: Optional[str] = None):
     """
-    Get pending feedback for admin review
+    Get one page of pending feedback for admin review; pass next_cursor back for the following page
     """
     try:
-        feedback_list = dataset_manager.get_pending_feedback()
+        if not 1 <= limit <= config.PENDING_FEEDBACK_MAX_PAGE_SIZE:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=f"limit must be between 1 and {config.PENDING_FEEDBACK_MAX_PAGE_SIZE}"
+            )
+
+        try:
+            page = await io_pool.run(dataset_manager.get_pending_feedback, limit, cursor)
+        except ValueError as e:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=str(e)
+            )
 
         return {
             "success": True,
-            "message": f"Retrieved {len(feedback_list)} pending feedback items",
-            "data": {
-                "feedback_list": feedback_list,
-                "total_pending": len(feedback_list)
-            }
+            "message": f"Retrieved {len(page['feedback_list'])} pending feedback items",
+            "data": page
         }
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Get pending feedback failed: {e}")
         raise HTTPException(
@@ -848,7 +3307,46 @@ async def get_pending_feedback():
             detail=f"Failed to retrieve pending feedback: {str(e)}"
         )
 
-@app.post("/approve-feedback")
+def feedback_image_response(image_bytes: Optional[bytes], feedback_id: str, etag: str) -> Response:
+    if image_bytes is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Feedback image not found: {feedback_id}"
+        )
+    try:
+        with Image.open(io.BytesIO(image_bytes)) as img:
+            media_type = Image.MIME.get(img.format, "application/octet-stream")
+    except Exception:
+        media_type = "application/octet-stream"
+    # A feedback row's image is written once, so clients can keep it
+    headers = {"ETag": etag, "Cache-Control": "private, max-age=86400, immutable"}
+    return Response(content=image_bytes, media_type=media_type, headers=headers)
+
+@app.get("/feedback/{feedback_id}/image")
+async def get_feedback_image(feedback_id: str, request: Request):
+    """
+    Full-size image of one feedback item
+    """
+    etag = f'"{feedback_id}"'
+    if request.headers.get("if-none-match") == etag:
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers={"ETag": etag})
+
+    image_bytes = await io_pool.run(dataset_manager.get_feedback_image, feedback_id)
+    return feedback_image_response(image_bytes, feedback_id, etag)
+
+@app.get("/feedback/{feedback_id}/thumbnail")
+async def get_feedback_thumbnail(feedback_id: str, request: Request):
+    """
+    Small JPEG of one feedback item for the review list, generated on first access
+    """
+    etag = f'"{feedback_id}-thumb{config.FEEDBACK_THUMBNAIL_SIZE}"'
+    if request.headers.get("if-none-match") == etag:
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers={"ETag": etag})
+
+    thumbnail = await io_pool.run(dataset_manager.get_feedback_thumbnail, feedback_id)
+    return feedback_image_response(thumbnail, feedback_id, etag)
+
+@app.post("/approve-feedback", dependencies=[Depends(require_ready)])
 async def approve_feedback(request: ApprovalRequest):
     """
     Approve feedback and add to training data
@@ -860,7 +3358,7 @@ async def approve_feedback(request: ApprovalRequest):
                 detail="Feedback ID and admin name are required"
             )
 
-        success = dataset_manager.approve_feedback(request.feedback_id, request.admin_name)
+        success = await io_pool.run(dataset_manager.approve_feedback, request.feedback_id, request.admin_name)
 
         if success:
             return {
@@ -887,13 +3385,74 @@ async def approve_feedback(request: ApprovalRequest):
             detail=f"Failed to approve feedback: {str(e)}"
         )
 
+@app.post("/approve-feedback/bulk", dependencies=[Depends(require_ready)])
+async def approve_feedback_bulk(request: BulkApprovalRequest):
+    """
+    Approve many feedback items at once; reports an outcome per ID
+    """
+    try:
+        if not request.feedback_ids or not request.admin_name:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="Feedback IDs and admin name are required"
+            )
+        if len(request.feedback_ids) > config.BULK_APPROVAL_MAX_IDS:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=f"At most {config.BULK_APPROVAL_MAX_IDS} feedback IDs per request"
+            )
+
+        outcomes = await io_pool.run(dataset_manager.approve_feedback_bulk, request.feedback_ids, request.admin_name)
+        summary = Counter(outcomes.values())
+
+        return {
+            "success": summary['failed'] == 0,
+            "message": f"Approved {summary['approved']} of {len(outcomes)} feedback items",
+            "data": {
+                "admin_name": request.admin_name,
+                "results": [{"feedback_id": feedback_id, "status": outcome} for feedback_id, outcome in outcomes.items()],
+                "summary": dict(summary)
+            }
+        }
+
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Bulk approve feedback failed: {e}")
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Failed to approve feedback: {str(e)}"
+        )
+
+@app.post("/refresh-index", dependencies=[Depends(require_ready)])
+async def refresh_index():
+    """
+    Reload the in-memory search index from storage
+    """
+    if not await io_pool.run(dataset_manager.load_index, True) or not await io_pool.run(dataset_manager.load_corrections):
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail="Failed to refresh search index"
+        )
+
+    return {
+        "success": True,
+        "message": f"Search index refreshed with {len(dataset_manager.index)} embeddings",
+        "data": {
+            "index_size": len(dataset_manager.index),
+            "corrections_size": len(dataset_manager.corrections),
+            "loaded_at": dataset_manager.index.loaded_at.isoformat(),
+            "index_version": dataset_manager.index_version
+        }
+    }
+
 @app.get("/dataset-stats", response_model=StatsResponse)
 async def get_dataset_stats():
     """
     Get dataset statistics
     """
     try:
-        stats = dataset_manager.get_dataset_info()
+        stats = await io_pool.run(dataset_manager.get_dataset_info)
 
         return StatsResponse(
             success=True,
@@ -903,10 +3462,13 @@ async def get_dataset_stats():
                 "total_records": stats.get('total_records', 0),
                 "unique_skus": stats.get('unique_skus', 0),
                 "clip_records": stats.get('clip_records', 0),
-                "master_skus": stats.get('master_skus', 0)
+                "master_skus": stats.get('master_skus', 0),
+                "age_seconds": stats.get('age_seconds')
             }
         )
 
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Get dataset stats failed: {e}")
         raise HTTPException(
@@ -914,6 +3476,13 @@ async def get_dataset_stats():
             detail=f"Failed to retrieve dataset statistics: {str(e)}"
         )
 
+@app.get("/metrics")
+async def metrics_endpoint():
+    """
+    Prometheus metrics of this worker process
+    """
+    return Response(content=metrics.render(), media_type="text/plain; version=0.0.4; charset=utf-8")
+
 @app.get("/health")
 async def health_check():
     """
@@ -923,13 +3492,56 @@ async def health_check():
         "success": True,
         "message": "API is running",
         "data": {
-            "status": "healthy",
+            "status": "healthy" if warmup.ready.is_set() else "warming_up",
             "timestamp": datetime.now().isoformat(),
-            "bigquery_status": "connected" if dataset_manager.client else "disconnected",
-            "clip_model": config.CLIP_MODEL_NAME
+            "startup": warmup.stats(),
+            "storage_backend": dataset_manager.name,
+            "storage_status": "connected" if dataset_manager.available else "disconnected",
+            # Deprecated alias of storage_status for monitors written against the BigQuery-only service
+            **({"bigquery_status": "connected" if dataset_manager.available else "disconnected"}
+               if dataset_manager.name == "bigquery" else {}),
+            "index_size": len(dataset_manager.index),
+            "index_backend": config.INDEX_BACKEND,
+            "index_version": dataset_manager.index_version,
+            "index_delta_size": dataset_manager.index.delta_size,
+            "index_prototypes": dataset_manager.index.prototype_count,
+            "index_watermark": dataset_manager.index.watermark.isoformat() if dataset_manager.index.watermark else None,
+            "corrections_size": len(dataset_manager.corrections),
+            "sku_cache": dataset_manager.sku_cache.stats(),
+            "clip_model": config.CLIP_MODEL_NAME,
+            "inference_backend": config.INFERENCE_BACKEND,
+            "inference": feature_extractor.batcher.stats() if feature_extractor.batcher else None,
+            "embedding_cache": feature_extractor.cache.stats() if feature_extractor.cache else None,
+            "thumbnail_cache": dataset_manager.thumbnails.stats(),
+            "dataset_stats": dataset_manager.dataset_stats.stats(),
+            "pools": {
+                "inference": inference_pool.stats(),
+                "io": io_pool.stats()
+            }
         }
     }
 
+@app.get("/health/live")
+async def liveness():
+    """
+    Liveness probe: the process is up, even while the model is still loading
+    """
+    if warmup.error:
+        return JSONResponse(status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                            content={"success": False, "message": warmup.error})
+    return {"success": True, "message": "alive"}
+
+@app.get("/health/ready")
+async def readiness():
+    """
+    Readiness probe: 503 until the model, index and corrections are loaded
+    """
+    stats = warmup.stats()
+    if not stats["ready"]:
+        return JSONResponse(status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                            content={"success": False, "message": "warming up", "data": stats})
+    return {"success": True, "message": "ready", "data": stats}
+
 @app.get("/")
 async def root():
     """
@@ -943,23 +3555,50 @@ async def root():
             "description": "Image-based SKU processing and similarity search system",
             "endpoints": {
                 "upload": "/upload-image",
+                "bulk_upload": "/upload-images/bulk",
                 "search": "/search-similar",
+                "search_batch": "/search-similar/batch",
+                "image": "/images/{sha256}",
                 "feedback": "/submit-feedback",
                 "sku_list": "/sku-list",
+                "sku_cache_invalidate": "/sku-cache/invalidate",
                 "pending_feedback": "/pending-feedback",
+                "feedback_image": "/feedback/{feedback_id}/image",
+                "feedback_thumbnail": "/feedback/{feedback_id}/thumbnail",
                 "approve_feedback": "/approve-feedback",
+                "approve_feedback_bulk": "/approve-feedback/bulk",
+                "refresh_index": "/refresh-index",
                 "stats": "/dataset-stats",
-                "health": "/health"
+                "health": "/health",
+                "liveness": "/health/live",
+                "readiness": "/health/ready",
+                "metrics": "/metrics"
             }
         }
     }
 
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="SKU Processor API")
+    parser.add_argument("--host", default="localhost")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--workers", type=int, default=1,
+                        help="Worker processes; they share the published index through INDEX_STORE_PATH")
+    parser.add_argument("--reload", action=argparse.BooleanOptionalAction, default=None,
+                        help="Auto-reload on code changes (default: on for a single worker, off otherwise)")
+    args = parser.parse_args()
+
+    reload = args.workers == 1 if args.reload is None else args.reload
+    if reload and args.workers > 1:
+        parser.error("--reload cannot be combined with --workers > 1")
+    if args.workers > 1 and not config.INDEX_STORE_PATH:
+        logger.warning("INDEX_STORE_PATH is not set: every worker will hold its own copy of the index")
+
     uvicorn.run(
         "main:app",
-        host="localhost",
-        port=8000,
-        reload=True,
+        host=args.host,
+        port=args.port,
+        reload=reload,
+        workers=args.workers,
         log_level="info"
     )
 
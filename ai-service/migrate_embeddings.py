@@ -0,0 +1,119 @@
+"""Migrate stored CLIP embeddings from ARRAY<FLOAT64> columns to packed BYTES blobs.
+
+For sku_images, user_feedback and feedback_training this adds the blob and
+embedding_format columns if they are missing, packs every legacy float array
+that has no blob yet, and writes the blobs back with one load job into a
+staging table plus one UPDATE per table:
+
+    python migrate_embeddings.py --dry-run
+    python migrate_embeddings.py --format float16
+    python migrate_embeddings.py --drop-arrays   # also clear the migrated float arrays
+"""
+import argparse
+import base64
+import sys
+from typing import Optional, List
+
+import numpy as np
+from google.cloud import bigquery
+
+from main import config, dataset_manager
+from vector_index import EMBEDDING_FORMATS, encode_embedding
+
+# (table, key column, legacy array column, blob column)
+EMBEDDING_TABLES = [
+    (config.FULL_TABLE_ID, "id", "clip_features", "clip_embedding"),
+    (config.FULL_FEEDBACK_TABLE_ID, "feedback_id", "image_features", "image_embedding"),
+    (config.FULL_TRAINING_TABLE_ID, "training_id", "image_features", "image_embedding"),
+]
+
+STAGING_SCHEMA = [
+    bigquery.SchemaField("key", "STRING"),
+    bigquery.SchemaField("blob", "BYTES"),
+    bigquery.SchemaField("embedding_format", "STRING"),
+]
+
+
+def run(client: bigquery.Client, sql: str) -> List[bigquery.Row]:
+    return list(client.query(sql).result())
+
+
+def migrate_table(client: bigquery.Client, table: str, key: str, array_column: str, blob_column: str,
+                  storage_format: str, page_size: int, dry_run: bool, drop_arrays: bool):
+    run(client, f"""
+        ALTER TABLE `{table}`
+        ADD COLUMN IF NOT EXISTS {blob_column} BYTES,
+        ADD COLUMN IF NOT EXISTS embedding_format STRING
+    """)
+
+    pending_filter = f"{blob_column} IS NULL AND ARRAY_LENGTH({array_column}) > 0"
+    pending = run(client, f"SELECT COUNT(*) AS n FROM `{table}` WHERE {pending_filter}")[0].n
+    print(f"{table}: {pending} rows to migrate to {storage_format}")
+    if dry_run or not pending:
+        return
+
+    staging_table = f"{table}__embedding_migration"
+    rows = client.query(f"SELECT {key} AS key, {array_column} AS features FROM `{table}` WHERE {pending_filter}").result(
+        page_size=page_size)
+
+    staged = 0
+    disposition = bigquery.WriteDisposition.WRITE_TRUNCATE
+    for page in rows.pages:
+        page_rows = list(page)
+        json_rows = []
+        for row in page_rows:
+            blob, tag = encode_embedding(np.asarray(row.features, dtype=np.float32), storage_format)
+            json_rows.append({"key": row.key, "blob": base64.b64encode(blob).decode("ascii"), "embedding_format": tag})
+
+        job_config = bigquery.LoadJobConfig(schema=STAGING_SCHEMA, write_disposition=disposition)
+        client.load_table_from_json(json_rows, staging_table, job_config=job_config).result()
+        disposition = bigquery.WriteDisposition.WRITE_APPEND
+        staged += len(json_rows)
+        print(f"  staged {staged}/{pending}", flush=True)
+
+    run(client, f"""
+        UPDATE `{table}` t
+        SET {blob_column} = s.blob, embedding_format = s.embedding_format
+        FROM `{staging_table}` s
+        WHERE t.{key} = s.key AND t.{blob_column} IS NULL
+    """)
+    client.delete_table(staging_table, not_found_ok=True)
+
+    remaining = run(client, f"SELECT COUNT(*) AS n FROM `{table}` WHERE {pending_filter}")[0].n
+    print(f"  migrated {pending - remaining} rows, {remaining} still without a blob")
+
+    if drop_arrays:
+        run(client, f"""
+            UPDATE `{table}`
+            SET {array_column} = []
+            WHERE {blob_column} IS NOT NULL AND ARRAY_LENGTH({array_column}) > 0
+        """)
+        print(f"  cleared {array_column} on migrated rows")
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--format", choices=sorted(EMBEDDING_FORMATS),
+                        default=config.EMBEDDING_STORAGE_FORMAT if config.EMBEDDING_STORAGE_FORMAT in EMBEDDING_FORMATS else "float32")
+    parser.add_argument("--page-size", type=int, default=20000, help="Rows encoded and staged per load job")
+    parser.add_argument("--dry-run", action="store_true", help="Only add the columns and count rows to migrate")
+    parser.add_argument("--drop-arrays", action="store_true", help="Empty the legacy float arrays of migrated rows")
+    args = parser.parse_args(argv)
+
+    if dataset_manager.name != "bigquery":
+        print(f"Nothing to migrate: STORAGE_BACKEND is {dataset_manager.name}, not bigquery")
+        return 1
+
+    dataset_manager.connect()
+    if not dataset_manager.client:
+        print("BigQuery client not available")
+        return 1
+
+    for table, key, array_column, blob_column in EMBEDDING_TABLES:
+        migrate_table(dataset_manager.client, table, key, array_column, blob_column,
+                      args.format, args.page_size, args.dry_run, args.drop_arrays)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
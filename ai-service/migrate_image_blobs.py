@@ -0,0 +1,94 @@
+"""Move base64 images out of sku_images.image_data into the blob store.
+
+Adds the image_sha256 column if it is missing, writes every legacy image
+into the configured blob store, and records the hashes with one load job
+into a staging table plus one UPDATE:
+
+    python migrate_image_blobs.py --dry-run
+    python migrate_image_blobs.py --drop-image-data   # also NULL the migrated image_data
+"""
+import argparse
+import base64
+import sys
+from typing import Optional, List
+
+from google.cloud import bigquery
+
+from main import config, dataset_manager
+
+STAGING_SCHEMA = [
+    bigquery.SchemaField("id", "STRING"),
+    bigquery.SchemaField("image_sha256", "STRING"),
+]
+
+
+def run(client: bigquery.Client, sql: str) -> List[bigquery.Row]:
+    return list(client.query(sql).result())
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--page-size", type=int, default=500, help="Images copied per staged load job")
+    parser.add_argument("--dry-run", action="store_true", help="Only add the column and count rows to migrate")
+    parser.add_argument("--drop-image-data", action="store_true", help="Set image_data to NULL on migrated rows")
+    args = parser.parse_args(argv)
+
+    if dataset_manager.name != "bigquery":
+        print(f"Nothing to migrate: STORAGE_BACKEND is {dataset_manager.name}, not bigquery")
+        return 1
+
+    dataset_manager.connect()
+    client = dataset_manager.client
+    if not client:
+        print("BigQuery client not available")
+        return 1
+
+    table = config.FULL_TABLE_ID
+    run(client, f"ALTER TABLE `{table}` ADD COLUMN IF NOT EXISTS image_sha256 STRING")
+
+    pending_filter = "image_sha256 IS NULL AND image_data IS NOT NULL"
+    pending = run(client, f"SELECT COUNT(*) AS n FROM `{table}` WHERE {pending_filter}")[0].n
+    print(f"{table}: {pending} images to move into {config.BLOB_STORE_BACKEND} blob store at {config.BLOB_STORE_PATH}")
+
+    if pending and not args.dry_run:
+        staging_table = f"{table}__image_migration"
+        rows = client.query(f"SELECT id, image_data FROM `{table}` WHERE {pending_filter}").result(page_size=args.page_size)
+
+        copied, failed = 0, 0
+        disposition = bigquery.WriteDisposition.WRITE_TRUNCATE
+        for page in rows.pages:
+            json_rows = []
+            for row in page:
+                try:
+                    digest = dataset_manager.blob_store.put(base64.b64decode(row.image_data))
+                    json_rows.append({"id": row.id, "image_sha256": digest})
+                except Exception as e:
+                    failed += 1
+                    print(f"  FAILED {row.id}: {e}")
+
+            if json_rows:
+                job_config = bigquery.LoadJobConfig(schema=STAGING_SCHEMA, write_disposition=disposition)
+                client.load_table_from_json(json_rows, staging_table, job_config=job_config).result()
+                disposition = bigquery.WriteDisposition.WRITE_APPEND
+                copied += len(json_rows)
+            print(f"  copied {copied}/{pending}", flush=True)
+
+        if copied:
+            run(client, f"""
+                UPDATE `{table}` t
+                SET image_sha256 = s.image_sha256
+                FROM `{staging_table}` s
+                WHERE t.id = s.id AND t.image_sha256 IS NULL
+            """)
+        client.delete_table(staging_table, not_found_ok=True)
+        print(f"  recorded {copied} hashes, {failed} failed")
+
+    if args.drop_image_data and not args.dry_run:
+        run(client, f"UPDATE `{table}` SET image_data = NULL WHERE image_sha256 IS NOT NULL AND image_data IS NOT NULL")
+        print("  cleared image_data on migrated rows")
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
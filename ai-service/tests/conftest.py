@@ -0,0 +1,47 @@
+import io
+import os
+import sys
+import tempfile
+
+import numpy as np
+import pytest
+from PIL import Image
+
+# main builds its storage backend at import, so point it at a throwaway SQLite store first
+_scratch = tempfile.mkdtemp(prefix="borosil-lens-tests-")
+os.environ.update({
+    "BOROSIL_LENS_STORAGE_BACKEND": "sqlite",
+    "BOROSIL_LENS_SQLITE_PATH": os.path.join(_scratch, "service.db"),
+    "BOROSIL_LENS_INDEX_STORE_PATH": os.path.join(_scratch, "index_store"),
+    "BOROSIL_LENS_BLOB_STORE_PATH": os.path.join(_scratch, "image_blobs"),
+    "BOROSIL_LENS_INDEX_BACKEND": "flat",
+    "BOROSIL_LENS_INDEX_REFRESH_SECONDS": "0",
+})
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import main  # noqa: E402
+
+DIM = 16
+
+
+@pytest.fixture
+def manager(tmp_path, monkeypatch):
+    """A connected SQLite backend with its own database, blob store and index store"""
+    monkeypatch.setattr(main.Config, "SQLITE_PATH", str(tmp_path / "service.db"))
+    monkeypatch.setattr(main.Config, "INDEX_STORE_PATH", str(tmp_path / "index_store"))
+    monkeypatch.setattr(main.Config, "BLOB_STORE_PATH", str(tmp_path / "image_blobs"))
+    backend = main.create_storage_backend()
+    backend.connect()
+    assert backend.available
+    return backend
+
+
+def unit_vector(rng: np.random.Generator) -> np.ndarray:
+    vector = rng.standard_normal(DIM).astype(np.float32)
+    return vector / np.linalg.norm(vector)
+
+
+def jpeg_bytes(seed: int) -> bytes:
+    buffer = io.BytesIO()
+    Image.new("RGB", (32, 24), (seed % 256, 80, 160)).save(buffer, format="JPEG")
+    return buffer.getvalue()
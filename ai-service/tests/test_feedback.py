@@ -0,0 +1,97 @@
+from datetime import datetime
+
+import numpy as np
+import pytest
+
+import main
+from conftest import jpeg_bytes, unit_vector
+
+
+def save_feedback(manager, rng, correct_sku="SKU-B"):
+    ok, feedback_id = manager.save_feedback("user-1", "SKU-A", correct_sku, unit_vector(rng), jpeg_bytes(1))
+    assert ok
+    return feedback_id
+
+
+def training_rows(manager):
+    return manager._query("SELECT training_id, feedback_id, correct_sku FROM feedback_training")
+
+
+def test_bulk_approval_outcomes(manager):
+    rng = np.random.default_rng(0)
+    first, second, done = (save_feedback(manager, rng) for _ in range(3))
+    assert manager.approve_feedback_bulk([done], "admin") == {done: "approved"}
+
+    outcomes = manager.approve_feedback_bulk([first, second, first, "missing", done], "admin")
+
+    assert outcomes == {first: "approved", second: "approved", "missing": "not_found", done: "already_processed"}
+    rows = training_rows(manager)
+    assert sorted(row.feedback_id for row in rows) == sorted([first, second, done])
+    assert all(len(row.training_id) == 32 for row in rows)
+    assert len({row.training_id for row in rows}) == 3
+    assert len(manager.corrections) == 3
+
+
+def test_bulk_approval_is_idempotent(manager):
+    rng = np.random.default_rng(1)
+    feedback_id = save_feedback(manager, rng)
+
+    assert manager.approve_feedback(feedback_id, "admin")
+    assert not manager.approve_feedback(feedback_id, "other-admin")
+    assert manager.approve_feedback_bulk([feedback_id], "other-admin") == {feedback_id: "already_processed"}
+    assert len(training_rows(manager)) == 1
+    row = manager._query("SELECT status, admin_name FROM user_feedback WHERE feedback_id = ?", (feedback_id,))[0]
+    assert (row.status, row.admin_name) == ("APPROVED", "admin")
+
+
+def test_bulk_approval_of_unknown_ids(manager):
+    assert manager.approve_feedback_bulk(["nope", "nope", "gone"], "admin") == {"nope": "not_found", "gone": "not_found"}
+    assert training_rows(manager) == []
+
+
+def test_cursor_round_trip():
+    complaint_time = datetime(2024, 3, 1, 12, 30, 15, 120)
+    cursor = main.encode_feedback_cursor(complaint_time, "a|b")
+
+    assert "=" not in cursor
+    assert main.decode_feedback_cursor(cursor) == (complaint_time, "a|b")
+
+
+@pytest.mark.parametrize("cursor", ["", "not a cursor", "bm8tc2VwYXJhdG9y", "MjAyNC0xMy0wMXxhYmM"])
+def test_invalid_cursor(cursor):
+    with pytest.raises(ValueError):
+        main.decode_feedback_cursor(cursor)
+
+
+def test_pending_feedback_pages(manager):
+    rng = np.random.default_rng(2)
+    # Two rows share a timestamp, so the feedback_id tie-break has to carry across a page boundary
+    times = [datetime(2024, 1, 1, 9, 0, 0), datetime(2024, 1, 1, 10, 0, 0), datetime(2024, 1, 1, 10, 0, 0),
+             datetime(2024, 1, 1, 11, 0, 0), datetime(2024, 1, 1, 12, 0, 0, 500)]
+    for position, complaint_time in enumerate(times):
+        features, embedding, embedding_format = manager._embedding_columns(unit_vector(rng))
+        manager._insert_feedback({
+            'feedback_id': f"fb-{position}", 'username': "user-1", 'predicted_sku': "SKU-A",
+            'correct_sku': "SKU-B", 'image_features': features, 'image_embedding': embedding,
+            'embedding_format': embedding_format, 'image_data': None, 'image_name': f"fb-{position}.jpg",
+            'file_size': 0, 'complaint_time': complaint_time, 'status': 'PENDING',
+            'admin_name': None, 'approval_time': None,
+        })
+    manager.approve_feedback("fb-3", "admin")
+
+    seen, totals, cursor = [], [], None
+    while True:
+        page = manager.get_pending_feedback(2, cursor)
+        seen.extend(item['feedback_id'] for item in page['feedback_list'])
+        totals.append(page['total_pending'])
+        cursor = page['next_cursor']
+        if not cursor:
+            break
+
+    assert seen == ["fb-4", "fb-2", "fb-1", "fb-0"]
+    assert totals == [4, None]
+
+
+def test_pending_feedback_rejects_bad_cursor(manager):
+    with pytest.raises(ValueError):
+        manager.get_pending_feedback(10, "not a cursor")
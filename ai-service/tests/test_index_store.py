@@ -0,0 +1,106 @@
+import os
+
+import numpy as np
+import pytest
+
+from conftest import DIM, jpeg_bytes, unit_vector
+from vector_index import IndexStore, SnapshotError
+
+
+def flip_byte(path: str):
+    """Corrupt a file without changing its size, so only the checksum can tell"""
+    with open(path, "r+b") as handle:
+        handle.seek(-1, os.SEEK_END)
+        last = handle.read(1)
+        handle.seek(-1, os.SEEK_END)
+        handle.write(bytes([last[0] ^ 0xFF]))
+
+
+def publish(store: IndexStore, rows: int = 4) -> str:
+    rng = np.random.default_rng(rows)
+    vectors = np.stack([unit_vector(rng) for _ in range(rows)])
+    ids = [f"id-{i}" for i in range(rows)]
+    return store.publish(ids, [f"SKU-{i}" for i in range(rows)], vectors, [{"id": i} for i in ids])
+
+
+def seed_catalogue(manager, rows: int = 6):
+    rng = np.random.default_rng(7)
+    records = [{"id": f"img-{i}", "sku_code": f"SKU-{i % 3}", "image_bytes": jpeg_bytes(i),
+                "features": unit_vector(rng)} for i in range(rows)]
+    assert all(error is None for error in manager.save_records_bulk(records, "tester").values())
+
+
+def test_checksum_catches_same_size_corruption(tmp_path):
+    store = IndexStore(str(tmp_path))
+    version = publish(store)
+    flip_byte(tmp_path / version / "vectors.npy")
+
+    store.verify(version, checksums=False)
+    with pytest.raises(SnapshotError, match="checksum"):
+        store.load(version)
+
+
+@pytest.mark.parametrize("damage", ["truncate", "delete", "manifest"])
+def test_size_check_catches_damaged_snapshot(tmp_path, damage):
+    store = IndexStore(str(tmp_path))
+    version = publish(store)
+    folder = tmp_path / version
+    if damage == "truncate":
+        with open(folder / "rows.json", "r+b") as handle:
+            handle.truncate(10)
+    elif damage == "delete":
+        os.remove(folder / "vectors.npy")
+    else:
+        (folder / "manifest.json").write_text("{")
+
+    with pytest.raises(SnapshotError):
+        store.load(version, checksums=False)
+
+
+def test_quarantine_falls_back_to_previous_version(tmp_path):
+    store = IndexStore(str(tmp_path))
+    older, newer = publish(store), publish(store, rows=5)
+    assert store.current() == newer
+
+    store.quarantine(newer)
+
+    assert store.current() == older
+    assert os.path.isdir(tmp_path / f".corrupt-{newer}")
+    store.quarantine(older)
+    assert store.current() is None
+
+
+def test_load_index_rebuilds_from_corrupt_snapshot(manager):
+    seed_catalogue(manager)
+    assert manager.load_index()
+    corrupt = manager.index_version
+    flip_byte(os.path.join(manager.index_store.root, corrupt, "vectors.npy"))
+
+    restarted = type(manager)(manager.path)
+    restarted.connect()
+    assert restarted.load_index()
+
+    assert restarted.index_version not in (None, corrupt)
+    assert restarted.index_store.current() == restarted.index_version
+    assert os.path.isdir(os.path.join(manager.index_store.root, f".corrupt-{corrupt}"))
+    assert len(restarted.index) == 6
+    assert restarted.index.export()[2].shape == (6, DIM)
+
+
+def test_swap_to_damaged_version_keeps_serving(manager):
+    seed_catalogue(manager)
+    assert manager.load_index()
+    serving = manager.index_version
+
+    sibling = type(manager)(manager.path)
+    sibling.connect()
+    assert sibling.load_index(force=True)
+    damaged = sibling.index_version
+    with open(os.path.join(manager.index_store.root, damaged, "vectors.npy"), "r+b") as handle:
+        handle.truncate(64)
+
+    manager.check_index_version()
+
+    assert manager.index_version == serving
+    assert len(manager.index) == 6
+    assert manager.index_store.current() == serving
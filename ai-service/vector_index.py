@@ -0,0 +1,1116 @@
+import copy
+import hashlib
+import json
+import os
+import shutil
+import threading
+import time
+import uuid
+from collections import namedtuple
+from contextlib import contextmanager
+from datetime import datetime
+from typing import Optional, List, Dict, Any, Sequence, Tuple
+
+import numpy as np
+
+try:
+    import hnswlib
+except ImportError:
+    hnswlib = None
+
+try:
+    import fcntl
+except ImportError:  # Windows: single-process deployments only
+    fcntl = None
+
+FUSIONS = ("max", "mean")
+
+IndexState = namedtuple("IndexState", ["backend", "delta", "ids", "sku_codes", "metadata", "prototypes"])
+
+# Storage format name -> (version tag written next to the blob, little-endian numpy dtype)
+EMBEDDING_FORMATS = {
+    "float32": ("f32le/v1", "<f4"),
+    "float16": ("f16le/v1", "<f2"),
+}
+EMBEDDING_TAG_DTYPES = {tag: dtype for tag, dtype in EMBEDDING_FORMATS.values()}
+
+
+def encode_embedding(vector: np.ndarray, storage_format: str) -> Tuple[bytes, str]:
+    """Pack a vector as little-endian float32/float16 bytes; returns (blob, version tag)"""
+    if storage_format not in EMBEDDING_FORMATS:
+        raise ValueError(f"Unknown embedding storage format '{storage_format}'. Choose from: {', '.join(EMBEDDING_FORMATS)}")
+    tag, dtype = EMBEDDING_FORMATS[storage_format]
+    return np.asarray(vector, dtype=np.float32).astype(dtype).tobytes(), tag
+
+
+def decode_embeddings(arrays: Sequence[Optional[Sequence[float]]], blobs: Sequence[Optional[bytes]],
+                      tags: Sequence[Optional[str]]) -> Tuple[np.ndarray, np.ndarray]:
+    """Decode stored embeddings row-aligned into a float32 matrix plus a mask of rows that decoded.
+
+    A packed blob wins over the legacy float array on the same row. Blobs sharing a tag are
+    decoded together with one np.frombuffer call; rows whose width differs from the first
+    decodable row, or whose tag is unknown, are left out of the mask.
+    """
+    groups: Dict[str, List[int]] = {}
+    dim = None
+    for row, (array, blob, tag) in enumerate(zip(arrays, blobs, tags)):
+        if blob:
+            if tag not in EMBEDDING_TAG_DTYPES:
+                continue
+            groups.setdefault(tag, []).append(row)
+            if dim is None:
+                dim = len(blob) // np.dtype(EMBEDDING_TAG_DTYPES[tag]).itemsize
+        elif array:
+            groups.setdefault("array", []).append(row)
+            if dim is None:
+                dim = len(array)
+
+    count = len(blobs)
+    matrix = np.zeros((count, dim or 0), dtype=np.float32)
+    valid = np.zeros(count, dtype=bool)
+    if dim is None:
+        return matrix, valid
+
+    for tag, rows in groups.items():
+        if tag == "array":
+            rows = [row for row in rows if len(arrays[row]) == dim]
+            if rows:
+                matrix[rows] = np.array([arrays[row] for row in rows], dtype=np.float32)
+        else:
+            dtype = np.dtype(EMBEDDING_TAG_DTYPES[tag])
+            rows = [row for row in rows if len(blobs[row]) == dim * dtype.itemsize]
+            if rows:
+                packed = b"".join(blobs[row] for row in rows)
+                matrix[rows] = np.frombuffer(packed, dtype=dtype).reshape(len(rows), dim)
+        valid[rows] = True
+
+    return matrix, valid
+
+
+def normalize_rows(matrix: np.ndarray) -> np.ndarray:
+    """L2-normalize each row as float32, leaving all-zero rows at zero"""
+    matrix = np.asarray(matrix, dtype=np.float32)
+    if matrix.ndim == 1:
+        matrix = matrix.reshape(1, -1)
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return matrix / norms
+
+
+def top_k_rows(scores: np.ndarray, k: int) -> np.ndarray:
+    """Positions of the k highest scores, best first; ties keep their original order"""
+    if k <= 0 or scores.size == 0:
+        return np.empty(0, dtype=np.int64)
+    if k < scores.size:
+        part = np.sort(np.argpartition(-scores, k - 1)[:k])
+    else:
+        part = np.arange(scores.size)
+    return part[np.argsort(-scores[part], kind="stable")]
+
+
+def top_k_columns(scores: np.ndarray, k: int) -> np.ndarray:
+    """Row positions of the k highest scores in every column, best first (k x columns)"""
+    k = min(k, scores.shape[0])
+    if k <= 0:
+        return np.empty((0, scores.shape[1]), dtype=np.int64)
+    part = np.argpartition(-scores, k - 1, axis=0)[:k] if k < scores.shape[0] else \
+        np.broadcast_to(np.arange(scores.shape[0])[:, None], scores.shape)
+    order = np.argsort(-np.take_along_axis(scores, part, axis=0), axis=0, kind="stable")
+    return np.take_along_axis(part, order, axis=0)
+
+
+# Score blocks of at most this many floats when many queries are scored at once
+MAX_SCORE_BLOCK = 1 << 25
+
+
+class IndexBackend:
+    """Nearest-neighbour structure over unit vectors, scored by inner product"""
+
+    name = "base"
+
+    def __init__(self):
+        self.vectors = np.zeros((0, 0), dtype=np.float32)
+
+    def __len__(self) -> int:
+        return self.vectors.shape[0]
+
+    @property
+    def dim(self) -> int:
+        return self.vectors.shape[1]
+
+    def build(self, vectors: np.ndarray):
+        raise NotImplementedError
+
+    def add(self, vectors: np.ndarray):
+        raise NotImplementedError
+
+    def extended(self, vectors: np.ndarray) -> "IndexBackend":
+        """Copy with vectors appended; searches still holding this backend keep seeing it unchanged.
+        add() only rebinds fresh arrays, so a shallow copy is enough unless a backend mutates in place."""
+        backend = copy.copy(self)
+        backend.add(vectors)
+        return backend
+
+    def params(self) -> Dict[str, Any]:
+        """Settings a saved search structure depends on; it is only restored when they match"""
+        return {}
+
+    def save(self, folder: str) -> List[str]:
+        """Write the search structure built over vectors into folder; returns the file names"""
+        return []
+
+    def restore(self, folder: str, vectors: np.ndarray):
+        """Serve vectors with the structure save() wrote, instead of building it again"""
+        self.build(vectors)
+
+    def search(self, query: np.ndarray, k: int) -> Tuple[np.ndarray, np.ndarray]:
+        """Row numbers and scores of the k best rows, best first"""
+        raise NotImplementedError
+
+    def search_batch(self, queries: np.ndarray, k: int) -> List[Tuple[np.ndarray, np.ndarray]]:
+        """search() for every row of queries"""
+        return [self.search(query, k) for query in queries]
+
+
+class FlatBackend(IndexBackend):
+    """Exact search: one matrix-vector product over every row"""
+
+    name = "flat"
+
+    def build(self, vectors: np.ndarray):
+        self.vectors = np.ascontiguousarray(vectors, dtype=np.float32)
+
+    def add(self, vectors: np.ndarray):
+        self.vectors = vectors if not len(self) else np.vstack([self.vectors, vectors])
+
+    def search(self, query: np.ndarray, k: int) -> Tuple[np.ndarray, np.ndarray]:
+        vectors = self.vectors
+        scores = vectors @ query
+        rows = top_k_rows(scores, k)
+        return rows, scores[rows]
+
+    def search_batch(self, queries: np.ndarray, k: int) -> List[Tuple[np.ndarray, np.ndarray]]:
+        """One matrix-matrix product per block of queries instead of a scan per query"""
+        vectors = self.vectors
+        if not len(vectors):
+            return [(np.empty(0, dtype=np.int64), np.empty(0, dtype=np.float32)) for _ in queries]
+
+        results = []
+        step = max(1, MAX_SCORE_BLOCK // len(vectors))
+        for start in range(0, len(queries), step):
+            scores = vectors @ queries[start:start + step].T
+            rows = top_k_columns(scores, k)
+            best = np.take_along_axis(scores, rows, axis=0)
+            results.extend((rows[:, i], best[:, i]) for i in range(rows.shape[1]))
+        return results
+
+
+class IVFBackend(IndexBackend):
+    """Inverted-file index: spherical k-means lists, only the nprobe closest lists are scanned"""
+
+    name = "ivf"
+
+    def __init__(self, nlist: int = 256, nprobe: int = 16, train_iters: int = 10, seed: int = 0):
+        super().__init__()
+        self.nlist = nlist
+        self.nprobe = nprobe
+        self.train_iters = train_iters
+        self.seed = seed
+        self.centroids = np.zeros((0, 0), dtype=np.float32)
+        self.lists: List[np.ndarray] = []
+
+    def _assign(self, vectors: np.ndarray, centroids: np.ndarray) -> np.ndarray:
+        assignments = np.empty(vectors.shape[0], dtype=np.int64)
+        for start in range(0, vectors.shape[0], 65536):
+            chunk = vectors[start:start + 65536]
+            assignments[start:start + 65536] = np.argmax(chunk @ centroids.T, axis=1)
+        return assignments
+
+    def _train(self, vectors: np.ndarray) -> np.ndarray:
+        rng = np.random.default_rng(self.seed)
+        nlist = max(1, min(self.nlist, vectors.shape[0] // 39))
+        sample_size = min(vectors.shape[0], nlist * 256)
+        sample = vectors[rng.choice(vectors.shape[0], sample_size, replace=False)]
+        centroids = sample[rng.choice(sample_size, nlist, replace=False)].copy()
+
+        for _ in range(self.train_iters):
+            assignments = self._assign(sample, centroids)
+            sums = np.zeros_like(centroids)
+            np.add.at(sums, assignments, sample)
+            counts = np.bincount(assignments, minlength=nlist)
+            empty = np.flatnonzero(counts == 0)
+            if empty.size:
+                sums[empty] = sample[rng.choice(sample_size, empty.size, replace=False)]
+            centroids = normalize_rows(sums)
+        return centroids
+
+    def build(self, vectors: np.ndarray):
+        vectors = np.ascontiguousarray(vectors, dtype=np.float32)
+        if not vectors.shape[0]:
+            self.vectors, self.centroids, self.lists = vectors, np.zeros((0, vectors.shape[1]), dtype=np.float32), []
+            return
+
+        centroids = self._train(vectors)
+        assignments = self._assign(vectors, centroids)
+        order = np.argsort(assignments, kind="stable")
+        bounds = np.searchsorted(assignments[order], np.arange(centroids.shape[0] + 1))
+        self.lists = [order[bounds[i]:bounds[i + 1]] for i in range(centroids.shape[0])]
+        self.centroids = centroids
+        self.vectors = vectors
+
+    def add(self, vectors: np.ndarray):
+        if not len(self.lists):
+            self.build(vectors if not len(self) else np.vstack([self.vectors, vectors]))
+            return
+
+        start = len(self)
+        assignments = self._assign(vectors, self.centroids)
+        lists = list(self.lists)
+        for offset, list_id in enumerate(assignments):
+            lists[list_id] = np.append(lists[list_id], start + offset)
+        self.vectors = np.vstack([self.vectors, vectors])
+        self.lists = lists
+
+    def params(self) -> Dict[str, Any]:
+        return {"nlist": self.nlist, "train_iters": self.train_iters, "seed": self.seed}
+
+    def save(self, folder: str) -> List[str]:
+        lists = self.lists
+        bounds = np.cumsum([0] + [len(rows) for rows in lists]).astype(np.int64)
+        rows = np.concatenate(lists).astype(np.int64) if lists else np.empty(0, dtype=np.int64)
+        np.save(os.path.join(folder, "ivf_centroids.npy"), np.ascontiguousarray(self.centroids, dtype=np.float32))
+        np.save(os.path.join(folder, "ivf_rows.npy"), rows)
+        np.save(os.path.join(folder, "ivf_bounds.npy"), bounds)
+        return ["ivf_centroids.npy", "ivf_rows.npy", "ivf_bounds.npy"]
+
+    def restore(self, folder: str, vectors: np.ndarray):
+        """Map the saved centroids and lists read-only, like the vectors, so workers share them"""
+        centroids = np.load(os.path.join(folder, "ivf_centroids.npy"), mmap_mode="r")
+        rows = np.load(os.path.join(folder, "ivf_rows.npy"), mmap_mode="r")
+        bounds = np.load(os.path.join(folder, "ivf_bounds.npy"))
+        self.lists = [rows[bounds[i]:bounds[i + 1]] for i in range(len(bounds) - 1)]
+        self.centroids = centroids
+        self.vectors = vectors
+
+    def search(self, query: np.ndarray, k: int) -> Tuple[np.ndarray, np.ndarray]:
+        lists, vectors = self.lists, self.vectors
+        if not len(lists):
+            return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.float32)
+
+        probe = top_k_rows(self.centroids @ query, min(self.nprobe, len(lists)))
+        rows = np.concatenate([lists[i] for i in probe])
+        rows.sort()
+        scores = vectors[rows] @ query
+        best = top_k_rows(scores, k)
+        return rows[best], scores[best]
+
+
+class HNSWBackend(IndexBackend):
+    """Graph-based approximate search through hnswlib.
+
+    hnswlib keeps the graph and its own copy of every vector in process memory, so a
+    saved graph spares each worker the rebuild but not the memory: with several workers
+    only the flat and ivf backends share one copy of the index through the page cache.
+    """
+
+    name = "hnsw"
+
+    def __init__(self, m: int = 16, ef_construction: int = 200, ef_search: int = 64):
+        if hnswlib is None:
+            raise ImportError("INDEX_BACKEND 'hnsw' requires the hnswlib package")
+        super().__init__()
+        self.m = m
+        self.ef_construction = ef_construction
+        self.ef_search = ef_search
+        self.graph = None
+        self._lock = threading.Lock()
+
+    def build(self, vectors: np.ndarray):
+        vectors = np.ascontiguousarray(vectors, dtype=np.float32)
+        graph = hnswlib.Index(space="ip", dim=vectors.shape[1])
+        graph.init_index(max_elements=max(1024, vectors.shape[0]), ef_construction=self.ef_construction, M=self.m)
+        if vectors.shape[0]:
+            graph.add_items(vectors, np.arange(vectors.shape[0]))
+        with self._lock:
+            self.graph = graph
+            self.vectors = vectors
+
+    def add(self, vectors: np.ndarray):
+        if self.graph is None:
+            self.build(vectors)
+            return
+
+        with self._lock:
+            start = len(self)
+            needed = start + vectors.shape[0]
+            if needed > self.graph.get_max_elements():
+                self.graph.resize_index(max(needed, 2 * self.graph.get_max_elements()))
+            self.graph.add_items(vectors, np.arange(start, needed))
+            self.vectors = np.vstack([self.vectors, vectors])
+
+    def extended(self, vectors: np.ndarray) -> "HNSWBackend":
+        """hnswlib adds items to the graph in place, so the copy gets its own graph"""
+        backend = HNSWBackend(self.m, self.ef_construction, self.ef_search)
+        with self._lock:
+            backend.graph = copy.deepcopy(self.graph) if self.graph is not None else None
+            backend.vectors = self.vectors
+        backend.add(vectors)
+        return backend
+
+    def params(self) -> Dict[str, Any]:
+        return {"m": self.m, "ef_construction": self.ef_construction}
+
+    def save(self, folder: str) -> List[str]:
+        with self._lock:
+            self.graph.save_index(os.path.join(folder, "hnsw.bin"))
+        return ["hnsw.bin"]
+
+    def restore(self, folder: str, vectors: np.ndarray):
+        graph = hnswlib.Index(space="ip", dim=vectors.shape[1])
+        graph.load_index(os.path.join(folder, "hnsw.bin"), max_elements=max(1024, vectors.shape[0]))
+        with self._lock:
+            self.graph = graph
+            self.vectors = vectors
+
+    def search(self, query: np.ndarray, k: int) -> Tuple[np.ndarray, np.ndarray]:
+        with self._lock:
+            count = self.graph.get_current_count() if self.graph is not None else 0
+            k = min(k, count)
+            if k <= 0:
+                return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.float32)
+            self.graph.set_ef(max(self.ef_search, k))
+            labels, distances = self.graph.knn_query(query.reshape(1, -1), k=k)
+        return labels[0].astype(np.int64), (1.0 - distances[0]).astype(np.float32)
+
+    def search_batch(self, queries: np.ndarray, k: int) -> List[Tuple[np.ndarray, np.ndarray]]:
+        with self._lock:
+            count = self.graph.get_current_count() if self.graph is not None else 0
+            k = min(k, count)
+            if k <= 0:
+                return [(np.empty(0, dtype=np.int64), np.empty(0, dtype=np.float32)) for _ in queries]
+            self.graph.set_ef(max(self.ef_search, k))
+            labels, distances = self.graph.knn_query(np.ascontiguousarray(queries, dtype=np.float32), k=k)
+        return [(labels[i].astype(np.int64), (1.0 - distances[i]).astype(np.float32)) for i in range(len(queries))]
+
+
+BACKENDS = {
+    FlatBackend.name: FlatBackend,
+    IVFBackend.name: IVFBackend,
+    HNSWBackend.name: HNSWBackend,
+}
+
+
+def create_backend(name: str, **params) -> IndexBackend:
+    if name not in BACKENDS:
+        raise ValueError(f"Unknown index backend '{name}'. Choose from: {', '.join(BACKENDS)}")
+    return BACKENDS[name](**params)
+
+
+class SkuPrototypes:
+    """A few unit centroids per SKU plus the index rows of each SKU, for coarse-to-fine search.
+
+    Centroids are kept as running sums, so rows added later only move their SKU's
+    nearest centroid; the clustering itself is redone whenever the index is rebuilt.
+    Instances are never changed in place: added() returns an updated copy.
+    """
+
+    def __init__(self, per_sku: int, dim: int):
+        self.per_sku = per_sku
+        self.owners = np.empty(0, dtype=object)  # SKU of each prototype row
+        self.sums = np.zeros((0, dim), dtype=np.float32)
+        self.vectors = np.zeros((0, dim), dtype=np.float32)
+        self.sku_rows: Dict[str, np.ndarray] = {}
+        self.sku_slots: Dict[str, np.ndarray] = {}  # prototype rows of each SKU
+
+    def __len__(self) -> int:
+        return len(self.owners)
+
+    @property
+    def sku_count(self) -> int:
+        return len(self.sku_rows)
+
+    @staticmethod
+    def _cluster(vectors: np.ndarray, count: int, iterations: int, rng: np.random.Generator) -> np.ndarray:
+        """Sums of up to count spherical k-means clusters of one SKU's rows"""
+        if count <= 1 or len(vectors) < 2 * count:
+            return vectors.sum(axis=0, keepdims=True)
+
+        centres = vectors[rng.choice(len(vectors), count, replace=False)]
+        for _ in range(iterations):
+            assignments = np.argmax(vectors @ centres.T, axis=1)
+            sums = np.zeros_like(centres)
+            np.add.at(sums, assignments, vectors)
+            used = np.bincount(assignments, minlength=count) > 0
+            centres = np.where(used[:, None], normalize_rows(sums), centres)
+        return sums[used]
+
+    @classmethod
+    def build(cls, sku_codes: Sequence[str], vectors: np.ndarray, per_sku: int,
+              iterations: int = 5, seed: int = 0) -> "SkuPrototypes":
+        prototypes = cls(per_sku, vectors.shape[1] if vectors.ndim == 2 else 0)
+        codes = np.asarray(sku_codes, dtype=object)
+        if not len(codes):
+            return prototypes
+
+        order = np.argsort(codes, kind="stable")
+        grouped = codes[order]
+        starts = np.flatnonzero(np.r_[True, grouped[1:] != grouped[:-1]])
+        rng = np.random.default_rng(seed)
+        owners, sums = [], []
+        for start, end in zip(starts, np.r_[starts[1:], len(order)]):
+            sku_code, rows = grouped[start], order[start:end]
+            group = cls._cluster(np.asarray(vectors[rows], dtype=np.float32), per_sku, iterations, rng)
+            prototypes.sku_rows[sku_code] = rows
+            prototypes.sku_slots[sku_code] = np.arange(len(owners), len(owners) + len(group))
+            owners.extend([sku_code] * len(group))
+            sums.append(group)
+        prototypes.owners = np.array(owners, dtype=object)
+        prototypes.sums = np.vstack(sums)
+        prototypes.vectors = normalize_rows(prototypes.sums)
+        return prototypes
+
+    def added(self, first_row: int, sku_codes: Sequence[str], vectors: np.ndarray) -> "SkuPrototypes":
+        """Copy with rows first_row, first_row + 1, ... folded into their SKU's nearest centroid"""
+        new_skus = list(dict.fromkeys(code for code in sku_codes if code not in self.sku_slots))
+        dim = vectors.shape[1]
+        base = len(self)
+        fresh = np.zeros((len(new_skus), dim), dtype=np.float32)
+
+        prototypes = SkuPrototypes(self.per_sku, dim)
+        prototypes.owners = np.append(self.owners, np.array(new_skus, dtype=object))
+        prototypes.sums = np.vstack([self.sums, fresh]) if base else fresh
+        prototypes.vectors = np.vstack([self.vectors, fresh]) if base else fresh.copy()
+        prototypes.sku_slots = dict(self.sku_slots)
+        prototypes.sku_slots.update((code, np.array([base + i])) for i, code in enumerate(new_skus))
+
+        touched, new_rows = set(), {}
+        for offset, (code, vector) in enumerate(zip(sku_codes, vectors)):
+            slots = prototypes.sku_slots[code]
+            slot = slots[0] if len(slots) == 1 else slots[np.argmax(normalize_rows(prototypes.sums[slots]) @ vector)]
+            prototypes.sums[slot] += vector
+            touched.add(int(slot))
+            new_rows.setdefault(code, []).append(first_row + offset)
+
+        touched = sorted(touched)
+        prototypes.vectors[touched] = normalize_rows(prototypes.sums[touched])
+        prototypes.sku_rows = dict(self.sku_rows)
+        for code, rows in new_rows.items():
+            prototypes.sku_rows[code] = np.append(self.sku_rows.get(code, np.empty(0, dtype=np.int64)), rows)
+        return prototypes
+
+    def _distinct_owners(self, slots: np.ndarray, count: int) -> List[str]:
+        shortlist = []
+        for owner in dict.fromkeys(self.owners[slots]):
+            shortlist.append(owner)
+            if len(shortlist) == count:
+                break
+        return shortlist
+
+    def shortlist(self, views: np.ndarray, count: int) -> List[str]:
+        """The count SKUs whose best prototype scores highest against any of the views"""
+        scores = (self.vectors @ views.T).max(axis=1)
+        return self._distinct_owners(top_k_rows(scores, count * self.per_sku), count)
+
+    def shortlist_batch(self, queries: np.ndarray, count: int) -> List[List[str]]:
+        """shortlist() for every row of queries, scored in blocks"""
+        shortlists = []
+        step = max(1, MAX_SCORE_BLOCK // max(1, len(self)))
+        for start in range(0, len(queries), step):
+            slots = top_k_columns(self.vectors @ queries[start:start + step].T, count * self.per_sku)
+            shortlists.extend(self._distinct_owners(slots[:, i], count) for i in range(slots.shape[1]))
+        return shortlists
+
+    def rows(self, sku_codes: Sequence[str]) -> np.ndarray:
+        if not sku_codes:
+            return np.empty(0, dtype=np.int64)
+        return np.concatenate([self.sku_rows[code] for code in sku_codes])
+
+
+class EmbeddingIndex:
+    """Resident set of pre-normalized CLIP embeddings with per-row SKU metadata.
+
+    Rows live in a main segment (any backend, possibly a shared memory map)
+    followed by a small exact delta segment that takes incremental adds;
+    compact() folds the delta into the main segment. The watermark is the
+    newest source timestamp already loaded, so catch-up only asks for rows
+    after it.
+
+    With prototypes_per_sku set, searches are two-stage: SKUs are shortlisted
+    by their prototype vectors and only the shortlisted SKUs' rows are scored.
+    """
+
+    def __init__(self, backend_name: str = "flat", backend_params: Optional[Dict[str, Any]] = None,
+                 prototypes_per_sku: int = 0, shortlist_skus: int = 32):
+        self.backend_name = backend_name
+        self.backend_params = backend_params or {}
+        self.prototypes_per_sku = prototypes_per_sku
+        self.shortlist_skus = shortlist_skus
+        self._lock = threading.Lock()
+        self._state = IndexState(
+            backend=self.new_backend(),
+            delta=self._new_delta(0),
+            ids=np.empty(0, dtype=object),
+            sku_codes=np.empty(0, dtype=object),
+            metadata=[],
+            prototypes=None,
+        )
+        self._known_ids = set()
+        self.watermark: Optional[datetime] = None
+        self.loaded_at: Optional[datetime] = None
+
+    def new_backend(self) -> IndexBackend:
+        return create_backend(self.backend_name, **self.backend_params)
+
+    @staticmethod
+    def _new_delta(dim: int, vectors: Optional[np.ndarray] = None) -> FlatBackend:
+        delta = FlatBackend()
+        delta.build(vectors if vectors is not None else np.zeros((0, dim), dtype=np.float32))
+        return delta
+
+    def __len__(self) -> int:
+        return len(self._state.ids)
+
+    @staticmethod
+    def _dim(state: IndexState) -> int:
+        return state.backend.dim if len(state.ids) > len(state.delta) else state.delta.dim
+
+    @property
+    def dim(self) -> int:
+        return self._dim(self._state)
+
+    @property
+    def backend(self) -> IndexBackend:
+        return self._state.backend
+
+    @property
+    def delta_size(self) -> int:
+        return len(self._state.delta)
+
+    @property
+    def prototype_count(self) -> int:
+        prototypes = self._state.prototypes
+        return len(prototypes) if prototypes is not None else 0
+
+    def build(self, ids: Sequence[str], sku_codes: Sequence[str], embeddings: np.ndarray,
+              metadata: List[Dict[str, Any]], watermark: Optional[datetime] = None):
+        """Replace the whole index; rows with a zero vector are dropped"""
+        embeddings = np.asarray(embeddings, dtype=np.float32)
+        if embeddings.size == 0:
+            embeddings = np.zeros((0, embeddings.shape[1] if embeddings.ndim == 2 else 0), dtype=np.float32)
+        keep = np.flatnonzero(np.linalg.norm(embeddings, axis=1) > 0)
+        self.adopt(np.asarray(ids, dtype=object)[keep], np.asarray(sku_codes, dtype=object)[keep],
+                   normalize_rows(embeddings[keep]), [metadata[i] for i in keep], watermark)
+
+    def adopt(self, ids: Sequence[str], sku_codes: Sequence[str], vectors: np.ndarray,
+              metadata: List[Dict[str, Any]], watermark: Optional[datetime] = None,
+              backend: Optional[IndexBackend] = None):
+        """Replace the whole index with rows that are already unit vectors; a float32
+        memory map is used in place, so processes mapping the same file share its pages.
+        A backend already serving exactly these vectors (restored from a snapshot) is used as is."""
+        if backend is None or len(backend) != vectors.shape[0]:
+            backend = self.new_backend()
+            backend.build(vectors)
+        state = IndexState(
+            backend=backend,
+            delta=self._new_delta(vectors.shape[1] if vectors.ndim == 2 else 0),
+            ids=np.asarray(ids, dtype=object),
+            sku_codes=np.asarray(sku_codes, dtype=object),
+            metadata=list(metadata),
+            prototypes=SkuPrototypes.build(sku_codes, vectors, self.prototypes_per_sku)
+            if self.prototypes_per_sku else None,
+        )
+        known_ids = set(state.ids)
+        with self._lock:
+            self._state = state
+            self._known_ids = known_ids
+            self.watermark = watermark
+            self.loaded_at = datetime.now()
+
+    def export(self) -> Tuple[np.ndarray, np.ndarray, np.ndarray, List[Dict[str, Any]]]:
+        """(ids, sku_codes, unit vectors, metadata) of every row, main then delta, for adopt() elsewhere"""
+        state = self._state
+        main_count = len(state.ids) - len(state.delta)
+        segments = [vectors for vectors in (state.backend.vectors[:main_count], state.delta.vectors) if len(vectors)]
+        if not segments:
+            return state.ids, state.sku_codes, np.zeros((0, self._dim(state)), dtype=np.float32), state.metadata
+        vectors = segments[0] if len(segments) == 1 else np.vstack(segments)
+        return state.ids, state.sku_codes, vectors, state.metadata
+
+    def export_backend(self, vectors: np.ndarray) -> IndexBackend:
+        """Backend over exactly the vectors export() returned: the live one while there is no
+        delta segment, else one built for the snapshot"""
+        state = self._state
+        if not len(state.delta) and len(state.backend) == vectors.shape[0]:
+            return state.backend
+        backend = self.new_backend()
+        backend.build(vectors)
+        return backend
+
+    def add(self, row_id: str, sku_code: str, embedding: np.ndarray, metadata: Dict[str, Any]) -> bool:
+        return self.add_batch([row_id], [sku_code], np.asarray(embedding).reshape(1, -1), [metadata]) == 1
+
+    def add_batch(self, ids: Sequence[str], sku_codes: Sequence[str], embeddings: np.ndarray,
+                  metadata: List[Dict[str, Any]]) -> int:
+        """Append rows to the delta segment, skipping ids already indexed; returns the rows added"""
+        vectors = normalize_rows(embeddings)
+        with self._lock:
+            current = self._state
+            if len(current.ids) and self._dim(current) != vectors.shape[1]:
+                return 0
+
+            keep, seen = [], set()
+            for i, row_id in enumerate(ids):
+                if row_id not in self._known_ids and row_id not in seen and np.any(vectors[i]):
+                    keep.append(i)
+                    seen.add(row_id)
+            if not keep:
+                return 0
+
+            added = vectors[keep]
+            added_skus = [sku_codes[i] for i in keep]
+            if self.prototypes_per_sku:
+                prototypes = (current.prototypes or SkuPrototypes(self.prototypes_per_sku, added.shape[1]))
+                prototypes = prototypes.added(len(current.ids), added_skus, added)
+            else:
+                prototypes = None
+            self._state = IndexState(
+                backend=current.backend,
+                delta=self._new_delta(0, np.vstack([current.delta.vectors, added]) if len(current.delta) else added),
+                ids=np.append(current.ids, np.array([ids[i] for i in keep], dtype=object)),
+                sku_codes=np.append(current.sku_codes, np.array(added_skus, dtype=object)),
+                metadata=current.metadata + [metadata[i] for i in keep],
+                prototypes=prototypes,
+            )
+            self._known_ids.update(seen)
+        return len(keep)
+
+    def advance_watermark(self, watermark: Optional[datetime]):
+        with self._lock:
+            if watermark is not None and (self.watermark is None or watermark > self.watermark):
+                self.watermark = watermark
+
+    def compact(self) -> int:
+        """Fold the delta segment into the main segment; returns the rows moved"""
+        with self._lock:
+            current = self._state
+            moved = len(current.delta)
+            if not moved:
+                return 0
+            # Copy-on-write like adopt(): searches holding the old state keep its backend unchanged
+            backend = current.backend.extended(current.delta.vectors)
+            self._state = current._replace(backend=backend, delta=self._new_delta(current.delta.dim))
+        return moved
+
+    @staticmethod
+    def _search_segments(state: IndexState, query: np.ndarray, k: int) -> Tuple[np.ndarray, np.ndarray]:
+        main_count = len(state.ids) - len(state.delta)
+        rows, scores = np.empty(0, dtype=np.int64), np.empty(0, dtype=np.float32)
+        if main_count:
+            rows, scores = state.backend.search(query, min(k, main_count))
+            visible = rows < main_count
+            rows, scores = rows[visible], scores[visible]
+        if len(state.delta):
+            delta_rows, delta_scores = state.delta.search(query, min(k, len(state.delta)))
+            rows = np.concatenate([rows, delta_rows + main_count])
+            scores = np.concatenate([scores, delta_scores])
+            best = top_k_rows(scores, k)
+            rows, scores = rows[best], scores[best]
+        return rows, scores
+
+    @staticmethod
+    def _search_segments_batch(state: IndexState, queries: np.ndarray, k: int) -> List[Tuple[np.ndarray, np.ndarray]]:
+        """_search_segments for every row of queries, batched through both segments"""
+        main_count = len(state.ids) - len(state.delta)
+        empty = (np.empty(0, dtype=np.int64), np.empty(0, dtype=np.float32))
+        found = state.backend.search_batch(queries, min(k, main_count)) if main_count else [empty] * len(queries)
+        found = [(rows[rows < main_count], scores[rows < main_count]) for rows, scores in found]
+        if not len(state.delta):
+            return found
+
+        merged = []
+        for (rows, scores), (delta_rows, delta_scores) in zip(found, state.delta.search_batch(queries, min(k, len(state.delta)))):
+            rows = np.concatenate([rows, delta_rows + main_count])
+            scores = np.concatenate([scores, delta_scores])
+            best = top_k_rows(scores, k)
+            merged.append((rows[best], scores[best]))
+        return merged
+
+    @staticmethod
+    def _best_per_sku(state: IndexState, rows: np.ndarray, scores: np.ndarray, top_k: int,
+                      threshold: float) -> Dict[str, Tuple[Dict[str, Any], float]]:
+        best: Dict[str, Tuple[Dict[str, Any], float]] = {}
+        for row, score in zip(rows, scores):
+            if score < threshold:
+                break
+            sku_code = state.sku_codes[row]
+            if sku_code not in best:
+                best[sku_code] = (state.metadata[row], float(score))
+                if len(best) == top_k:
+                    break
+        return best
+
+    @classmethod
+    def _search_views(cls, state: IndexState, views: np.ndarray, k: int) -> Tuple[np.ndarray, np.ndarray]:
+        """Best k rows by their highest score over the query views"""
+        if len(views) == 1:
+            return cls._search_segments(state, views[0], k)
+
+        found = [cls._search_segments(state, view, k) for view in views]
+        rows = np.concatenate([view_rows for view_rows, _ in found])
+        scores = np.concatenate([view_scores for _, view_scores in found])
+        order = np.lexsort((-scores, rows))
+        first = np.ones(len(order), dtype=bool)
+        first[1:] = rows[order][1:] != rows[order][:-1]
+        rows, scores = rows[order][first], scores[order][first]
+        best = top_k_rows(scores, k)
+        return rows[best], scores[best]
+
+    @staticmethod
+    def _row_vectors(state: IndexState, rows: np.ndarray) -> np.ndarray:
+        main_count = len(state.ids) - len(state.delta)
+        if not len(state.delta):
+            return state.backend.vectors[rows]
+        in_main = rows < main_count
+        vectors = np.empty((len(rows), state.delta.dim), dtype=np.float32)
+        if in_main.any():
+            vectors[in_main] = state.backend.vectors[rows[in_main]]
+        vectors[~in_main] = state.delta.vectors[rows[~in_main] - main_count]
+        return vectors
+
+    def _uses_prototypes(self, state: IndexState, top_k: int) -> bool:
+        """Two-stage search only pays off when the shortlist leaves SKUs out"""
+        prototypes = state.prototypes
+        return prototypes is not None and prototypes.sku_count > max(self.shortlist_skus, top_k)
+
+    @classmethod
+    def _rerank(cls, state: IndexState, views: np.ndarray, sku_codes: List[str], top_k: int,
+                threshold: float) -> List[Tuple[Dict[str, Any], float]]:
+        """Exact scores for every row of the shortlisted SKUs, max over views, then the best row per SKU"""
+        rows = state.prototypes.rows(sku_codes)
+        scores = (cls._row_vectors(state, rows) @ views.T).max(axis=1)
+        order = np.argsort(-scores, kind="stable")
+        return list(cls._best_per_sku(state, rows[order], scores[order], top_k, threshold).values())
+
+    def search(self, query: np.ndarray, top_k: int, threshold: float,
+               fusion: str = "max") -> List[Tuple[Dict[str, Any], float]]:
+        """Best-scoring row per SKU above threshold, highest first.
+
+        query is one embedding or several views of the same image (one per row), whose
+        scores are fused per catalogue row by fusion: the max, or the mean over views.
+        """
+        if fusion not in FUSIONS:
+            raise ValueError(f"Unknown fusion '{fusion}'. Choose from: {', '.join(FUSIONS)}")
+        state = self._state
+        if not len(state.ids) or top_k <= 0:
+            return []
+
+        views = normalize_rows(query)
+        views = views[np.any(views, axis=1)]
+        if not len(views) or views.shape[1] != self._dim(state):
+            return []
+        if fusion == "mean":
+            # the mean of the per-view scores is the score of the mean view
+            views = views.mean(axis=0, keepdims=True)
+
+        if self._uses_prototypes(state, top_k):
+            shortlist = state.prototypes.shortlist(views, max(self.shortlist_skus, top_k))
+            return self._rerank(state, views, shortlist, top_k, threshold)
+
+        k = min(len(state.ids), top_k * 4)
+        while True:
+            rows, scores = self._search_views(state, views, k)
+            best = self._best_per_sku(state, rows, scores, top_k, threshold)
+
+            exhausted = len(rows) < k or (len(scores) and scores[-1] < threshold)
+            if len(best) >= top_k or exhausted or k >= len(state.ids):
+                return list(best.values())
+            k = min(len(state.ids), k * 4)
+
+
+    def search_batch(self, queries: np.ndarray, top_k: int, threshold: float) -> List[List[Tuple[Dict[str, Any], float]]]:
+        """search() for every row of queries: one scoring pass for all of them, then per-query
+        SKU dedup; a query whose candidates hold too few SKUs falls back to search()"""
+        state = self._state
+        if not len(state.ids) or top_k <= 0:
+            return [[] for _ in queries]
+
+        queries = normalize_rows(queries)
+        if queries.shape[1] != self._dim(state):
+            return [[] for _ in queries]
+
+        if self._uses_prototypes(state, top_k):
+            shortlists = state.prototypes.shortlist_batch(queries, max(self.shortlist_skus, top_k))
+            return [self._rerank(state, query[None, :], shortlist, top_k, threshold) if np.any(query) else []
+                    for query, shortlist in zip(queries, shortlists)]
+
+        k = min(len(state.ids), top_k * 4)
+        results = []
+        for query, (rows, scores) in zip(queries, self._search_segments_batch(state, queries, k)):
+            if not np.any(query):
+                results.append([])
+                continue
+            best = self._best_per_sku(state, rows, scores, top_k, threshold)
+            exhausted = len(rows) < k or (len(scores) and scores[-1] < threshold)
+            if len(best) >= top_k or exhausted or k >= len(state.ids):
+                results.append(list(best.values()))
+            else:
+                results.append(self.search(query, top_k, threshold))
+        return results
+
+
+class CorrectionIndex:
+    """Approved feedback corrections as a pre-normalized matrix, oldest row first"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._vectors = np.zeros((0, 0), dtype=np.float32)
+        self._sku_codes: List[str] = []
+        self._keys = set()
+        self.watermark: Optional[datetime] = None
+        self.loaded_at: Optional[datetime] = None
+
+    def __len__(self) -> int:
+        return len(self._sku_codes)
+
+    def build(self, sku_codes: Sequence[str], embeddings: np.ndarray, keys: Optional[Sequence[str]] = None,
+              watermark: Optional[datetime] = None):
+        embeddings = np.asarray(embeddings, dtype=np.float32)
+        if embeddings.size == 0:
+            embeddings = np.zeros((0, embeddings.shape[1] if embeddings.ndim == 2 else 0), dtype=np.float32)
+        vectors = np.ascontiguousarray(normalize_rows(embeddings))
+        with self._lock:
+            self._vectors, self._sku_codes = vectors, list(sku_codes)
+            self._keys = set(keys or [])
+            self.watermark = watermark
+            self.loaded_at = datetime.now()
+
+    def add(self, sku_code: str, embedding: np.ndarray, key: Optional[str] = None) -> bool:
+        """Append a correction; one whose key is already loaded is skipped"""
+        vector = normalize_rows(embedding)
+        with self._lock:
+            if key is not None and key in self._keys:
+                return False
+            if len(self._sku_codes) and self._vectors.shape[1] != vector.shape[1]:
+                return False
+            vectors = vector if not len(self._sku_codes) else np.vstack([self._vectors, vector])
+            self._vectors, self._sku_codes = vectors, self._sku_codes + [sku_code]
+            if key is not None:
+                self._keys.add(key)
+        return True
+
+    def advance_watermark(self, watermark: Optional[datetime]):
+        with self._lock:
+            if watermark is not None and (self.watermark is None or watermark > self.watermark):
+                self.watermark = watermark
+
+    def lookup(self, query: np.ndarray, threshold: float, fusion: str = "max") -> Optional[Tuple[str, float]]:
+        """Most recent correction whose similarity to the query reaches threshold; several query
+        views (one per row) are fused per correction like EmbeddingIndex.search"""
+        vectors, sku_codes = self._vectors, self._sku_codes
+        if not len(sku_codes):
+            return None
+
+        views = normalize_rows(query)
+        views = views[np.any(views, axis=1)]
+        if not len(views) or views.shape[1] != vectors.shape[1]:
+            return None
+
+        scores = vectors[:len(sku_codes)] @ views.T
+        fused = scores.max(axis=1) if fusion == "max" else scores.mean(axis=1)
+        hits = np.flatnonzero(fused >= threshold)
+        if not hits.size:
+            return None
+        row = hits[-1]
+        return sku_codes[row], float(fused[row])
+
+
+    def lookup_batch(self, queries: np.ndarray, threshold: float) -> List[Optional[Tuple[str, float]]]:
+        """lookup() for every row of queries from one matrix product"""
+        vectors, sku_codes = self._vectors, self._sku_codes
+        queries = normalize_rows(queries)
+        if not len(sku_codes) or queries.shape[1] != vectors.shape[1]:
+            return [None] * len(queries)
+
+        scores = vectors[:len(sku_codes)] @ queries.T
+        hits = scores >= threshold
+        # most recent qualifying correction: the last hit in each column
+        last = len(sku_codes) - 1 - np.argmax(hits[::-1], axis=0)
+        return [(sku_codes[row], float(scores[row, i])) if hits[:, i].any() and np.any(queries[i]) else None
+                for i, row in enumerate(last)]
+
+
+def _json_value(value: Any) -> Any:
+    return value.item() if isinstance(value, np.generic) else str(value)
+
+
+class SnapshotError(Exception):
+    """A published index version is missing, incomplete or fails its checksums"""
+
+
+def _file_sha256(path: str) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as handle:
+        for chunk in iter(lambda: handle.read(4 * 1024 * 1024), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class IndexStore:
+    """Versioned index snapshots on disk, shared by every worker process.
+
+    Each version is a directory holding vectors.npy (unit float32 rows),
+    rows.json (ids, SKU codes, metadata) and manifest.json (format, row count,
+    dimension, source watermark and the SHA-256 of both data files). CURRENT
+    names the live version and is only ever replaced atomically, so readers
+    see either the old or the new index. Workers map vectors.npy read-only, so
+    the page cache holds one copy of the matrix however many processes serve it.
+    """
+
+    FORMAT_VERSION = 1
+    DATA_FILES = ("vectors.npy", "rows.json")
+    KEEP_QUARANTINED = 2  # newest corrupt versions left on disk for inspection
+
+    def __init__(self, root: str, keep_versions: int = 3):
+        self.root = root
+        self.keep_versions = keep_versions
+
+    @contextmanager
+    def lock(self):
+        """Exclusive across processes, so only one worker rebuilds at a time; creates the root on first use"""
+        os.makedirs(self.root, exist_ok=True)
+        with open(os.path.join(self.root, ".lock"), "a") as handle:
+            if fcntl:
+                fcntl.flock(handle, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                if fcntl:
+                    fcntl.flock(handle, fcntl.LOCK_UN)
+
+    def current(self) -> Optional[str]:
+        try:
+            with open(os.path.join(self.root, "CURRENT")) as handle:
+                version = handle.read().strip()
+        except FileNotFoundError:
+            return None
+        return version if version and os.path.isdir(os.path.join(self.root, version)) else None
+
+    def manifest(self, version: str) -> Dict[str, Any]:
+        try:
+            with open(os.path.join(self.root, version, "manifest.json")) as handle:
+                return json.load(handle)
+        except (OSError, ValueError) as e:
+            raise SnapshotError(f"Unreadable manifest for index version {version}: {e}")
+
+    def published_at(self, version: str) -> float:
+        return self.manifest(version)["published_at"]
+
+    def publish(self, ids: Sequence[str], sku_codes: Sequence[str], vectors: np.ndarray,
+                metadata: List[Dict[str, Any]], watermark: Optional[datetime] = None,
+                backend: Optional[IndexBackend] = None) -> str:
+        """Write a new version and point CURRENT at it; with backend, its search structure too"""
+        version = f"{time.strftime('%Y%m%dT%H%M%S')}-{uuid.uuid4().hex[:8]}"
+        staging = os.path.join(self.root, f".tmp-{version}")
+        os.makedirs(staging)
+        vectors = np.ascontiguousarray(vectors, dtype=np.float32)
+        np.save(os.path.join(staging, "vectors.npy"), vectors)
+        with open(os.path.join(staging, "rows.json"), "w") as handle:
+            json.dump({"ids": list(ids), "sku_codes": list(sku_codes), "metadata": list(metadata)},
+                      handle, default=_json_value)
+        structure = backend.save(staging) if backend is not None else []
+
+        manifest = {
+            "format_version": self.FORMAT_VERSION,
+            "published_at": time.time(),
+            "watermark": watermark.isoformat() if watermark else None,
+            "rows": int(vectors.shape[0]),
+            "dim": int(vectors.shape[1]) if vectors.ndim == 2 else 0,
+            "files": {
+                name: {"sha256": _file_sha256(os.path.join(staging, name)),
+                       "bytes": os.path.getsize(os.path.join(staging, name))}
+                for name in self.DATA_FILES + tuple(structure)
+            },
+            "backend": {"name": backend.name, "params": backend.params(), "files": structure} if backend is not None else None,
+        }
+        with open(os.path.join(staging, "manifest.json"), "w") as handle:
+            json.dump(manifest, handle, indent=2)
+        os.rename(staging, os.path.join(self.root, version))
+
+        pointer = os.path.join(self.root, f".CURRENT-{version}")
+        with open(pointer, "w") as handle:
+            handle.write(version)
+        os.replace(pointer, os.path.join(self.root, "CURRENT"))
+        self.prune()
+        return version
+
+    def verify(self, version: str, checksums: bool = True) -> Dict[str, Any]:
+        """Manifest of a version whose files match their recorded sizes and, with checksums,
+        their SHA-256; hashing reads every byte, so swaps to a version a sibling just wrote skip it"""
+        manifest = self.manifest(version)
+        if manifest.get("format_version") != self.FORMAT_VERSION:
+            raise SnapshotError(f"Index version {version} has format {manifest.get('format_version')}, "
+                                f"expected {self.FORMAT_VERSION}")
+        for name in self.DATA_FILES + tuple((manifest.get("backend") or {}).get("files", [])):
+            path = os.path.join(self.root, version, name)
+            expected = manifest.get("files", {}).get(name)
+            if not expected or not os.path.exists(path):
+                raise SnapshotError(f"Index version {version} is missing {name}")
+            if os.path.getsize(path) != expected["bytes"]:
+                raise SnapshotError(f"Index version {version}: {name} has the wrong size")
+            if checksums and _file_sha256(path) != expected["sha256"]:
+                raise SnapshotError(f"Index version {version}: {name} fails its checksum")
+        return manifest
+
+    def load(self, version: str, checksums: bool = True) -> Tuple[List[str], List[str], np.ndarray, List[Dict[str, Any]], Optional[datetime]]:
+        """Verify a version, then map its vectors read-only"""
+        manifest = self.verify(version, checksums)
+        folder = os.path.join(self.root, version)
+        vectors = np.load(os.path.join(folder, "vectors.npy"), mmap_mode="r")
+        with open(os.path.join(folder, "rows.json")) as handle:
+            rows = json.load(handle)
+        if vectors.shape[0] != manifest["rows"] or len(rows["ids"]) != manifest["rows"]:
+            raise SnapshotError(f"Index version {version} row counts disagree with its manifest")
+        watermark = datetime.fromisoformat(manifest["watermark"]) if manifest["watermark"] else None
+        return rows["ids"], rows["sku_codes"], vectors, rows["metadata"], watermark
+
+    def restore_backend(self, version: str, backend: IndexBackend, vectors: np.ndarray) -> bool:
+        """Load the version's saved search structure into backend when it was built by the same
+        backend with the same settings; False means the caller has to build one"""
+        saved = self.manifest(version).get("backend")
+        if not saved or saved["name"] != backend.name or saved["params"] != backend.params():
+            return False
+        backend.restore(os.path.join(self.root, version), vectors)
+        return True
+
+    def _versions(self) -> List[str]:
+        if not os.path.isdir(self.root):
+            return []
+        return sorted(name for name in os.listdir(self.root)
+                      if not name.startswith(".") and os.path.isdir(os.path.join(self.root, name)))
+
+    def quarantine(self, version: str):
+        """Move a bad version aside so no worker loads it again; CURRENT falls back to the newest left"""
+        was_current = self.current() == version
+        os.rename(os.path.join(self.root, version), os.path.join(self.root, f".corrupt-{version}"))
+        if was_current:
+            remaining = self._versions()
+            if remaining:
+                pointer = os.path.join(self.root, f".CURRENT-{remaining[-1]}")
+                with open(pointer, "w") as handle:
+                    handle.write(remaining[-1])
+                os.replace(pointer, os.path.join(self.root, "CURRENT"))
+            else:
+                os.remove(os.path.join(self.root, "CURRENT"))
+
+    def prune(self):
+        """Drop all but the newest versions and quarantined copies; workers still mapping an old
+        one keep their view"""
+        current = self.current()
+        versions = self._versions()
+        for version in versions[:max(0, len(versions) - self.keep_versions)]:
+            if version != current:
+                shutil.rmtree(os.path.join(self.root, version), ignore_errors=True)
+
+        quarantined = sorted(name for name in os.listdir(self.root) if name.startswith(".corrupt-"))
+        for name in quarantined[:max(0, len(quarantined) - self.KEEP_QUARANTINED)]:
+            shutil.rmtree(os.path.join(self.root, name), ignore_errors=True)
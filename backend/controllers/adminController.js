@@ -10,6 +10,7 @@ exports.getPendingFeedback = async (req, res, next) => {
         username: "admin",
         password: "admin123",
       },
+      params: { limit: req.query.limit, cursor: req.query.cursor },
     });
     if (
       response.data &&
@@ -17,7 +18,11 @@ exports.getPendingFeedback = async (req, res, next) => {
       response.data.data &&
       Array.isArray(response.data.data.feedback_list)
     ) {
-      res.json({ feedbacks: response.data.data.feedback_list });
+      res.json({
+        feedbacks: response.data.data.feedback_list,
+        nextCursor: response.data.data.next_cursor,
+        totalPending: response.data.data.total_pending,
+      });
     } else {
       res
         .status(500)
@@ -58,6 +63,28 @@ exports.approveFeedback = async (req, res, next) => {
   }
 };
 
+exports.approveFeedbackBulk = async (req, res, next) => {
+  try {
+    const { feedbackIds, adminName } = req.body;
+    const response = await axios.post(
+      `${PY_API_BASE_URL}/approve-feedback/bulk`,
+      {
+        feedback_ids: feedbackIds,
+        admin_name: adminName || "admin",
+      },
+      {
+        auth: {
+          username: "admin",
+          password: "admin123",
+        },
+      }
+    );
+    res.json(response.data);
+  } catch (err) {
+    next(err);
+  }
+};
+
 exports.createUser = async (req, res, next) => {
   try {
     const { username, password, role_id } = req.body;
@@ -1,17 +1,27 @@
 const axios = require("axios");
 const { PY_API_BASE_URL } = require("../utils/config");
 
+let cachedCodes = null;
+let cachedEtag = null;
+
 exports.getCodes = async (req, res) => {
   try {
-    const pyRes = await fetch("http://127.0.0.1:8002/sku-list");
+    const headers = cachedEtag ? { "If-None-Match": cachedEtag } : {};
+    const pyRes = await fetch("http://127.0.0.1:8002/sku-list", { headers });
+    if (pyRes.status === 304 && cachedCodes) {
+      return res.json({ success: true, codes: cachedCodes });
+    }
+
     const pyData = await pyRes.json();
     if (pyData.success && pyData.data && Array.isArray(pyData.data.skus)) {
+      cachedCodes = pyData.data.skus.map((sku) => ({
+        label: sku.sku_code,
+        description: sku.description,
+      }));
+      cachedEtag = pyRes.headers.get("etag");
       res.json({
         success: true,
-        codes: pyData.data.skus.map((sku) => ({
-          label: sku.sku_code,
-          description: sku.description,
-        })),
+        codes: cachedCodes,
       });
     } else {
       res
@@ -26,14 +26,20 @@ exports.submitFeedback = async (req, res, next) => {
 };
 exports.getPendingFeedback = async (req, res, next) => {
   try {
-    const response = await axios.get(`http://127.0.0.1:8002/pending-feedback`);
+    const response = await axios.get(`${PY_API_BASE_URL}/pending-feedback`, {
+      params: { limit: req.query.limit, cursor: req.query.cursor },
+    });
     if (
       response.data &&
       response.data.success &&
       response.data.data &&
       Array.isArray(response.data.data.feedback_list)
     ) {
-      res.json({ feedbacks: response.data.data.feedback_list });
+      res.json({
+        feedbacks: response.data.data.feedback_list,
+        nextCursor: response.data.data.next_cursor,
+        totalPending: response.data.data.total_pending,
+      });
     } else {
       res
         .status(500)
@@ -43,3 +49,27 @@ exports.getPendingFeedback = async (req, res, next) => {
     next(err);
   }
 };
+
+const proxyFeedbackImage = (kind) => async (req, res, next) => {
+  try {
+    const response = await axios.get(
+      `${PY_API_BASE_URL}/feedback/${encodeURIComponent(req.params.id)}/${kind}`,
+      {
+        responseType: "arraybuffer",
+        headers: req.headers["if-none-match"]
+          ? { "If-None-Match": req.headers["if-none-match"] }
+          : {},
+        validateStatus: (code) => code === 200 || code === 304 || code === 404,
+      }
+    );
+    ["content-type", "etag", "cache-control"].forEach((name) => {
+      if (response.headers[name]) res.set(name, response.headers[name]);
+    });
+    res.status(response.status).send(response.data);
+  } catch (err) {
+    next(err);
+  }
+};
+
+exports.getFeedbackThumbnail = proxyFeedbackImage("thumbnail");
+exports.getFeedbackImage = proxyFeedbackImage("image");
@@ -38,3 +38,53 @@ exports.searchImage = async (req, res, next) => {
     res.status(500).json({ success: false, message: "Internal server error" });
   }
 };
+
+exports.searchBatch = async (req, res, next) => {
+  try {
+    if (!req.files || req.files.length === 0) {
+      return res
+        .status(400)
+        .json({ success: false, message: "No images provided" });
+    }
+
+    const form = new FormData();
+    req.files.forEach((file) => {
+      form.append("files", file.buffer, file.originalname);
+    });
+
+    const response = await axios.post(
+      `${PY_API_BASE_URL}/search-similar/batch`,
+      form,
+      {
+        headers: form.getHeaders(),
+        maxContentLength: Infinity,
+        maxBodyLength: Infinity,
+      }
+    );
+
+    if (
+      response.data &&
+      response.data.success &&
+      response.data.data &&
+      Array.isArray(response.data.data.results)
+    ) {
+      res.json({
+        success: true,
+        results: response.data.data.results,
+        message: response.data.message,
+      });
+    } else {
+      res
+        .status(500)
+        .json({ success: false, message: "Invalid batch search response" });
+    }
+  } catch (err) {
+    if (err.response && err.response.status === 400) {
+      return res
+        .status(400)
+        .json({ success: false, message: err.response.data.detail });
+    }
+    console.error("Batch search error:", err);
+    res.status(500).json({ success: false, message: "Internal server error" });
+  }
+};
@@ -0,0 +1,27 @@
+const { AsyncLocalStorage } = require("async_hooks");
+const crypto = require("crypto");
+const axios = require("axios");
+
+// W3C trace context: every call to the AI service carries the trace id of the
+// request that caused it, so slow searches can be matched across both services.
+const TRACEPARENT = /^00-([0-9a-f]{32})-([0-9a-f]{16})-([0-9a-f]{2})$/;
+const traceStore = new AsyncLocalStorage();
+
+axios.interceptors.request.use((config) => {
+  const trace = traceStore.getStore();
+  if (trace && !config.headers.traceparent) {
+    const spanId = crypto.randomBytes(8).toString("hex");
+    config.headers.traceparent = `00-${trace.traceId}-${spanId}-${trace.flags}`;
+  }
+  return config;
+});
+
+module.exports = (req, res, next) => {
+  const incoming = TRACEPARENT.exec((req.headers.traceparent || "").trim().toLowerCase());
+  const trace = {
+    traceId: incoming ? incoming[1] : crypto.randomBytes(16).toString("hex"),
+    flags: incoming ? incoming[3] : "00",
+  };
+  res.setHeader("x-trace-id", trace.traceId);
+  traceStore.run(trace, next);
+};
@@ -3,6 +3,7 @@ const router = express.Router();
 const adminController = require("../controllers/adminController");
 
 router.post("/feedback/approve", adminController.approveFeedback);
+router.post("/feedback/approve/bulk", adminController.approveFeedbackBulk);
 
 router.post("/user", adminController.createUser);
 router.put("/user", adminController.updateUser);
@@ -8,5 +8,7 @@ const upload = multer({ storage });
 
 router.post("/", upload.single("file"), feedbackController.submitFeedback);
 router.get("/pending", feedbackController.getPendingFeedback);
+router.get("/:id/thumbnail", feedbackController.getFeedbackThumbnail);
+router.get("/:id/image", feedbackController.getFeedbackImage);
 
 module.exports = router;
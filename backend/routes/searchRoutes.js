@@ -7,5 +7,6 @@ const storage = multer.memoryStorage();
 const upload = multer({ storage });
 
 router.post("/", upload.single("image"), searchController.searchImage);
+router.post("/batch", upload.array("images", 64), searchController.searchBatch);
 
 module.exports = router;
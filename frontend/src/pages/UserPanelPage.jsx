@@ -29,6 +29,8 @@ import TableContainer from "@mui/material/TableContainer";
 
 const uploadedImage = localStorage.getItem("uploadedImage");
 
+const FEEDBACK_PAGE_SIZE = 50;
+
 export default function UserPanelPage() {
   const [feedbacks, setFeedbacks] = useState([]);
   const [users, setUsers] = useState([]);
@@ -60,6 +62,9 @@ export default function UserPanelPage() {
   const [editPwd, setEditPwd] = useState("");
   const [loadingUsers, setLoadingUsers] = useState(true);
   const [loadingFeedbacks, setLoadingFeedbacks] = useState(true);
+  const [loadingMoreFeedbacks, setLoadingMoreFeedbacks] = useState(false);
+  const [feedbackCursor, setFeedbackCursor] = useState(null);
+  const [totalPendingFeedbacks, setTotalPendingFeedbacks] = useState(0);
   const [userDialogLoading, setUserDialogLoading] = useState(false);
 
   const [snackbar, setSnackbar] = useState({
@@ -92,6 +97,48 @@ export default function UserPanelPage() {
 
   const apiBase = import.meta.env.VITE_API_URL || "";
 
+  const fetchFeedbacks = async (cursor = null) => {
+    if (cursor) setLoadingMoreFeedbacks(true);
+    else setLoadingFeedbacks(true);
+    try {
+      const params = new URLSearchParams({ limit: FEEDBACK_PAGE_SIZE });
+      if (cursor) params.set("cursor", cursor);
+      const url = apiBase + "/api/feedback/pending?" + params.toString();
+      const res = await fetch(url);
+      const data = await res.json();
+      if (res.ok && data.feedbacks) {
+        const page = data.feedbacks.map((fb) => ({
+          id: fb.feedback_id,
+          suggestedCode: fb.correct_sku,
+          user: fb.username,
+          date: fb.complaint_time
+            ? (() => {
+                const d = new Date(fb.complaint_time.replace(" ", "T"));
+                return `${d.getDate().toString().padStart(2, "0")}-${(
+                  d.getMonth() + 1
+                )
+                  .toString()
+                  .padStart(2, "0")}-${d.getFullYear()}`;
+              })()
+            : "",
+          thumbnail: `${apiBase}/api/feedback/${encodeURIComponent(
+            fb.feedback_id
+          )}/thumbnail`,
+          image: `${apiBase}/api/feedback/${encodeURIComponent(
+            fb.feedback_id
+          )}/image`,
+        }));
+        setFeedbacks((fbs) => (cursor ? [...fbs, ...page] : page));
+        setFeedbackCursor(data.nextCursor || null);
+        if (!cursor && data.totalPending != null) {
+          setTotalPendingFeedbacks(data.totalPending);
+        }
+      }
+    } catch {}
+    if (cursor) setLoadingMoreFeedbacks(false);
+    else setLoadingFeedbacks(false);
+  };
+
   useEffect(() => {
     const fetchUsers = async () => {
       setLoadingUsers(true);
@@ -108,37 +155,6 @@ export default function UserPanelPage() {
       }
       setLoadingUsers(false);
     };
-    const fetchFeedbacks = async () => {
-      setLoadingFeedbacks(true);
-      try {
-        const url = apiBase + "/api/feedback/pending";
-        const res = await fetch(url);
-        const data = await res.json();
-        if (res.ok && data.feedbacks) {
-          setFeedbacks(
-            data.feedbacks.map((fb) => ({
-              id: fb.feedback_id,
-              suggestedCode: fb.correct_sku,
-              user: fb.username,
-              date: fb.complaint_time
-                ? (() => {
-                    const d = new Date(fb.complaint_time.replace(" ", "T"));
-                    return `${d.getDate().toString().padStart(2, "0")}-${(
-                      d.getMonth() + 1
-                    )
-                      .toString()
-                      .padStart(2, "0")}-${d.getFullYear()}`;
-                  })()
-                : "",
-              image: fb.image_data
-                ? `data:image/jpeg;base64,${fb.image_data}`
-                : null,
-            }))
-          );
-        }
-      } catch {}
-      setLoadingFeedbacks(false);
-    };
     fetchUsers();
     fetchFeedbacks();
     // eslint-disable-next-line
@@ -203,6 +219,7 @@ export default function UserPanelPage() {
         const data = await res.json();
         if (res.ok && data.success) {
           setFeedbacks((fbs) => fbs.filter((fb) => fb.id !== selectedFeedback));
+          setTotalPendingFeedbacks((n) => Math.max(0, n - 1));
           setSnackbar({
             open: true,
             message: data.message || "Feedback updated",
@@ -1136,8 +1153,9 @@ export default function UserPanelPage() {
                             }}
                           >
                             <img
-                              src={fb.image}
+                              src={fb.thumbnail}
                               alt="Feedback"
+                              loading="lazy"
                               style={{
                                 width: "100%",
                                 height: "100%",
@@ -1231,6 +1249,21 @@ export default function UserPanelPage() {
                 )}
               </TableBody>
             </Table>
+            {feedbackCursor && !loadingFeedbacks && (
+              <Box sx={{ py: 2, textAlign: "center" }}>
+                <Button
+                  variant="outlined"
+                  disabled={loadingMoreFeedbacks}
+                  onClick={() => fetchFeedbacks(feedbackCursor)}
+                >
+                  {loadingMoreFeedbacks ? (
+                    <CircularProgress size={20} />
+                  ) : (
+                    `Load more (${feedbacks.length} of ${totalPendingFeedbacks})`
+                  )}
+                </Button>
+              </Box>
+            )}
           </Paper>
         </>
       )}